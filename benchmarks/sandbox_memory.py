@@ -0,0 +1,66 @@
+"""
+Resident memory of a process pool that loads the whole sandbox, as the worker count grows.
+
+Every worker is started with the spawn method, so nothing is inherited from the parent and each
+one loads the tables itself: either from the source files (a private copy per worker) or from the
+memory-mapped binary snapshot (shared pages). Run from the repository root after building the
+snapshot with `python -m travelplanner.tools.snapshot`:
+
+    python benchmarks/sandbox_memory.py --workers 1 2 4
+
+PSS (proportional set size) splits shared pages between the processes mapping them, so the sum
+over the workers is the real memory cost of the pool. Linux only, since it reads /proc.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import time
+from travelplanner.tools.sandbox import get_sandbox, init_worker
+from travelplanner.tools.snapshot import TABLES
+
+
+def _memory() -> dict:
+    usage = {}
+    with open("/proc/self/smaps_rollup", "r") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:", "Private_Dirty:"):
+                usage[parts[0][:-1]] = int(parts[1]) * 1024
+    return usage
+
+
+def _work(_):
+    # Scan every column so the mapped pages are actually resident before measuring.
+    sandbox = get_sandbox()
+    for name in sandbox.loaded():
+        data = sandbox.get(name).data
+        for column in data.columns:
+            (data[column] == data[column].iloc[0]).sum()
+    # Keep the worker busy so that every worker picks up exactly one task.
+    time.sleep(1)
+    return os.getpid(), _memory()
+
+
+def measure(workers: int, use_snapshot: bool) -> dict:
+    options = {name: {"use_snapshot": use_snapshot} for name in TABLES}
+    context = mp.get_context("spawn")
+    with context.Pool(workers, initializer=init_worker, initargs=(TABLES, options)) as pool:
+        reports = dict(pool.map(_work, range(workers), chunksize=1))
+    total = {key: sum(report[key] for report in reports.values()) for key in ("Rss", "Pss", "Private_Dirty")}
+    total["workers"] = len(reports)
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure pool memory with and without the sandbox snapshot.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--modes", nargs="+", choices=["source", "snapshot"], default=["source", "snapshot"])
+    args = parser.parse_args()
+
+    print(f"{'mode':<10}{'workers':>8}{'RSS MB':>10}{'PSS MB':>10}{'private MB':>12}{'PSS/worker':>12}")
+    for mode in args.modes:
+        for workers in args.workers:
+            total = measure(workers, use_snapshot=(mode == "snapshot"))
+            mb = 1024 * 1024
+            print(f"{mode:<10}{total['workers']:>8}{total['Rss'] / mb:>10.0f}{total['Pss'] / mb:>10.0f}"
+                  f"{total['Private_Dirty'] / mb:>12.0f}{total['Pss'] / mb / total['workers']:>12.0f}")
@@ -1,25 +1,19 @@
 import sys
 import os
 import json
-from travelplanner.tools.flights.apis import Flights
-from travelplanner.tools.accommodations.apis import Accommodations
-from travelplanner.tools.restaurants.apis import Restaurants
-from travelplanner.tools.googleDistanceMatrix.apis import GoogleDistanceMatrix
-from travelplanner.tools.attractions.apis import Attractions
+from travelplanner.tools.sandbox import get_sandbox
+from travelplanner.utils.plan_parser import extract_before_parenthesis
+from travelplanner.utils.city_registry import get_city_registry
 import math
 from tqdm import tqdm
 import re
 import random
 import argparse
-from datasets import load_dataset
+from travelplanner.utils.query_sets import load_query_set, sample_subset
 
 def import_data():
-    flight = Flights()
-    accommodations = Accommodations()
-    restaurants = Restaurants()
-    googleDistanceMatrix = GoogleDistanceMatrix()
-    attractions = Attractions()
-    return flight, accommodations, restaurants, googleDistanceMatrix, attractions
+    sandbox = get_sandbox()
+    return sandbox.flights, sandbox.accommodations, sandbox.restaurants, sandbox.googleDistanceMatrix, sandbox.attractions
 
 def load_line_json_data(filename):
     data = []
@@ -35,24 +29,11 @@ def get_city_list(days, deparure_city, destination):
     if days == 3:
         city_list.append(destination)
     else:
-        city_set = []
-        with open('./src/travelplanner/database/background/citySet_with_states.txt','r') as f:
-            city_set = f.read().split('\n')
-        state_city_map = {}
-        for unit in city_set:
-            city, state = unit.split('\t')
-            if state not in state_city_map:
-                state_city_map[state] = []
-            state_city_map[state].append(city)
-        for city in state_city_map[destination]:
+        for city in get_city_registry().state_cities[destination]:
             if city != deparure_city:
                 city_list.append(city + f"({destination})")
     return city_list
 
-def extract_before_parenthesis(s):
-    match = re.search(r'^(.*?)\([^)]*\)', s)
-    return match.group(1) if match else s
-
 def get_transportation(org,dest,date):
     transportation_price_info = {'Flight':1e9,'Self-driving':1e9,'Taxi':1e9}
     # get the flight information
@@ -61,13 +42,13 @@ def get_transportation(org,dest,date):
         flight_cost = int(flight_info.sort_values(by=['Price'],ascending=True).iloc[0]['Price'])
         transportation_price_info['Flight'] = flight_cost 
     # get the self-driving information
-    self_driving_info = googleDistanceMatrix.run_for_evaluation(org, dest, mode='driving')
-    if self_driving_info['cost'] != None:
-        transportation_price_info['Self-driving'] = self_driving_info['cost'] *  math.ceil(1.0 / 5)
+    self_driving_cost = googleDistanceMatrix.route_cost([org, dest], mode='self-driving', people=1)
+    if not math.isnan(self_driving_cost):
+        transportation_price_info['Self-driving'] = self_driving_cost
     # get the taxi information
-    taxi_info = googleDistanceMatrix.run_for_evaluation(org, dest, mode='taxi')
-    if taxi_info['cost'] != None:
-        transportation_price_info['Taxi'] = taxi_info['cost'] *  math.ceil(1.0 / 4)
+    taxi_cost = googleDistanceMatrix.route_cost([org, dest], mode='taxi', people=1)
+    if not math.isnan(taxi_cost):
+        transportation_price_info['Taxi'] = taxi_cost
     sorted_dict = dict(sorted(transportation_price_info.items(), key=lambda item: item[1]))
     transportation = list(sorted_dict.keys())[0]
     if transportation_price_info[transportation] == 1e9:
@@ -114,19 +95,18 @@ if __name__ == '__main__':
     parser.add_argument("--create_subset", type=bool, default=False)
     parser.add_argument("--result_prefix", type=str, default="greedy_plan_")
     parser.add_argument("--output_dir", type=str, default="./results")
+    parser.add_argument("--lazy_flights", action="store_true", help="Read flight partitions per origin on demand instead of the whole table.")
+    parser.add_argument("--compact_flights", action="store_true", help="Keep the flights table in the compact encoded layout.")
 
     args = parser.parse_args()
-    if args.set_type == 'train':
-        query_data_list  = load_dataset('osunlp/TravelPlanner','train')['train']
-    elif args.set_type == 'validation':
-        query_data_list  = load_dataset('osunlp/TravelPlanner','validation')['validation']
-    else:
-        query_data_list  = load_dataset('osunlp/TravelPlanner','test')['test']
+    if args.lazy_flights or args.compact_flights:
+        get_sandbox().configure("flights", lazy=args.lazy_flights, compact=args.compact_flights)
+    query_data_list = load_query_set(args.set_type)
     result_prefix = args.result_prefix
 
     if args.create_subset:
         # Create a subset of the dataset
-        query_data_list = query_data_list.train_test_split(test_size=0.2,shuffle=False,seed=42)["test"]
+        query_data_list = sample_subset(query_data_list)
         result_prefix = f"sample_{args.result_prefix}"
 
     flight, accommodations, restaurants, googleDistanceMatrix, attractions = \
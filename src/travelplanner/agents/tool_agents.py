@@ -1,11 +1,14 @@
 import sys
 import re, string, os
 import importlib
+import asyncio
 from typing import List, Dict, Any
 import tiktoken
 from pandas import DataFrame
 from travelplanner.agents.prompts import zeroshot_react_agent_prompt
 from travelplanner.utils.func import load_line_json_data, save_file
+from travelplanner.utils.table_text import frame_to_text
+from travelplanner.tools.sandbox import get_sandbox
 import sys
 import json
 import openai
@@ -14,7 +17,7 @@ import pandas as pd
 from datetime import datetime
 from tqdm import tqdm
 import argparse
-from datasets import load_dataset
+from travelplanner.utils.query_sets import load_query_set, sample_subset
 import os
 from functools import partial
 import warnings
@@ -36,6 +39,29 @@ actionMapping = \
     "CitySearch":"cities"
 }
 
+MASKED_OBSERVATION = 'Masked due to limited length. Make sure the data has been written in Notebook.'
+
+class ScratchpadSegment:
+    """
+    One piece of the agent scratchpad: part of a thought, an action or an observation (`kind`), with
+    its token count. A masked observation renders as MASKED_OBSERVATION in place of its data,
+    keeping the whitespace around it.
+    """
+    __slots__ = ('kind', 'text', 'tokens', 'masked')
+
+    def __init__(self, kind: str, text: str, tokens: int) -> None:
+        self.kind = kind
+        self.text = text
+        self.tokens = tokens
+        self.masked = False
+
+    def render(self) -> str:
+        if not self.masked:
+            return self.text
+        start = len(self.text) - len(self.text.lstrip())
+        end = max(len(self.text.rstrip()), start)
+        return self.text[:start] + MASKED_OBSERVATION + self.text[end:]
+
 class CityError(Exception):
     pass
 
@@ -56,6 +82,11 @@ def catch_openai_api_error():
     else:
         print("API error:", error)
 
+async def abackoff_openai_api_error(error: Exception) -> None:
+    """Report an OpenAI error of the async client and wait before the retry, without blocking the event loop."""
+    print(f"{type(error).__name__}:", error)
+    await asyncio.sleep(60 if isinstance(error, openai.RateLimitError) else 5)
+
 class ReactAgent:
     def __init__(self,
                  args,
@@ -82,8 +113,13 @@ class ReactAgent:
             api_key=os.environ.get("API_KEY"),
             base_url=os.environ.get("BASE_URL")
         )
+        self.async_client = openai.AsyncOpenAI(
+            api_key=os.environ.get("API_KEY"),
+            base_url=os.environ.get("BASE_URL")
+        )
         
         self.llm = partial(self._get_completion,model_name=self.model_name,**self.parameters)
+        self.allm = partial(self._aget_completion,model_name=self.model_name,**self.parameters)
 
         self.answer = ''
         self.max_steps = max_steps
@@ -113,6 +149,7 @@ class ReactAgent:
         self.city_set = self.load_city(city_set_path=city_file_path)
 
         self.enc = tiktoken.encoding_for_model("gpt-3.5-turbo")
+        self.prompt_base_tokens = 0
 
         self.__reset_agent()
     
@@ -129,47 +166,144 @@ class ReactAgent:
         )
         return completion
 
+    async def _aget_completion(self,model_name,content,**params):
+        completion = await self.async_client.chat.completions.create(
+            model=model_name,
+            messages=[
+                {
+                    "role": "user",
+                    "content": content,
+                },
+            ],
+            **params
+        )
+        return completion
+
     def run(self, query, reset=True) -> None:
 
         self.query = query
         
         if reset:
             self.__reset_agent()
+        self.prompt_base_tokens = len(self.enc.encode(self.agent_prompt(query=self.query, scratchpad='')))
 
         while not self.is_halted() and not self.is_finished():
             self.step()
 
         return self.answer, self.scratchpad, self.json_log
 
+    async def arun(self, query, reset=True) -> None:
+        """run() with the LLM calls awaited on the async client, so many agents can share one event loop."""
+
+        self.query = query
+        
+        if reset:
+            self.__reset_agent()
+        self.prompt_base_tokens = len(self.enc.encode(self.agent_prompt(query=self.query, scratchpad='')))
+
+        while not self.is_halted() and not self.is_finished():
+            await self.astep()
+
+        return self.answer, self.scratchpad, self.json_log
+
+    # A step is: think, act, then observe. The phases between the LLM calls are shared by step() and astep().
     def step(self) -> None:
+        self._begin_thought()
+        self._record_thought(self.prompt_agent())
+
+        self._begin_action()
+        action = self.prompt_agent()
+        if not self._record_action(action):
+            return
+
+        self._observe(action)
+
+    async def astep(self) -> None:
+        self._begin_thought()
+        self._record_thought(await self.aprompt_agent())
+
+        self._begin_action()
+        action = await self.aprompt_agent()
+        if not self._record_action(action):
+            return
+
+        planner_observation = None
+        if not (action == None or action == '' or action == '\n'):
+            action_type, action_arg = parse_action(action)
+            if action_type == 'Planner':
+                planner_observation = str(await self.tools['planner'].arun(str(self.tools['notebook'].list_all()),action_arg))
+        self._observe(action, planner_observation)
+
+    @property
+    def scratchpad(self) -> str:
+        return ''.join(segment.render() for segment in self.scratchpad_segments)
+
+    def _append_scratchpad(self, text: str, kind: str = 'observation') -> "ScratchpadSegment":
+        """Append a segment to the scratchpad; only the appended text is encoded to keep the token count current."""
+        segment = ScratchpadSegment(kind, text, len(self.enc.encode(text)))
+        self.scratchpad_segments.append(segment)
+        self.scratchpad_tokens += segment.tokens
+        return segment
+
+    def _append_current_data(self, text: str) -> None:
+        """Append the observation that shows current_data; _mask_current_data() masks this segment."""
+        self.current_data_segment = self._append_scratchpad(text)
+
+    def _mask_current_data(self) -> None:
+        """Mask the observation of the previous tool data, adjusting the token count by the segment's change."""
+        segment = self.current_data_segment
+        if segment is not None and not segment.masked:
+            segment.masked = True
+            self.scratchpad_tokens += len(self.enc.encode(segment.render())) - segment.tokens
+
+    def _last_line(self) -> str:
+        """scratchpad.split('\\n')[-1], rendered from the trailing segments only."""
+        pieces = []
+        for segment in reversed(self.scratchpad_segments):
+            text = segment.render()
+            if '\n' in text:
+                pieces.append(text.rsplit('\n', 1)[1])
+                break
+            pieces.append(text)
+        return ''.join(reversed(pieces))
+
+    def prompt_tokens(self) -> int:
+        """
+        Tokens of the agent prompt, counted as the prompt without scratchpad plus the scratchpad pieces
+        encoded as they were appended. Pieces start at a space or newline, where the tokenizer splits
+        anyway, so this matches encoding the whole prompt up to the odd token at a piece boundary.
+        """
+        return self.prompt_base_tokens + self.scratchpad_tokens
+
+    def _begin_thought(self) -> None:
 
         self.json_log.append({"step": self.step_n, "thought":"",
                               "action": "", "observation": "", "state":""})
 
-        self.scratchpad += f'\nThought {self.step_n}:'
-        self.scratchpad += ' ' + self.prompt_agent()
-
-        print(self.scratchpad.split('\n')[-1])
-        self.json_log[-1]['thought'] = self.scratchpad.split('\n')[-1].replace(f'\nThought {self.step_n}:',"")
+        self._append_scratchpad(f'\nThought {self.step_n}:', 'thought')
+    def _record_thought(self, thought: str) -> None:
+        self._append_scratchpad(' ' + thought, 'thought')
+        print(self._last_line())
+        self.json_log[-1]['thought'] = self._last_line().replace(f'\nThought {self.step_n}:',"")
         # self.log_file.write(self.scratchpad.split('\n')[-1] + '\n')
 
+    def _begin_action(self) -> None:
         # Act
-        self.scratchpad += f'\nAction {self.step_n}:'
-        action = self.prompt_agent()
+        self._append_scratchpad(f'\nAction {self.step_n}:', 'action')
+    def _record_action(self, action: str) -> bool:
+        """Record the action; False if the agent stopped because of it and the step ends here."""
 
         if action == None or action == '' or action == '\n':
-            self.scratchpad += " Your action is filtered due to content. Please make sure your action does not start with ['\\n', 'Thought', 'Action', 'Observation'] and assume all the actions are permitted in this environment and take the action again."
+            self._append_scratchpad(" Your action is filtered due to content. Please make sure your action does not start with ['\\n', 'Thought', 'Action', 'Observation'] and assume all the actions are permitted in this environment and take the action again.", 'action')
         else:
-            self.scratchpad += ' ' + action
-
-
+            self._append_scratchpad(' ' + action, 'action')
         if len(self.last_actions) > 0 and self.last_actions[-1] != action:
             self.last_actions.clear()
 
         # refresh last_action list
         self.last_actions.append(action)
 
-        self.json_log[-1]['action'] = self.scratchpad.split('\n')[-1].replace(f'\nAction {self.step_n}:',"")
+        self.json_log[-1]['action'] = self._last_line().replace(f'\nAction {self.step_n}:',"")
 
 
         # examine if the same action has been repeated 3 times consecutively
@@ -178,21 +312,23 @@ class ReactAgent:
             # self.log_file.write("The same action has been repeated 3 times consecutively. So we stop here.")
             self.json_log[-1]['state'] = 'same action 3 times repeated'
             self.finished = True
-            return
+            return False
 
 
         # action_type, action_arg = parse_action(action)
-        print(self.scratchpad.split('\n')[-1])
+        print(self._last_line())
         # self.log_file.write(self.scratchpad.split('\n')[-1]+'\n')
+        return True
 
-        # Observe
-        self.scratchpad += f'\nObservation {self.step_n}: '
+    def _observe(self, action: str, planner_observation: str = None) -> None:
+        """Run the action and record its observation. astep() passes the planner's answer in, already awaited."""
 
+        # Observe
+        self._append_scratchpad(f'\nObservation {self.step_n}: ')
         if action == None or action == '' or action == '\n':
             action_type = None 
             action_arg = None
-            self.scratchpad += "No feedback from the environment due to the null action. Please make sure your action does not start with [Thought, Action, Observation]."
-        
+            self._append_scratchpad("No feedback from the environment due to the null action. Please make sure your action does not start with [Thought, Action, Observation].")
         else:
             action_type, action_arg = parse_action(action)
             
@@ -223,130 +359,130 @@ class ReactAgent:
             if action_type == 'FlightSearch':
                 try:
                     if validate_date_format(action_arg.split(', ')[2]) and validate_city_format(action_arg.split(', ')[0],self.city_set ) and validate_city_format(action_arg.split(', ')[1],self.city_set):
-                        self.scratchpad = self.scratchpad.replace(to_string(self.current_data).strip(),'Masked due to limited length. Make sure the data has been written in Notebook.')
+                        self._mask_current_data()
                         self.current_data = self.tools['flights'].run(action_arg.split(', ')[0], action_arg.split(', ')[1], action_arg.split(', ')[2])
                         self.current_observation = str(to_string(self.current_data))
-                        self.scratchpad += self.current_observation 
+                        self._append_current_data(self.current_observation)
                         self.__reset_record()
                         self.json_log[-1]['state'] = f'Successful'
 
                 except DateError:
                     self.retry_record['flights'] += 1
                     self.current_observation = f"'{action_arg.split(', ')[2]}' is not in the format YYYY-MM-DD"
-                    self.scratchpad += f"'{action_arg.split(', ')[2]}' is not in the format YYYY-MM-DD"
+                    self._append_scratchpad(f"'{action_arg.split(', ')[2]}' is not in the format YYYY-MM-DD")
                     self.json_log[-1]['state'] = f'Illegal args. DateError'
 
                 except ValueError as e:
                     self.retry_record['flights'] += 1
                     self.current_observation = str(e)
-                    self.scratchpad += str(e)
+                    self._append_scratchpad(str(e))
                     self.json_log[-1]['state'] = f'Illegal args. City Error'
 
                 except Exception as e:
                     print(e)
                     self.retry_record['flights'] += 1
                     self.current_observation = f'Illegal Flight Search. Please try again.'
-                    self.scratchpad += f'Illegal Flight Search. Please try again.'
+                    self._append_scratchpad(f'Illegal Flight Search. Please try again.')
                     self.json_log[-1]['state'] = f'Illegal args. Other Error'
 
             elif action_type == 'AttractionSearch':
 
                 try:
                     if validate_city_format(action_arg, self.city_set):
-                        self.scratchpad = self.scratchpad.replace(to_string(self.current_data).strip().strip(),'Masked due to limited length. Make sure the data has been written in Notebook.')
+                        self._mask_current_data()
                         self.current_data = self.tools['attractions'].run(action_arg)
                         self.current_observation = to_string(self.current_data).strip('\n').strip()
-                        self.scratchpad += self.current_observation
+                        self._append_current_data(self.current_observation)
                         self.__reset_record()
                         self.json_log[-1]['state'] = f'Successful'
                 except ValueError as e:
                     self.retry_record['attractions'] += 1
                     self.current_observation = str(e)
-                    self.scratchpad += str(e)
+                    self._append_scratchpad(str(e))
                     self.json_log[-1]['state'] = f'Illegal args. City Error'
                 except Exception as e:
                     print(e)
                     self.retry_record['attractions'] += 1
                     self.current_observation = f'Illegal Attraction Search. Please try again.'
-                    self.scratchpad += f'Illegal Attraction Search. Please try again.'
+                    self._append_scratchpad(f'Illegal Attraction Search. Please try again.')
                     self.json_log[-1]['state'] = f'Illegal args. Other Error'
 
             elif action_type == 'AccommodationSearch':
 
                 try:
                     if validate_city_format(action_arg, self.city_set):
-                        self.scratchpad = self.scratchpad.replace(to_string(self.current_data).strip().strip(),'Masked due to limited length. Make sure the data has been written in Notebook.')
+                        self._mask_current_data()
                         self.current_data = self.tools['accommodations'].run(action_arg)
                         self.current_observation = to_string(self.current_data).strip('\n').strip()
-                        self.scratchpad += self.current_observation
+                        self._append_current_data(self.current_observation)
                         self.__reset_record()
                         self.json_log[-1]['state'] = f'Successful'
                 except ValueError as e :
                     self.retry_record['accommodations'] += 1
                     self.current_observation = str(e)
-                    self.scratchpad += str(e)
+                    self._append_scratchpad(str(e))
                     self.json_log[-1]['state'] = f'Illegal args. City Error'
                 except Exception as e:
                     print(e)
                     self.retry_record['accommodations'] += 1
                     self.current_observation = f'Illegal Accommodation Search. Please try again.'
-                    self.scratchpad += f'Illegal Accommodation Search. Please try again.'
+                    self._append_scratchpad(f'Illegal Accommodation Search. Please try again.')
                     self.json_log[-1]['state'] = f'Illegal args. Other Error'
 
             elif action_type == 'RestaurantSearch':
 
                 try:
                     if validate_city_format(action_arg, self.city_set):
-                        self.scratchpad = self.scratchpad.replace(to_string(self.current_data).strip().strip(),'Masked due to limited length. Make sure the data has been written in Notebook.')
+                        self._mask_current_data()
                         self.current_data = self.tools['restaurants'].run(action_arg)
                         self.current_observation = to_string(self.current_data).strip()
-                        self.scratchpad += self.current_observation
+                        self._append_current_data(self.current_observation)
                         self.__reset_record()
                         self.json_log[-1]['state'] = f'Successful'
 
                 except ValueError as e:
                     self.retry_record['restaurants'] += 1
                     self.current_observation = str(e)
-                    self.scratchpad += str(e)
+                    self._append_scratchpad(str(e))
                     self.json_log[-1]['state'] = f'Illegal args. City Error'
 
                 except Exception as e:
                     print(e)
                     self.retry_record['restaurants'] += 1
                     self.current_observation = f'Illegal Restaurant Search. Please try again.'
-                    self.scratchpad += f'Illegal Restaurant Search. Please try again.'
+                    self._append_scratchpad(f'Illegal Restaurant Search. Please try again.')
                     self.json_log = f'Illegal args. Other Error'
                     
             elif action_type == "CitySearch":
                 try:
-                    self.scratchpad = self.scratchpad.replace(to_string(self.current_data).strip(),'Masked due to limited length. Make sure the data has been written in Notebook.')
+                    self._mask_current_data()
                     # self.current_data = self.tools['cities'].run(action_arg)
                     self.current_observation = to_string(self.tools['cities'].run(action_arg)).strip()
-                    self.scratchpad += self.current_observation
+                    self._append_scratchpad(self.current_observation)
                     self.__reset_record()
                     self.json_log[-1]['state'] = f'Successful'
 
                 except ValueError as e:
                     self.retry_record['cities'] += 1
                     self.current_observation = str(e)
-                    self.scratchpad += str(e)
+                    self._append_scratchpad(str(e))
                     self.json_log[-1]['state'] = f'Illegal args. State Error'
 
                 except Exception as e:
                     print(e)
                     self.retry_record['cities'] += 1
                     self.current_observation = f'Illegal City Search. Please try again.'
-                    self.scratchpad += f'Illegal City Search. Please try again.'
+                    self._append_scratchpad(f'Illegal City Search. Please try again.')
                     self.json_log = f'Illegal args. Other Error'
 
 
             elif action_type == 'GoogleDistanceMatrix':
 
                 try:
-                    self.scratchpad = self.scratchpad.replace(to_string(self.current_data).strip(),'Masked due to limited length. Make sure the data has been written in Notebook.')
+                    self._mask_current_data()
                     self.current_data = self.tools['googleDistanceMatrix'].run(action_arg.split(', ')[0],action_arg.split(', ')[1],action_arg.split(', ')[2])
                     self.current_observation =  to_string(self.current_data)
-                    self.scratchpad += self.current_observation 
+                    self._append_current_data(self.current_observation)
                     self.__reset_record()
                     self.json_log[-1]['state'] = f'Successful'
 
@@ -354,15 +490,15 @@ class ReactAgent:
                     print(e)
                     self.retry_record['googleDistanceMatrix'] += 1
                     self.current_observation = f'Illegal GoogleDistanceMatrix. Please try again.'
-                    self.scratchpad += f'Illegal GoogleDistanceMatrix. Please try again.'
+                    self._append_scratchpad(f'Illegal GoogleDistanceMatrix. Please try again.')
                     self.json_log[-1]['state'] = f'Illegal args. Other Error'
             
             
             elif action_type == 'NotebookWrite':
                 try:
-                    self.scratchpad = self.scratchpad.replace(to_string(self.current_data).strip(),'Masked due to limited length. Make sure the data has been written in Notebook.')
+                    self._mask_current_data()
                     self.current_observation = str(self.tools['notebook'].write(self.current_data, action_arg))
-                    self.scratchpad  +=  self.current_observation
+                    self._append_scratchpad(self.current_observation)
                     self.__reset_record()
                     self.json_log[-1]['state'] = f'Successful'
 
@@ -370,15 +506,17 @@ class ReactAgent:
                     print(e)
                     self.retry_record['notebook'] += 1
                     self.current_observation = f'{e}'
-                    self.scratchpad += f'{e}'
+                    self._append_scratchpad(f'{e}')
                     self.json_log[-1]['state'] = f'Illegal args. Other Error'
             
 
             elif action_type == "Planner":
                 # try:
 
-                    self.current_observation = str(self.tools['planner'].run(str(self.tools['notebook'].list_all()),action_arg))
-                    self.scratchpad  +=  self.current_observation
+                    if planner_observation is None:
+                        planner_observation = str(self.tools['planner'].run(str(self.tools['notebook'].list_all()),action_arg))
+                    self.current_observation = planner_observation
+                    self._append_scratchpad(self.current_observation)
                     self.answer = self.current_observation
                     self.__reset_record()
                     self.json_log[-1]['state'] = f'Successful'
@@ -387,7 +525,7 @@ class ReactAgent:
                 self.retry_record['invalidAction'] += 1
                 self.current_observation = 'Invalid Action. Valid Actions are  FlightSearch[Departure City, Destination City, Date] / ' \
                                    'AccommodationSearch[City] /  RestaurantSearch[City] / NotebookWrite[Short Description] / AttractionSearch[City] / CitySearch[State] / GoogleDistanceMatrix[Origin, Destination, Mode] and Planner[Query].'
-                self.scratchpad += self.current_observation
+                self._append_scratchpad(self.current_observation)
                 self.json_log[-1]['state'] = f'invalidAction'
 
         if (action == None) or (action == '') or (action == '\n'):
@@ -410,15 +548,30 @@ class ReactAgent:
 
     def prompt_agent(self) -> str:
         while True:
+            prompt = self._build_agent_prompt()
             try:
-                request = format_step(self.llm(content=self._build_agent_prompt()).choices[0].message.content)
+                request = format_step(self.llm(content=prompt).choices[0].message.content)
                 return request
             except:
                 catch_openai_api_error()
-                print(self._build_agent_prompt())
-                print(len(self.enc.encode(self._build_agent_prompt())))
+                print(prompt)
+                print(self.prompt_tokens())
                 time.sleep(5)
 
+    async def aprompt_agent(self) -> str:
+        while True:
+            prompt = self._build_agent_prompt()
+            try:
+                request = format_step((await self.allm(content=prompt)).choices[0].message.content)
+                return request
+            except asyncio.CancelledError:
+                raise
+            except openai.OpenAIError as error:
+                # Rate limits, connection and API errors; anything else fails this session.
+                print(prompt)
+                print(self.prompt_tokens())
+                await abackoff_openai_api_error(error)
+
     def _build_agent_prompt(self) -> str:
         if self.mode == "zero_shot":
             return self.agent_prompt(
@@ -431,13 +584,15 @@ class ReactAgent:
 
     def is_halted(self) -> bool:
         return ((self.step_n > self.max_steps) or (
-                    len(self.enc.encode(self._build_agent_prompt())) > self.max_token_length)) and not self.finished
+                    self.prompt_tokens() > self.max_token_length)) and not self.finished
 
     def __reset_agent(self) -> None:
         self.step_n = 1
         self.finished = False
         self.answer = ''
-        self.scratchpad: str = ''
+        self.scratchpad_segments = []
+        self.scratchpad_tokens = 0
+        self.current_data_segment = None
         self.__reset_record()
         self.json_log = []
         self.current_observation = ''
@@ -454,7 +609,13 @@ class ReactAgent:
 
     def load_tools(self, tools: List[str], planner_model_name=None) -> Dict[str, Any]:
         tools_map = {}
+        sandbox = get_sandbox()
         for tool_name in tools:
+            # Database-backed tools are shared with every other module of the process
+            if tool_name in sandbox:
+                tools_map[tool_name] = sandbox.get(tool_name)
+                continue
+
             module = importlib.import_module("travelplanner.tools.{}.apis".format(tool_name))
             
             # Avoid instantiating the planner tool twice 
@@ -587,12 +748,70 @@ def parse_args_string(s: str) -> dict:
 def to_string(data) -> str:
     if data is not None:
         if type(data) == DataFrame:
-            return data.to_string(index=False)
+            return frame_to_text(data)
         else:
             return str(data)
     else:
         return str(None)
 
+def result_path(directory: str, result_prefix: str, number: int) -> str:
+    return os.path.join(directory, f'{result_prefix}{number}.json')
+
+def save_result(path: str, model_name: str, planner_results, scratchpad, action_log) -> None:
+    """Add the two-stage results of one query to its result file, keeping whatever else the file holds."""
+    result =  [{}]
+    if os.path.exists(path):
+        with open(path,"r") as f:
+            result = json.load(f)
+
+    if planner_results == 'Max Token Length Exceeded.':
+        result[-1][f'{model_name}_two-stage_results_logs'] = scratchpad 
+        result[-1][f'{model_name}_two-stage_results'] = 'Max Token Length Exceeded.'
+        action_log[-1]['state'] = 'Max Token Length of Planner Exceeded.'
+        result[-1][f'{model_name}_two-stage_action_logs'] = action_log
+    else:
+        result[-1][f'{model_name}_two-stage_results_logs'] = scratchpad 
+        result[-1][f'{model_name}_two-stage_results'] = planner_results
+        result[-1][f'{model_name}_two-stage_action_logs'] = action_log
+
+    # write to json file
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=4)
+
+async def run_queries_async(agents: List[ReactAgent], queries: List[tuple], directory: str, result_prefix: str, model_name: str) -> None:
+    """
+    Run the (number, query) pairs concurrently, each on one of `agents`. An agent runs one query at
+    a time, so len(agents) bounds the number of sessions (and LLM requests) in flight. A query whose
+    session raises is reported and skipped without cancelling the others.
+    """
+    idle_agents = asyncio.Queue()
+    for agent in agents:
+        idle_agents.put_nowait(agent)
+    progress = tqdm(total=len(queries))
+
+    failures = []
+
+    async def run_query(number, query):
+        agent = await idle_agents.get()
+        try:
+            while True:
+                planner_results, scratchpad, action_log  = await agent.arun(query)
+                if planner_results != None:
+                    break
+            save_result(result_path(directory, result_prefix, number), model_name, planner_results, scratchpad, action_log)
+        except Exception as error:
+            # A failed session only loses its own result file; the other queries keep running.
+            print(f"Query {number} failed: {type(error).__name__}: {error}")
+            failures.append(number)
+        finally:
+            idle_agents.put_nowait(agent)
+            progress.update(1)
+
+    await asyncio.gather(*(run_query(number, query) for number, query in queries))
+    progress.close()
+    if failures:
+        print(f"{len(failures)} of {len(queries)} queries failed: {sorted(failures)}")
+
 if __name__ == '__main__':
 
     tools_list = ["notebook","flights","attractions","accommodations","restaurants","googleDistanceMatrix","planner","cities"]
@@ -603,49 +822,40 @@ if __name__ == '__main__':
     parser.add_argument("--model_name", type=str, default="gpt-4o-mini-2024-07-18")
     parser.add_argument("--output_dir", type=str, default="./results")
     parser.add_argument("--strategy", type=str, default="direct")
+    parser.add_argument("--lazy_flights", action="store_true", help="Read flight partitions per origin on demand instead of the whole table.")
+    parser.add_argument("--compact_flights", action="store_true", help="Keep the flights table in the compact encoded layout.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Number of queries run concurrently on the async client; their console output interleaves.")
     args = parser.parse_args()
     directory = f'{args.output_dir}/{args.set_type}'
 
-    if args.set_type == 'train':
-        query_data_list  = load_dataset('osunlp/TravelPlanner','train')['train']
-    elif args.set_type == 'validation':
-        query_data_list  = load_dataset('osunlp/TravelPlanner','validation')['validation']
-    else:
-        query_data_list  = load_dataset('osunlp/TravelPlanner','test')['test']
+    if args.lazy_flights or args.compact_flights:
+        get_sandbox().configure("flights", lazy=args.lazy_flights, compact=args.compact_flights)
+
+    query_data_list = load_query_set(args.set_type)
     result_prefix = args.result_prefix
 
     if args.create_subset.lower() == "yes":
         # Create a subset of the dataset
-        query_data_list = query_data_list.train_test_split(test_size=0.2,shuffle=False,seed=42)["test"]
+        query_data_list = sample_subset(query_data_list)
         result_prefix = f"sample_{args.result_prefix}"
     
     numbers = [i for i in range(1,len(query_data_list)+1)]
-    agent = ReactAgent(None, tools=tools_list,max_steps=30,react_llm_name=args.model_name,planner_llm_name=args.model_name)
-    for number in tqdm(numbers[:]):
-        query = query_data_list[number-1]['query']
-            # check if the directory exists
-        if not os.path.exists(os.path.join(f'{args.output_dir}/{args.set_type}')):
-            os.makedirs(os.path.join(f'{args.output_dir}/{args.set_type}'))
-        result =  [{}]
-        if os.path.exists(os.path.join(f'{args.output_dir}/{args.set_type}/{result_prefix}{number}.json')):
-            with open(os.path.join(f'{args.output_dir}/{args.set_type}/{result_prefix}{number}.json'),"r") as f:
-                result = json.load(f)
-            
-        while True:
-            planner_results, scratchpad, action_log  = agent.run(query)
-            if planner_results != None:
-                break
-        
-        if planner_results == 'Max Token Length Exceeded.':
-            result[-1][f'{args.model_name}_two-stage_results_logs'] = scratchpad 
-            result[-1][f'{args.model_name}_two-stage_results'] = 'Max Token Length Exceeded.'
-            action_log[-1]['state'] = 'Max Token Length of Planner Exceeded.'
-            result[-1][f'{args.model_name}_two-stage_action_logs'] = action_log
-        else:
-            result[-1][f'{args.model_name}_two-stage_results_logs'] = scratchpad 
-            result[-1][f'{args.model_name}_two-stage_results'] = planner_results
-            result[-1][f'{args.model_name}_two-stage_action_logs'] = action_log
+    # check if the directory exists
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    if args.concurrency > 1:
+        agents = [ReactAgent(None, tools=tools_list,max_steps=30,react_llm_name=args.model_name,planner_llm_name=args.model_name) for _ in range(args.concurrency)]
+        queries = [(number, query_data_list[number-1]['query']) for number in numbers]
+        asyncio.run(run_queries_async(agents, queries, directory, result_prefix, args.model_name))
+    else:
+        agent = ReactAgent(None, tools=tools_list,max_steps=30,react_llm_name=args.model_name,planner_llm_name=args.model_name)
+        for number in tqdm(numbers[:]):
+            query = query_data_list[number-1]['query']
+
+            while True:
+                planner_results, scratchpad, action_log  = agent.run(query)
+                if planner_results != None:
+                    break
 
-        # write to json file
-        with open(os.path.join(f'{args.output_dir}/{args.set_type}/{result_prefix}{number}.json'), 'w') as f:
-            json.dump(result, f, indent=4)
\ No newline at end of file
+            save_result(result_path(directory, result_prefix, number), args.model_name, planner_results, scratchpad, action_log)
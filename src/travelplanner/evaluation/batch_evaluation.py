@@ -0,0 +1,354 @@
+"""
+Batch evaluation of a whole submission.
+
+batch_evaluate() flattens every plan into one columnar table with a row per plan, day and entity
+(transportation, meals, each attraction, accommodation), resolves each distinct entity against the
+sandbox once for the whole submission, and computes the sandbox, minimum-nights, budget, room rule,
+room type and cuisine results with group-by operations over that table. The structural checks that
+only look at the plan text (city route, repeated restaurants and attractions, transportation
+conflicts, current city, completeness) are cheap and still run per plan.
+
+The results are the same as commonsense_constraint.evaluation and hard_constraint.evaluation.
+Plans whose shape the columnar path does not model (non-dict days, missing or non-string fields,
+transportation that the checkers cannot parse) are evaluated by those functions directly.
+"""
+import math
+import numpy as np
+import pandas as pd
+from travelplanner.utils.plan_parser import get_valid_name_city, extract_before_parenthesis, extract_from_to
+from travelplanner.tools.sandbox import get_sandbox
+from travelplanner.evaluation.plan_resolution import PlanResolution, resolve_plan
+from travelplanner.evaluation import commonsense_constraint as commonsense
+from travelplanner.evaluation import hard_constraint as hard
+
+sandbox = get_sandbox()
+flight = sandbox.flights
+accommodation = sandbox.accommodations
+restaurants = sandbox.restaurants
+googleDistanceMatrix = sandbox.googleDistanceMatrix
+attractions = sandbox.attractions
+
+FIELDS = ['current_city', 'transportation', 'breakfast', 'lunch', 'dinner', 'attraction', 'accommodation']
+MEALS = ['breakfast', 'lunch', 'dinner']
+
+HOUSE_RULES = ['smoking', 'parties', 'children under 10', 'visitors', 'pets']
+# Room type constraint -> (room type of the listing, whether the listing must have it or must not).
+ROOM_TYPES = {'not shared room': ('Shared room', False), 'shared room': ('Shared room', True),
+              'private room': ('Private room', True), 'entire room': ('Entire home/apt', True)}
+
+
+def _filled(value: str) -> bool:
+    return value != '' and value != '-'
+
+
+def _transportation_kind(value: str):
+    lowered = value.lower()
+    if 'flight number' in lowered:
+        return 'flight'
+    elif 'self-driving' in lowered:
+        return 'self-driving'
+    elif 'taxi' in lowered:
+        return 'taxi'
+    return None
+
+
+def _transportation_route(unit: dict):
+    org_city, dest_city = extract_from_to(unit['transportation'])
+    if org_city is None or dest_city is None:
+        org_city, dest_city = extract_from_to(unit['current_city'])
+    return org_city, dest_city
+
+
+def is_supported(question, tested_data) -> bool:
+    """Whether the columnar path models this plan; other plans go through the per-plan checkers."""
+    if not tested_data:
+        return False
+    for i in range(min(question['days'], len(tested_data))):
+        unit = tested_data[i]
+        if not isinstance(unit, dict) or not all(isinstance(unit.get(key), str) for key in FIELDS):
+            return False
+        if not _filled(unit['transportation']):
+            continue
+        kind = _transportation_kind(unit['transportation'])
+        if kind is None:
+            continue
+        # Unparseable routes make the per-plan checker raise (flights) or print a warning (driving).
+        if None in _transportation_route(unit):
+            return False
+        if kind == 'flight' and 'Flight Number: ' not in unit['transportation']:
+            return False
+    return True
+
+
+def evaluate_one(question, tested_data):
+    """Per-plan evaluation with the same gating as eval.py: hard constraints only for complete plans within the sandbox."""
+    if not tested_data:
+        return None, None
+    resolved = resolve_plan(question, tested_data)
+    commonsense_info_box = commonsense.evaluation(question, tested_data, resolved)
+    if commonsense_info_box['is_not_absent'][0] and commonsense_info_box['is_valid_information_in_sandbox'][0]:
+        return commonsense_info_box, hard.evaluation(question, tested_data, resolved)
+    return commonsense_info_box, None
+
+
+def flatten(questions, plans):
+    """
+    One row per plan, day and entity, in the order the checkers visit them: transportation, breakfast,
+    lunch, dinner, each attraction, accommodation. Empty fields are left out, except that `stays`
+    keeps every day's accommodation text for the minimum-nights runs.
+    """
+    entities = {'plan': [], 'day': [], 'slot': [], 'kind': [], 'text': [], 'org': [], 'dest': []}
+    stays = {'plan': [], 'day': [], 'text': []}
+
+    def add(plan, day, slot, kind, text, org=None, dest=None):
+        entities['plan'].append(plan)
+        entities['day'].append(day)
+        entities['slot'].append(slot)
+        entities['kind'].append(kind)
+        entities['text'].append(text)
+        entities['org'].append(org)
+        entities['dest'].append(dest)
+
+    for plan, (question, tested_data) in enumerate(zip(questions, plans)):
+        for i in range(min(question['days'], len(tested_data))):
+            unit = tested_data[i]
+            if _filled(unit['transportation']):
+                kind = _transportation_kind(unit['transportation'])
+                if kind is not None:
+                    org_city, dest_city = _transportation_route(unit)
+                    add(plan, i, 'transportation', kind, unit['transportation'],
+                        extract_before_parenthesis(org_city), extract_before_parenthesis(dest_city))
+            for meal in MEALS:
+                if _filled(unit[meal]):
+                    add(plan, i, meal, 'restaurant', unit[meal])
+            if _filled(unit['attraction']):
+                for attraction in unit['attraction'].split(';')[:-1]:
+                    add(plan, i, 'attraction', 'attraction', attraction)
+            if _filled(unit['accommodation']):
+                add(plan, i, 'accommodation', 'accommodation', unit['accommodation'])
+            stays['plan'].append(plan)
+            stays['day'].append(i)
+            stays['text'].append(unit['accommodation'])
+    return pd.DataFrame(entities), pd.DataFrame(stays)
+
+
+def _resolve_names(entities: pd.DataFrame) -> pd.DataFrame:
+    """Look up each distinct (kind, text) once: its match count, its city and the first matching row's attributes."""
+    tools = {'restaurant': restaurants, 'attraction': attractions, 'accommodation': accommodation}
+    keys = entities.loc[entities['kind'].isin(list(tools)), ['kind', 'text']].drop_duplicates(ignore_index=True)
+    cities, counts, firsts = [], [], []
+    for kind, text in keys.itertuples(index=False, name=None):
+        name, city = get_valid_name_city(text)
+        positions = tools[kind].name_positions(name, city)
+        cities.append(city)
+        counts.append(len(positions))
+        firsts.append(positions[0] if len(positions) else -1)
+    keys['city'] = cities
+    keys['count'] = np.array(counts, dtype=np.int64)
+    first = np.array(firsts, dtype=np.int64)
+
+    for kind, tool, columns in [('restaurant', restaurants, {'Average Cost': 'price', 'Cuisines': 'cuisines'}),
+                                ('accommodation', accommodation, {'price': 'price', 'maximum occupancy': 'occupancy',
+                                                                  'minimum nights': 'minimum_nights', 'house_rules': 'house_rules',
+                                                                  'room type': 'room_type'})]:
+        found = ((keys['kind'] == kind) & (keys['count'] > 0)).to_numpy()
+        rows = tool.data.iloc[first[found]]
+        for source, target in columns.items():
+            if target not in keys:
+                keys[target] = pd.Series(np.nan if source not in ('Cuisines', 'house_rules', 'room type') else None,
+                                         index=keys.index, dtype=object)
+            keys.loc[found, target] = rows[source].to_numpy(dtype=object)
+    return keys
+
+
+def _resolve_transportation(entities: pd.DataFrame, people: np.ndarray) -> pd.DataFrame:
+    """Validity and total cost of every transportation row, from one flight lookup and one distance-matrix lookup per mode."""
+    valid = np.zeros(len(entities), dtype=bool)
+    cost = np.zeros(len(entities))
+    kinds = entities['kind'].to_numpy()
+    headcount = people[entities['plan'].to_numpy()]
+
+    flights = kinds == 'flight'
+    if flights.any():
+        texts = entities.loc[flights, 'text']
+        numbers = [text.split('Flight Number: ')[1].split(',')[0] for text in texts]
+        found = flight.lookup_flights(numbers)
+        valid[flights] = (found['OriginCityName'].to_numpy(dtype=object) == entities.loc[flights, 'org'].to_numpy(dtype=object)) \
+            & (found['DestCityName'].to_numpy(dtype=object) == entities.loc[flights, 'dest'].to_numpy(dtype=object))
+        cost[flights] = np.where(valid[flights], found['Price'].to_numpy(dtype=float, na_value=np.nan), 0) * headcount[flights]
+
+    for mode, seats in [('self-driving', 5), ('taxi', 4)]:
+        rows = kinds == mode
+        if rows.any():
+            routes = entities.loc[rows, ['org', 'dest']].to_numpy(dtype=object).tolist()
+            unit_cost = googleDistanceMatrix.route_costs(routes, mode)
+            valid[rows] = ~np.isnan(unit_cost)
+            cost[rows] = np.nan_to_num(unit_cost) * np.ceil(headcount[rows] / seats)
+    return pd.DataFrame({'valid': valid, 'cost': cost}, index=entities.index)
+
+
+def _sandbox_results(entities: pd.DataFrame, n: int) -> list:
+    """is_valid_information_in_sandbox: the first entity, in visiting order, that is not in the sandbox."""
+    results = [(True, None)] * n
+    invalid = entities[~entities['valid']].groupby('plan', sort=False).head(1)
+    for plan, day, slot, kind, text in invalid[['plan', 'day', 'slot', 'kind', 'text']].itertuples(index=False, name=None):
+        if slot == 'transportation':
+            label = 'flight number' if kind == 'flight' else kind
+        elif slot == 'attraction':
+            label = f"attraction {text}"
+        else:
+            label = slot
+        results[plan] = (False, f"The {label} in day {day+1} is invalid in the sandbox.")
+    return results
+
+
+def _accommodation_results(stays: pd.DataFrame, names: pd.DataFrame, n: int) -> list:
+    """is_valid_accommodation: runs of consecutive days in one accommodation must cover its minimum nights."""
+    results = [(True, None)] * n
+    if stays.empty:
+        return results
+    starts = (stays['plan'] != stays['plan'].shift()) | (stays['text'] != stays['text'].shift())
+    runs = stays.groupby(starts.cumsum(), sort=False).agg(plan=('plan', 'first'), text=('text', 'first'), nights=('day', 'size'))
+    runs = runs[runs['text'].map(_filled)]
+    runs = runs.merge(names[names['kind'] == 'accommodation'], on='text', how='left')
+    broken = runs[(runs['count'] == 1) & (runs['nights'] < runs['minimum_nights'].astype(float))].groupby('plan', sort=False).head(1)
+    for plan, text in broken[['plan', 'text']].itertuples(index=False, name=None):
+        results[plan] = (False, f"The accommodation {text} do not obey the minumum nights rule.")
+    return results
+
+
+def _any_per_plan(mask: pd.Series, plans: pd.Series, n: int) -> np.ndarray:
+    hit = np.zeros(n, dtype=bool)
+    hit[plans[mask.to_numpy(dtype=bool)].to_numpy()] = True
+    return hit
+
+
+def _room_rule_results(stays: pd.DataFrame, questions, n: int) -> list:
+    """valid_room_rule: no listing may forbid what the house rule constraint asks for."""
+    rule = stays['plan'].map(lambda plan: questions[plan]['local_constraint']['house rule'])
+    mask = pd.Series(False, index=stays.index)
+    for house_rule in HOUSE_RULES:
+        mask |= (rule == house_rule) & stays['house_rules'].astype(str).str.contains(f"No {house_rule}", regex=False)
+    broken = _any_per_plan(mask, stays['plan'], n)
+    results = []
+    for plan, question in enumerate(questions):
+        house_rule = question['local_constraint']['house rule']
+        if house_rule is None:
+            results.append((None, None))
+        else:
+            results.append((False, f"The house rule should be {house_rule}.") if broken[plan] else (True, None))
+    return results
+
+
+def _room_type_results(stays: pd.DataFrame, questions, n: int) -> list:
+    """valid_room_type: every listing must match the room type constraint."""
+    wanted = stays['plan'].map(lambda plan: questions[plan]['local_constraint']['room type'])
+    mask = pd.Series(False, index=stays.index)
+    for constraint, (room_type, required) in ROOM_TYPES.items():
+        matches = stays['room_type'] == room_type
+        mask |= (wanted == constraint) & (~matches if required else matches)
+    broken = _any_per_plan(mask, stays['plan'], n)
+    results = []
+    for plan, question in enumerate(questions):
+        room_type = question['local_constraint']['room type']
+        if room_type is None:
+            results.append((None, None))
+        else:
+            results.append((False, f"The room type should be {room_type}.") if broken[plan] else (True, None))
+    return results
+
+
+def _cuisine_results(meals: pd.DataFrame, questions, n: int) -> list:
+    """
+    valid_cuisine: every requested cuisine must be served by some meal. As in the per-plan checker,
+    a meal in the origin city ends that day's meals, so later meals of the day are not counted.
+    """
+    org = meals['plan'].map(lambda plan: questions[plan]['org'])
+    at_origin = (meals['city'] == org).astype(int)
+    counted = meals[(at_origin.groupby([meals['plan'], meals['day']]).cummax() == 0) & (meals['count'] > 0)]
+    # NUL never occurs in a cuisine, so a substring of the joined text is a substring of one restaurant's cuisines.
+    served = counted.groupby('plan')['cuisines'].agg('\x00'.join)
+    results = []
+    for plan, question in enumerate(questions):
+        cuisines = question['local_constraint']['cuisine']
+        if not cuisines:
+            results.append((None, None))
+            continue
+        text = served.get(plan, '')
+        missing = [cuisine for cuisine in cuisines if cuisine not in text]
+        results.append((False, f"The cuisine {missing[0]} is not satisfied.") if missing else (True, None))
+    return results
+
+
+def _evaluate_columnar(questions, plans) -> list:
+    n = len(plans)
+    entities, stays = flatten(questions, plans)
+    people = np.array([question['people_number'] for question in questions], dtype=float)
+
+    names = _resolve_names(entities)
+    entities = entities.merge(names, on=['kind', 'text'], how='left')
+    transportation = entities['slot'] == 'transportation'
+    moves = _resolve_transportation(entities[transportation], people)
+    entities['valid'] = entities['count'] > 0
+    entities.loc[transportation, 'valid'] = moves['valid']
+
+    # Every amount is a whole number of dollars, so the sum does not depend on the order of the terms.
+    headcount = people[entities['plan'].to_numpy()]
+    price = entities['price'].astype(float).fillna(0).to_numpy()
+    occupancy = entities['occupancy'].astype(float).fillna(1).to_numpy()
+    cost = np.where(entities['slot'].isin(MEALS), price * headcount, 0.0)
+    cost = np.where(entities['slot'] == 'accommodation', price * np.ceil(headcount / occupancy), cost)
+    cost[transportation.to_numpy()] = moves['cost'].to_numpy()
+    total_cost = np.bincount(entities['plan'].to_numpy(), weights=cost, minlength=n)
+
+    listings = entities[(entities['slot'] == 'accommodation') & (entities['count'] > 0)]
+    sandbox_results = _sandbox_results(entities, n)
+    accommodation_results = _accommodation_results(stays, names, n)
+    room_rule_results = _room_rule_results(listings, questions, n)
+    room_type_results = _room_type_results(listings, questions, n)
+    cuisine_results = _cuisine_results(entities[entities['slot'].isin(MEALS)], questions, n)
+
+    info_boxes = []
+    for plan, (question, tested_data) in enumerate(zip(questions, plans)):
+        # The structural checks read the plan text only; they share one resolution for its from/to parses.
+        resolved = PlanResolution()
+        commonsense_info_box = {
+            'is_reasonable_visiting_city': commonsense.is_reasonable_visiting_city(question, tested_data, resolved),
+            'is_valid_restaurants': commonsense.is_valid_restaurants(question, tested_data),
+            'is_valid_attractions': commonsense.is_valid_attractions(question, tested_data),
+            'is_valid_accommodation': accommodation_results[plan],
+            'is_valid_transportation': commonsense.is_valid_transportation(question, tested_data),
+            'is_valid_information_in_current_city': commonsense.is_valid_information_in_current_city(question, tested_data, resolved),
+            'is_valid_information_in_sandbox': sandbox_results[plan],
+            'is_not_absent': commonsense.is_not_absent(question, tested_data, resolved),
+        }
+        hard_info_box = None
+        if commonsense_info_box['is_not_absent'][0] and commonsense_info_box['is_valid_information_in_sandbox'][0]:
+            hard_info_box = {
+                'valid_cuisine': cuisine_results[plan],
+                'valid_room_rule': room_rule_results[plan],
+                'valid_transportation': hard.is_valid_transportation(question, tested_data),
+                'valid_room_type': room_type_results[plan],
+                'valid_cost': (bool(total_cost[plan] <= question['budget']), None),
+            }
+        info_boxes.append((commonsense_info_box, hard_info_box))
+    return info_boxes
+
+
+def batch_evaluate(pairs) -> list:
+    """
+    Evaluate (query_data, tested_plan) pairs as one batch. Returns one (commonsense_info_box,
+    hard_info_box) tuple per pair, in order, equal to what eval.evaluate_plan returns for it.
+    """
+    info_boxes = [None] * len(pairs)
+    columnar = []
+    for idx, (query_data, tested_plan) in enumerate(pairs):
+        if is_supported(query_data, tested_plan['plan']):
+            columnar.append(idx)
+        else:
+            info_boxes[idx] = evaluate_one(query_data, tested_plan['plan'])
+    if columnar:
+        results = _evaluate_columnar([pairs[idx][0] for idx in columnar], [pairs[idx][1]['plan'] for idx in columnar])
+        for idx, result in zip(columnar, results):
+            info_boxes[idx] = result
+    return info_boxes
@@ -1,9 +1,8 @@
-from utils.func import get_valid_name_city,extract_before_parenthesis,extract_numbers_from_filenames
-from tools.flights.apis import Flights
-from tools.accommodations.apis import Accommodations
-from tools.restaurants.apis import Restaurants
-from tools.googleDistanceMatrix.apis import GoogleDistanceMatrix
-from tools.attractions.apis import Attractions
+from travelplanner.utils.func import extract_numbers_from_filenames
+from travelplanner.utils.plan_parser import get_valid_name_city,extract_before_parenthesis,extract_from_to,transportation_match
+from travelplanner.tools.sandbox import get_sandbox
+from travelplanner.utils.city_registry import get_city_registry
+from travelplanner.evaluation.plan_resolution import PlanResolution, resolve_plan
 import math
 import json
 import re   
@@ -12,16 +11,14 @@ import sys
 from tqdm import tqdm
 import argparse
 
-flight = Flights()
-accommodation = Accommodations()
-restaurants = Restaurants()
-googleDistanceMatrix = GoogleDistanceMatrix()
-attractions = Attractions()
+sandbox = get_sandbox()
+flight = sandbox.flights
+accommodation = sandbox.accommodations
+restaurants = sandbox.restaurants
+googleDistanceMatrix = sandbox.googleDistanceMatrix
+attractions = sandbox.attractions
 
-city_state_set = []
-with open('./src/travelplanner/database/background/citySet_with_states.txt','r') as f:
-    city_state_set = f.read().split('\n')
-city_state_map = {x:y for x,y in [unit.split('\t') for unit in city_state_set]}
+city_state_map = get_city_registry().city_state
 
 
 def load_line_json_data(filename):
@@ -53,34 +50,6 @@ def count_consecutive_values(lst):
     return result
 
 
-def transportation_match(text: str):
-
-    if 'taxi' in text.lower():
-        return 'Taxi'
-    
-    elif 'self-driving' in text.lower():
-        return 'Self-driving'
-    
-    elif 'flight' in text.lower():
-        return 'Flight'
-
-
-def extract_from_to(text: str):
-    """
-    Extracts 'A' and 'B' from the format "from A to B" in the given text, with B ending at a comma or the end of the string.
-    
-    Args:
-    - text (str): The input string.
-    
-    Returns:
-    - tuple: A tuple containing 'A' and 'B'. If no match is found, returns (None, None).
-    """
-    pattern = r"from\s+(.+?)\s+to\s+([^,]+)(?=[,\s]|$)"
-    matches = re.search(pattern, text)
-    return matches.groups() if matches else (None, None)
-
-
-
 def is_valid_city_sequence(city_list):
     """
     Checks if the city sequence is valid. A valid sequence has every city (except the first and last) 
@@ -124,7 +93,8 @@ def is_valid_city_sequence(city_list):
 
 
 
-def is_reasonable_visiting_city(question, tested_data):
+def is_reasonable_visiting_city(question, tested_data, resolved=None):
+    resolved = resolved if resolved is not None else PlanResolution()
 
     city_list = []
     
@@ -133,7 +103,7 @@ def is_reasonable_visiting_city(question, tested_data):
         city_value = tested_data[i]['current_city']
 
         if 'from' in city_value:
-            city1, city2 = extract_from_to(city_value)
+            city1, city2 = resolved.from_to(city_value)
             city1 = extract_before_parenthesis(city1)
             city2 = extract_before_parenthesis(city2)
             if i==0 and  city1 != question['org']:
@@ -232,7 +202,81 @@ def is_valid_transportation(question, tested_data):
 
     return True, None
 
-def is_valid_information_in_current_city(question, tested_data):
+def current_city_day_check(i, unit, final_city_list):
+    """One day of is_valid_information_in_current_city: the failure tuple, or None if the day is fine."""
+    if 'transportation' in unit and unit['transportation'] and unit['transportation'] != '-':
+        for city in final_city_list:
+            if city not in unit['transportation']:
+                # print(city)
+                return False, f"The transportation in day {i+1} is invalid city choice."
+    # elif 'transportation' not in unit:
+    #     return False, f"No Transportation Info."
+
+    if 'breakfast' in unit and unit['breakfast'] and unit['breakfast'] != '-':
+
+        flag = False
+
+        for city in final_city_list:
+            if city  in unit['breakfast']:
+                flag = True
+
+        if not flag:
+            return False, f"The breakfast in day {i+1} is invalid city choice."
+    # elif 'breakfast' not in unit:
+    #     return False, f"No Breakfast Info."
+
+    if 'lunch' in unit and unit['lunch'] and unit['lunch'] != '-':
+        flag = False
+
+        for city in final_city_list:
+            if city  in unit['lunch']:
+                flag = True
+
+        if not flag:
+            return False, f"The lunch in day {i+1} is invalid city choice."
+    # elif 'lunch' not in unit:
+    #     return False, f"No Lunch Info."
+
+    if 'dinner' in unit and unit['dinner'] and unit['dinner'] != '-':
+        flag = False
+
+        for city in final_city_list:
+            if city  in unit['dinner']:
+                flag = True
+
+        if not flag:
+            return False, f"The dinner in day {i+1} is invalid city choice."
+    # elif 'dinner' not in unit:
+    #     return False, f"No Dinner Info."
+
+    if 'attraction' in unit and unit['attraction'] and unit['attraction'] != '-':
+
+        attraction_list = unit['attraction'].split(';')[:-1]
+
+        for attraction in attraction_list:
+            flag = False
+            for city in final_city_list:
+                if city  in attraction:
+                    flag = True
+            if not flag:
+                return False, f"The attraction in day {i+1} is invalid city choice."
+
+    # elif 'attraction' not in unit:
+    #     return False, f"No Attraction Info."
+
+
+    if 'accommodation' in unit and unit['accommodation'] and unit['accommodation'] != '-':
+
+        if final_city_list[-1] not in unit['accommodation']:
+            return False, f"The accommodation in day {i+1} is invalid city choice."
+
+    # elif 'accommodation' not in unit:
+    #     return False, f"No Accommodation Info."
+
+    return None
+
+def is_valid_information_in_current_city(question, tested_data, resolved=None):
+    resolved = resolved if resolved is not None else PlanResolution()
 
     for i in range(min(question['days'],len(tested_data))):
         unit = tested_data[i]
@@ -240,164 +284,101 @@ def is_valid_information_in_current_city(question, tested_data):
         final_city_list = []
 
         if 'from' in current_city:
-            city1, city2 = extract_from_to(current_city)
+            city1, city2 = resolved.from_to(current_city)
             city1 = extract_before_parenthesis(city1)
             city2 = extract_before_parenthesis(city2)
             final_city_list = [city1, city2]
         else:
             final_city_list = extract_before_parenthesis(current_city)
 
-        if 'transportation' in unit and unit['transportation'] and unit['transportation'] != '-':
-            for city in final_city_list:
-                if city not in unit['transportation']:
-                    # print(city)
-                    return False, f"The transportation in day {i+1} is invalid city choice."
-        # elif 'transportation' not in unit:
-        #     return False, f"No Transportation Info."
-        
-        if 'breakfast' in unit and unit['breakfast'] and unit['breakfast'] != '-':
-
-            flag = False
-
-            for city in final_city_list:
-                if city  in unit['breakfast']:
-                    flag = True
-
-            if not flag:
-                return False, f"The breakfast in day {i+1} is invalid city choice."
-        # elif 'breakfast' not in unit:
-        #     return False, f"No Breakfast Info."
-        
-        if 'lunch' in unit and unit['lunch'] and unit['lunch'] != '-':
-            flag = False
-
-            for city in final_city_list:
-                if city  in unit['lunch']:
-                    flag = True
-            
-            if not flag:
-                return False, f"The lunch in day {i+1} is invalid city choice."
-        # elif 'lunch' not in unit:
-        #     return False, f"No Lunch Info."
-            
-        if 'dinner' in unit and unit['dinner'] and unit['dinner'] != '-':
-            flag = False
-
-            for city in final_city_list:
-                if city  in unit['dinner']:
-                    flag = True
-            
-            if not flag:
-                return False, f"The dinner in day {i+1} is invalid city choice."
-        # elif 'dinner' not in unit:
-        #     return False, f"No Dinner Info."
-        
-        if 'attraction' in unit and unit['attraction'] and unit['attraction'] != '-':
-            
-            attraction_list = unit['attraction'].split(';')[:-1]
-
-            for attraction in attraction_list:
-                flag = False
-                for city in final_city_list:
-                    if city  in attraction:
-                        flag = True
-                if not flag:
-                    return False, f"The attraction in day {i+1} is invalid city choice."
-                
-        # elif 'attraction' not in unit:
-        #     return False, f"No Attraction Info."
-            
-            
-        if 'accommodation' in unit and unit['accommodation'] and unit['accommodation'] != '-':
-            
-            if final_city_list[-1] not in unit['accommodation']:
-                return False, f"The accommodation in day {i+1} is invalid city choice."
-            
-        # elif 'accommodation' not in unit:
-        #     return False, f"No Accommodation Info."
+        failure = current_city_day_check(i, unit, final_city_list)
+        if failure:
+            return failure
     
     return True, None
         
+def sandbox_day_check(i, unit, resolved):
+    """One day of is_valid_information_in_sandbox: the failure tuple, or None if the day is fine."""
+    if unit['transportation'] and unit['transportation'] != '-':
+        value = unit['transportation']
+        org_city, dest_city = resolved.from_to(value)
+        if org_city == None or dest_city == None:
+            org_city, dest_city = resolved.from_to(unit['current_city'])
+        if 'flight number' in value.lower():
+            try:
+                org_city = extract_before_parenthesis(org_city)
+                dest_city = extract_before_parenthesis(dest_city)
+            except TypeError:
+                raise ValueError("The transportation {} in day {} can not be parsed.".format(value,i+1))
+            # print(value)
+            route = resolved.flight_route(value.split('Flight Number: ')[1].split(',')[0])
+            if route is None or route[0] != org_city or route[1] != dest_city:
+                 return False, f"The flight number in day {i+1} is invalid in the sandbox."
+
+        elif 'self-driving' in value.lower() or 'taxi' in value.lower():
+            try:
+                org_city = extract_before_parenthesis(org_city)
+                dest_city = extract_before_parenthesis(dest_city)
+            except TypeError:
+                org_city = '-'
+                dest_city = '-'
+                print("The transportation {} in day {} can not be parsed and '-' will be used instead.".format(value,i+1))
+
+            if 'self-driving' in value.lower():
+                if googleDistanceMatrix.run_for_evaluation(org_city, dest_city, mode='self-driving')['cost'] == None:
+                    return False, f"The self-driving in day {i+1} is invalid in the sandbox."
+            else:
+                if googleDistanceMatrix.run_for_evaluation(org_city, dest_city, mode='taxi')['cost'] == None:
+                    return False, f"The taxi in day {i+1} is invalid in the sandbox."
+
+    if 'breakfast' in unit and unit['breakfast'] and unit['breakfast'] != '-':
+        if resolved.restaurant_matches(unit['breakfast']) < 1:
+            return False, f"The breakfast in day {i+1} is invalid in the sandbox."
+    # elif 'breakfast' not in unit:
+    #     return False, f"No Breakfast Info."
+
+    if 'lunch' in unit and unit['lunch'] and unit['lunch'] != '-':
+        if resolved.restaurant_matches(unit['lunch']) < 1:
+            return False, f"The lunch in day {i+1} is invalid in the sandbox."
+    # elif 'lunch' not in unit:
+    #     return False, f"No Lunch Info."
+
+    if 'dinner' in unit and unit['dinner'] and unit['dinner'] != '-':
+        if resolved.restaurant_matches(unit['dinner']) < 1:
+            return False, f"The dinner in day {i+1} is invalid in the sandbox."
+    # elif 'dinner' not in unit:
+    #     return False, f"No Dinner Info."
+
+    if 'attraction' in unit and unit['attraction'] and unit['attraction'] != '-':
+        attractions_list = unit['attraction'].split(';')[:-1]
+        for attraction in attractions_list:
+            if resolved.attraction_matches(attraction) < 1:
+                return False, f"The attraction {attraction} in day {i+1} is invalid in the sandbox."
+    # elif 'attraction' not in unit:
+    #     return False, f"No Attraction Info."
+
+    if 'accommodation' in unit and unit['accommodation'] and unit['accommodation'] != '-':
+        if resolved.accommodation_matches(unit['accommodation']) < 1:
+            return False, f"The accommodation in day {i+1} is invalid in the sandbox."
+    # elif 'accommodation' not in unit:
+    #     return False, f"No Accommodation Info."
+
+    return None
+
 # hallucination 
-def is_valid_information_in_sandbox(question, tested_data):
+def is_valid_information_in_sandbox(question, tested_data, resolved=None):
+    resolved = resolved if resolved is not None else PlanResolution()
     
     for i in range(min(question['days'],len(tested_data))):
-        unit = tested_data[i]
-        
-        if unit['transportation'] and unit['transportation'] != '-':
-            value = unit['transportation']
-            org_city, dest_city = extract_from_to(value)
-            if org_city == None or dest_city == None:
-                org_city, dest_city = extract_from_to(unit['current_city'])
-            if 'flight number' in value.lower():
-                try:
-                    org_city = extract_before_parenthesis(org_city)
-                    dest_city = extract_before_parenthesis(dest_city)
-                except TypeError:
-                    raise ValueError("The transportation {} in day {} can not be parsed.".format(value,i+1))
-                # print(value)
-                if len(flight.data[(flight.data['Flight Number'] == value.split('Flight Number: ')[1].split(',')[0]) & (flight.data['OriginCityName']==org_city) & (flight.data['DestCityName']==dest_city)]) < 1:
-                     return False, f"The flight number in day {i+1} is invalid in the sandbox."
-            
-            elif 'self-driving' in value.lower() or 'taxi' in value.lower():
-                try:
-                    org_city = extract_before_parenthesis(org_city)
-                    dest_city = extract_before_parenthesis(dest_city)
-                except TypeError:
-                    org_city = '-'
-                    dest_city = '-'
-                    print("The transportation {} in day {} can not be parsed and '-' will be used instead.".format(value,i+1))
-                
-                if 'self-driving' in value.lower():
-                    if googleDistanceMatrix.run_for_evaluation(org_city, dest_city, mode='self-driving')['cost'] == None:
-                        return False, f"The self-driving in day {i+1} is invalid in the sandbox."
-                else:
-                    if googleDistanceMatrix.run_for_evaluation(org_city, dest_city, mode='taxi')['cost'] == None:
-                        return False, f"The taxi in day {i+1} is invalid in the sandbox."
-
-        if 'breakfast' in unit and unit['breakfast'] and unit['breakfast'] != '-':
-            name, city = get_valid_name_city(unit['breakfast'])
-            if len(restaurants.data[(restaurants.data['Name'].astype(str).str.contains(re.escape(name))) & (restaurants.data['City'] == city)]) < 1:
-                return False, f"The breakfast in day {i+1} is invalid in the sandbox."
-        # elif 'breakfast' not in unit:
-        #     return False, f"No Breakfast Info."
-        
-        if 'lunch' in unit and unit['lunch'] and unit['lunch'] != '-':
-            name, city = get_valid_name_city(unit['lunch'])
-            if len(restaurants.data[(restaurants.data['Name'].astype(str).str.contains(re.escape(name))) & (restaurants.data['City'] == city)]) < 1:
-                return False, f"The lunch in day {i+1} is invalid in the sandbox."
-        # elif 'lunch' not in unit:
-        #     return False, f"No Lunch Info."
-        
-        if 'dinner' in unit and unit['dinner'] and unit['dinner'] != '-':
-            name, city = get_valid_name_city(unit['dinner'])
-            if len(restaurants.data[(restaurants.data['Name'].astype(str).str.contains(re.escape(name))) & (restaurants.data['City'] == city)]) < 1:
-                return False, f"The dinner in day {i+1} is invalid in the sandbox."
-        # elif 'dinner' not in unit:
-        #     return False, f"No Dinner Info."
-            
-        if 'attraction' in unit and unit['attraction'] and unit['attraction'] != '-':
-            attractions_list = unit['attraction'].split(';')[:-1]
-            for attraction in attractions_list:
-                name, city = get_valid_name_city(attraction)
-                if len(attractions.data[(attractions.data['Name'].astype(str).str.contains(re.escape(name))) & (attractions.data['City'] == city)]) < 1:
-                    return False, f"The attraction {attraction} in day {i+1} is invalid in the sandbox."
-        # elif 'attraction' not in unit:
-        #     return False, f"No Attraction Info."
-                
-        if 'accommodation' in unit and unit['accommodation'] and unit['accommodation'] != '-':
-            name, city = get_valid_name_city(unit['accommodation'])
-            # print(name,city)
-            # print(accommodation.data[accommodation.data['NAME'].astype(str).str.contains(re.escape(name))])
-            if len(accommodation.data[(accommodation.data['NAME'].astype(str).str.contains(re.escape(name))) & (accommodation.data['city'] == city)]) < 1:
-                return False, f"The accommodation in day {i+1} is invalid in the sandbox."
-        # elif 'accommodation' not in unit:
-        #     return False, f"No Accommodation Info."
+        failure = sandbox_day_check(i, tested_data[i], resolved)
+        if failure:
+            return failure
         
     return True, None
 
 
-def is_valid_accommodaton(question, tested_data):
+def is_valid_accommodaton(question, tested_data, resolved=None):
+    resolved = resolved if resolved is not None else PlanResolution()
     data = []
     for i in range(min(question['days'],len(tested_data))):
         unit = tested_data[i]
@@ -411,10 +392,9 @@ def is_valid_accommodaton(question, tested_data):
     for unit in consectutive_accommodation:
         # print(unit)
         if unit and unit[0] not in  ['-',''] :
-            name, city = get_valid_name_city(unit[0])
-            # print(unit[0],name,city)
+            minimum_nights = resolved.minimum_nights(unit[0])
             # try:
-            if len(accommodation.data[(accommodation.data['NAME'].astype(str).str.contains(re.escape(name))) & (accommodation.data['city'] == city)]) == 1 and unit[1] <  accommodation.data[(accommodation.data['NAME'].astype(str).str.contains(re.escape(name))) & (accommodation.data['city'] == city)].iloc[0]['minimum nights']:
+            if minimum_nights is not None and unit[1] < minimum_nights:
                 return False, f"The accommodation {unit[0]} do not obey the minumum nights rule."
             # can not parse data
             # except re.error:
@@ -422,7 +402,8 @@ def is_valid_accommodaton(question, tested_data):
             
     return True, None
 
-def is_valid_visiting_city_number(question, tested_data):
+def is_valid_visiting_city_number(question, tested_data, resolved=None):
+    resolved = resolved if resolved is not None else PlanResolution()
 
     city_set = set()
     
@@ -431,7 +412,7 @@ def is_valid_visiting_city_number(question, tested_data):
         city_value = tested_data[i]['current_city']
 
         if 'from' in city_value:
-            city1, city2 = extract_from_to(city_value)
+            city1, city2 = resolved.from_to(city_value)
             city1 = extract_before_parenthesis(city1)
             city2 = extract_before_parenthesis(city2)
             if i==0 and  city1 != question['org']:
@@ -462,49 +443,57 @@ def is_valid_days(question, tested_data):
     else:
         return True, None
 
-def is_not_absent(question, tested_data):
+def absent_day_check(question, i, unit):
+    """One day of is_not_absent's completeness rules: the failure tuple, or None if the day is fine."""
+    if 'transportation' not in unit:
+        return False, f"No Transportation Info."
+
+    if 'breakfast' not in unit:
+        return False, f"No Breakfast Info."
+
+    if 'lunch' not in unit:
+        return False, f"No Lunch Info."
+
+    if 'dinner' not in unit:
+        return False, f"No Dinner Info."
+
+    if 'attraction' not in unit:
+        return False, f"No Attraction Info."
+
+    if 'accommodation' not in unit:
+        return False, f"No Accommodation Info."
+
+    if ('from ' in unit['current_city'] or 'to ' in unit['current_city']) and unit['transportation'] in ['','-']:
+        return False, f"No transportation in day {i+1} is not allowed."
+
+    if ('from ' not in unit['current_city'] and  ' to ' not in unit['current_city']) and unit['attraction'] in ['','-']:
+        return False, f"No attaction in day {i+1} is not allowed."
+
+    if i != question['days'] - 1 and unit['accommodation'] in ['','-']:
+        return False, f"No accommodation in day {i+1} is not allowed."
+
+    if (unit['breakfast'] in ['','-'] or unit['lunch'] in ['','-'] or unit['dinner'] in ['','-']) and 'from ' not in unit['current_city']:
+        return False, f"No meal in day {i+1} is not allowed."
+
+    return None
+
+def is_not_absent(question, tested_data, resolved=None):
+    resolved = resolved if resolved is not None else PlanResolution()
     needed_info = 6 * question['days']
     total_valid_info = 0
 
     if not is_valid_days(question, tested_data)[0]:
         return False, "Invalid Days"
     
-    if not is_valid_visiting_city_number(question, tested_data)[0]:
+    if not is_valid_visiting_city_number(question, tested_data, resolved)[0]:
         return False, "Invalid City Number"
 
     for i in range(min(question['days'],len(tested_data))):
         unit = tested_data[i]
 
-        if 'transportation' not in unit:
-            return False, f"No Transportation Info."
-        
-        if 'breakfast' not in unit:
-            return False, f"No Breakfast Info."
-        
-        if 'lunch' not in unit:
-            return False, f"No Lunch Info."
-        
-        if 'dinner' not in unit:
-            return False, f"No Dinner Info."
-        
-        if 'attraction' not in unit:
-            return False, f"No Attraction Info."
-        
-        if 'accommodation' not in unit:
-            return False, f"No Accommodation Info."
-        
-        if ('from ' in unit['current_city'] or 'to ' in unit['current_city']) and unit['transportation'] in ['','-']:
-            return False, f"No transportation in day {i+1} is not allowed."
-        
-        if ('from ' not in unit['current_city'] and  ' to ' not in unit['current_city']) and unit['attraction'] in ['','-']:
-            return False, f"No attaction in day {i+1} is not allowed."
-
-        if i != question['days'] - 1 and unit['accommodation'] in ['','-']:
-            return False, f"No accommodation in day {i+1} is not allowed."
-
-        if (unit['breakfast'] in ['','-'] or unit['lunch'] in ['','-'] or unit['dinner'] in ['','-']) and 'from ' not in unit['current_city']:
-            return False, f"No meal in day {i+1} is not allowed."
-        
+        failure = absent_day_check(question, i, unit)
+        if failure:
+            return failure
 
         for key in unit:
             if unit[key] and unit[key] != '-':
@@ -517,28 +506,65 @@ def is_not_absent(question, tested_data):
     return True, None
 
 
-def evaluation(query_data, tested_data):
+def evaluation(query_data, tested_data, resolved=None):
     return_info = {}
-    return_info['is_reasonable_visiting_city'] = is_reasonable_visiting_city(query_data, tested_data)
+    # Share parsed fields and sandbox lookups across all checkers.
+    resolved = resolved if resolved is not None else resolve_plan(query_data, tested_data)
+    return_info['is_reasonable_visiting_city'] = is_reasonable_visiting_city(query_data, tested_data, resolved)
     return_info['is_valid_restaurants'] = is_valid_restaurants(query_data, tested_data)
     return_info['is_valid_attractions'] = is_valid_attractions(query_data, tested_data)
-    return_info['is_valid_accommodation'] = is_valid_accommodaton(query_data, tested_data)
+    return_info['is_valid_accommodation'] = is_valid_accommodaton(query_data, tested_data, resolved)
     return_info['is_valid_transportation'] = is_valid_transportation(query_data, tested_data)
-    return_info['is_valid_information_in_current_city'] = is_valid_information_in_current_city(query_data, tested_data)
-    return_info['is_valid_information_in_sandbox'] = is_valid_information_in_sandbox(query_data, tested_data)
-    return_info['is_not_absent'] = is_not_absent(query_data, tested_data)
+    return_info['is_valid_information_in_current_city'] = is_valid_information_in_current_city(query_data, tested_data, resolved)
+    return_info['is_valid_information_in_sandbox'] = is_valid_information_in_sandbox(query_data, tested_data, resolved)
+    return_info['is_not_absent'] = is_not_absent(query_data, tested_data, resolved)
     return return_info
 
-def boolean_evaluation(query_data, tested_data):
-    return_info = {}
-    return_info['is_reasonable_visiting_city'] = is_reasonable_visiting_city(query_data, tested_data)
-    return_info['is_valid_restaurants'] = is_valid_restaurants(query_data, tested_data)
-    return_info['is_valid_accommodation'] = is_valid_accommodaton(query_data, tested_data)
-    return_info['is_valid_attractions'] = is_valid_attractions(query_data, tested_data)
-    return_info['is_valid_transportation'] = is_valid_transportation(query_data, tested_data)
-    return_info['is_valid_information_in_current_city'] = is_valid_information_in_current_city(query_data, tested_data)
-    return_info['is_valid_information_in_sandbox'] = is_valid_information_in_sandbox(query_data, tested_data)
-    return_info['is_not_absent'] = is_not_absent(query_data, tested_data)
+def fail_fast_checks(query_data, tested_data, resolved):
+    """
+    Lazily run the checkers cheapest first, by the per-checker cost eval.py --profile measures: the
+    structural checks on the plan text, then the ones that look entities up in the sandbox.
+    is_valid_days and is_valid_visiting_city_number are parts of is_not_absent, checked on their own first.
+    """
+    yield 'is_valid_days', is_valid_days(query_data, tested_data)
+    yield 'is_reasonable_visiting_city', is_reasonable_visiting_city(query_data, tested_data, resolved)
+    yield 'is_valid_transportation', is_valid_transportation(query_data, tested_data)
+    yield 'is_valid_restaurants', is_valid_restaurants(query_data, tested_data)
+    yield 'is_valid_attractions', is_valid_attractions(query_data, tested_data)
+    yield 'is_valid_visiting_city_number', is_valid_visiting_city_number(query_data, tested_data, resolved)
+    yield 'is_valid_information_in_current_city', is_valid_information_in_current_city(query_data, tested_data, resolved)
+    yield 'is_not_absent', is_not_absent(query_data, tested_data, resolved)
+    yield 'is_valid_accommodation', is_valid_accommodaton(query_data, tested_data, resolved)
+    yield 'is_valid_information_in_sandbox', is_valid_information_in_sandbox(query_data, tested_data, resolved)
+
+def boolean_evaluation(query_data, tested_data, resolved=None, fail_fast=False, single_pass=False):
+    if fail_fast:
+        # Stop at the first violation; the resolution only looks up what the checkers reached.
+        resolved = resolved if resolved is not None else resolve_plan(query_data, tested_data)
+        for key, result in fail_fast_checks(query_data, tested_data, resolved):
+            if result[0] == False:
+                print(result[1])
+                return False
+        return True
+    # Share parsed fields and sandbox lookups across all checkers.
+    resolved = resolved if resolved is not None else resolve_plan(query_data, tested_data)
+    if single_pass:
+        # Imported here: single_pass builds on this module's day checks.
+        from travelplanner.evaluation.single_pass import evaluation as single_pass_evaluation
+        single_pass_info = single_pass_evaluation(query_data, tested_data, resolved)
+        # Checked in the order below, so the same violation is printed.
+        return_info = {key: single_pass_info[key] for key in ['is_reasonable_visiting_city', 'is_valid_restaurants', 'is_valid_accommodation', 'is_valid_attractions',
+                                                              'is_valid_transportation', 'is_valid_information_in_current_city', 'is_valid_information_in_sandbox', 'is_not_absent']}
+    else:
+        return_info = {}
+        return_info['is_reasonable_visiting_city'] = is_reasonable_visiting_city(query_data, tested_data, resolved)
+        return_info['is_valid_restaurants'] = is_valid_restaurants(query_data, tested_data)
+        return_info['is_valid_accommodation'] = is_valid_accommodaton(query_data, tested_data, resolved)
+        return_info['is_valid_attractions'] = is_valid_attractions(query_data, tested_data)
+        return_info['is_valid_transportation'] = is_valid_transportation(query_data, tested_data)
+        return_info['is_valid_information_in_current_city'] = is_valid_information_in_current_city(query_data, tested_data, resolved)
+        return_info['is_valid_information_in_sandbox'] = is_valid_information_in_sandbox(query_data, tested_data, resolved)
+        return_info['is_not_absent'] = is_not_absent(query_data, tested_data, resolved)
     for key in return_info:
         if return_info[key][0] == False:
             print(return_info[key][1])
@@ -1,11 +1,27 @@
 import os, sys
-from commonsense_constraint import evaluation as commonsense_eval
-from hard_constraint import evaluation as hard_eval
+import copy
+import functools
+import itertools
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from travelplanner.evaluation.commonsense_constraint import evaluation as commonsense_eval
+from travelplanner.evaluation.hard_constraint import evaluation as hard_eval
+from travelplanner.evaluation import commonsense_constraint
+from travelplanner.evaluation import hard_constraint
+from travelplanner.evaluation.plan_resolution import resolve_plan
+from travelplanner.evaluation import single_pass as single_pass_checks
+from travelplanner.evaluation.single_pass import evaluation as single_pass_eval
+from travelplanner.evaluation.batch_evaluation import batch_evaluate
+from travelplanner.evaluation.result_cache import ResultCache
+from travelplanner.evaluation.profiling import ConstraintProfiler
 import json
 from tqdm import tqdm
-from datasets import load_dataset
+from travelplanner.utils.query_sets import load_query_set
 import argparse
 
+# Plans read and evaluated at a time in streaming mode when no report interval is given.
+STREAM_CHUNK = 100
+
 
 def load_line_json_data(filename):
     data = []
@@ -15,6 +31,13 @@ def load_line_json_data(filename):
             data.append(unit)
     return data
 
+def iter_line_json_data(filename):
+    """Yield the records of a JSONL file one line at a time, skipping blank lines."""
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
 def count_true_false(data):
     """Count the number of true and false values in a list."""
     true_count = data.count(True)
@@ -49,174 +72,330 @@ def paper_term_mapping(commonsense_constraint_record, hard_constraint_record):
     return remap_commonsense_constraint_record, remap_hard_constraint_record
 
 
-def eval_score(set_type: str, file_path: str):
+def evaluate_plan(query_data, tested_plan, single_pass: bool = False):
+    """
+    Commonsense and hard constraint results of one plan; hard constraints only run on complete plans
+    that pass the sandbox check. single_pass=True computes the commonsense results with
+    single_pass.evaluation, which returns the same info box.
+    """
+    if tested_plan['plan']:
+        # Resolve the plan's entities once; both evaluations reuse the lookups.
+        resolved = resolve_plan(query_data,tested_plan['plan'])
+        if single_pass:
+            commonsense_info_box = single_pass_eval(query_data,tested_plan['plan'],resolved)
+        else:
+            commonsense_info_box = commonsense_eval(query_data,tested_plan['plan'],resolved)
+    else:
+        commonsense_info_box = None
+
+    if commonsense_info_box and commonsense_info_box['is_not_absent'][0] and commonsense_info_box['is_valid_information_in_sandbox'][0]:
+        hard_info_box = hard_eval(query_data,tested_plan['plan'],resolved)
+    else:
+        hard_info_box = None
+    return commonsense_info_box, hard_info_box
 
-    if set_type == 'train':
-        query_data_list  = load_dataset('osunlp/TravelPlanner','train',download_mode="force_redownload")['train']
-    elif set_type == 'validation':
-        query_data_list  = load_dataset('osunlp/TravelPlanner','validation',download_mode="force_redownload")['validation']
 
-    
-    query_data_list = [x for x in query_data_list]
-    hardConstraint_statistic= {level:{day:[] for day in [3,5,7]} for level in ['easy','medium','hard']} 
-    commonsenseConstraint_statistic = {level:{day:[] for day in [3,5,7]} for level in ['easy','medium','hard']} 
-    tested_plans = load_line_json_data(file_path)
-    delivery_cnt = 0
-    plan_constraint_store = []
-    for idx in tqdm(range(0,len(query_data_list))):
-        query_data = query_data_list[idx]
-        tested_plan = tested_plans[idx]
+COMMONSENSE_CHECKERS = ['is_reasonable_visiting_city','is_valid_restaurants','is_valid_attractions','is_valid_accommodaton','is_valid_transportation','is_valid_information_in_current_city','is_valid_information_in_sandbox','is_not_absent','is_valid_visiting_city_number','is_valid_days']
+# The day and whole-plan checks single_pass.evaluation calls in place of the checkers above.
+SINGLE_PASS_CHECKS = ['current_city_day_check','sandbox_day_check','absent_day_check','_closed_route','_minimum_nights']
+HARD_CHECKERS = ['get_total_cost','is_valid_room_rule','is_valid_cuisine','is_valid_transportation','is_valid_room_type']
+
+
+def profile_checkers(profiler: ConstraintProfiler):
+    """Instrument evaluate_plan, plan resolution, every checker and the sandbox lookups they make."""
+    module = sys.modules[__name__]
+    profiler.instrument_plan(module, 'evaluate_plan')
+    profiler.instrument(module, ['resolve_plan', 'commonsense_eval', 'single_pass_eval', 'hard_eval'], 'eval')
+    profiler.instrument(commonsense_constraint, COMMONSENSE_CHECKERS, 'commonsense_constraint')
+    profiler.instrument(hard_constraint, HARD_CHECKERS, 'hard_constraint')
+    profiler.instrument(single_pass_checks, SINGLE_PASS_CHECKS, 'single_pass')
+    profiler.count_lookups(commonsense_constraint.sandbox)
+
+
+def _evaluate_plan_pair(pair, single_pass: bool = False):
+    return evaluate_plan(*pair, single_pass=single_pass)
+
+
+def evaluate_plans(pairs, workers: int = 1, batch: bool = False, single_pass: bool = False):
+    """
+    Evaluate (query_data, tested_plan) pairs, in order. With workers > 1 the plans are spread over a
+    process pool; forked workers inherit the sandbox tables already loaded by the checker modules.
+    With batch=True the plans go through the columnar engine (batch_evaluation.batch_evaluate), one
+    contiguous slice of the submission per worker; single_pass is passed on to evaluate_plan otherwise.
+    """
+    if batch and workers <= 1:
+        return batch_evaluate(pairs)
+    if workers <= 1:
+        return [evaluate_plan(query_data, tested_plan, single_pass) for query_data, tested_plan in tqdm(pairs)]
+    context = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        if batch:
+            size = -(-len(pairs) // workers)
+            slices = [pairs[start:start + size] for start in range(0, len(pairs), size)]
+            return [info_box for part in executor.map(batch_evaluate, slices) for info_box in part]
+        chunksize = max(1, len(pairs) // (workers * 8))
+        evaluate_pair = functools.partial(_evaluate_plan_pair, single_pass=single_pass)
+        return list(tqdm(executor.map(evaluate_pair, pairs, chunksize=chunksize), total=len(pairs)))
+
+
+class ScoreAggregator:
+    """
+    Running per-level, per-day constraint counters of an evaluation. add() folds in one evaluated
+    plan, scores() returns the metrics of eval_score and progress() the pass rates over the plans
+    seen so far. Only the counters are kept, not the plans or their info boxes.
+    """
+
+    constraint_mapping = {'house rule':'valid_room_rule','cuisine':'valid_cuisine','room type':'valid_room_type','transportation':'valid_transportation'}
+
+    def __init__(self):
+        self.processed = 0
+        self.delivery_cnt = 0
+        self.commonsense_statistic = {level:{day:{} for day in [3,5,7]} for level in ['easy','medium','hard']}
+        self.hard_statistic = {level:{day:{} for day in [3,5,7]} for level in ['easy','medium','hard']}
+        self.mapping_constraint_record = {key: {day: {'valid_room_rule':0, 'valid_cuisine':0, 'valid_room_type':0, 'valid_transportation':0} for day in [3,5,7]} for key in ['medium','hard']}
+        self.count_record = {key:{day:0 for day in [3,5,7]} for key in ['easy','medium','hard']}
+        self.final_all_cnt = 0
+        self.final_commonsense_cnt = 0
+        self.final_hardConstraint_cnt = 0
+        self.final_all_cnt_map = {level:0 for level in ['easy','medium','hard']}
+
+    @staticmethod
+    def _count(statistic, info_box):
+        """Fold one info box into {key: {"true": n, "false": n}}, as statistics() does for a list of them."""
+        if info_box:
+            for key, data in info_box.items():
+                true_count, false_count = count_true_false(data)
+                if key not in statistic:
+                    statistic[key] = {"true": 0, "false": 0}
+                statistic[key]["true"] += true_count
+                statistic[key]["false"] += false_count
+
+    def add(self, query_data, tested_plan, commonsense_info_box, hard_info_box):
+        level, days = query_data['level'], query_data['days']
+        self.processed += 1
+        if tested_plan['plan']:
+            self.delivery_cnt += 1
+        self._count(self.commonsense_statistic[level][days], commonsense_info_box)
+        self._count(self.hard_statistic[level][days], hard_info_box)
+
+        self.count_record[level][days] += 1
+        for key in self.constraint_mapping:
+            if query_data['local_constraint'][key] != None:
+                self.mapping_constraint_record[level][days][self.constraint_mapping[key]] += 1
+
+        if not commonsense_info_box:
+            return
+        final_commonsense_pass = True
+        final_hardConstraint_pass = True
+        for item in commonsense_info_box:
+            if commonsense_info_box[item][0] is not None and not commonsense_info_box[item][0]:
+                final_commonsense_pass = False
+                break
+        if hard_info_box is None:
+            return
+        for item in hard_info_box:
+            if hard_info_box[item][0] is not None and hard_info_box[item][0] == False:
+                final_hardConstraint_pass = False
+                break
+
+        if final_commonsense_pass:
+            self.final_commonsense_cnt += 1
+        if final_hardConstraint_pass:
+            self.final_hardConstraint_cnt += 1
+        if final_commonsense_pass and final_hardConstraint_pass:
+            self.final_all_cnt += 1
+            self.final_all_cnt_map[level] += 1
+
+    def _totals(self):
+        """Per-level, per-day statistics with their totals, and the overall pass/total counts."""
+        commonsenseConstraint_statistic_processed = copy.deepcopy(self.commonsense_statistic)
+        hardConstraint_statistic_processed = copy.deepcopy(self.hard_statistic)
+        mapping_constraint_record = self.mapping_constraint_record
+        count_record = self.count_record
+
+        constraint_dis_record = {"commonsense":{"pass":0,"total":0},"hard":{"pass":0,"total":0}}
+
+        for constraint in ['commonsense','hard']:
+            if constraint == 'commonsense':
+                constraint_statistic = commonsenseConstraint_statistic_processed
+            elif constraint == 'hard':
+                constraint_statistic = hardConstraint_statistic_processed
+
+            key_dict = {'commonsense':['is_valid_information_in_current_city','is_valid_information_in_sandbox','is_reasonable_visiting_city','is_valid_restaurants','is_valid_transportation','is_valid_attractions','is_valid_accommodation','is_not_absent'],'hard':['valid_cost','valid_room_rule','valid_cuisine','valid_room_type','valid_transportation']}
+
+            for key in constraint_statistic:
+                for key2 in constraint_statistic[key]:
+                    for key3 in key_dict[constraint]:
+                        if key3 in constraint_statistic[key][key2]:
+                            constraint_dis_record[constraint]['pass'] += constraint_statistic[key][key2][key3]['true']
+                            if constraint == 'hard':
+                                if key == 'hard' and key3 in ['valid_room_rule','valid_cuisine','valid_room_type','valid_transportation']:
+                                    constraint_dis_record[constraint]['total'] += mapping_constraint_record[key][key2][key3]
+                                    hardConstraint_statistic_processed[key][key2][key3]['total'] = mapping_constraint_record[key][key2][key3]
+                                elif key == 'medium' and key3 in ['valid_room_rule','valid_cuisine','valid_room_type']:
+                                    constraint_dis_record[constraint]['total'] += mapping_constraint_record[key][key2][key3]
+                                    hardConstraint_statistic_processed[key][key2][key3]['total'] = mapping_constraint_record[key][key2][key3]
+                                else:
+                                    if key3 in ['valid_cost','valid_visitng_city_number','valid_days']:
+                                        constraint_dis_record[constraint]['total'] += count_record[key][key2]
+                                        hardConstraint_statistic_processed[key][key2][key3]['total'] = count_record[key][key2]
+                            else:
+                                constraint_dis_record[constraint]['total'] += count_record[key][key2]
+                                commonsenseConstraint_statistic_processed[key][key2][key3]['total'] =  count_record[key][key2]
+        return commonsenseConstraint_statistic_processed, hardConstraint_statistic_processed, constraint_dis_record
+
+    def progress(self) -> str:
+        """One line of pass rates over the plans added so far; micro rates are over the constraints counted so far."""
+        _, _, constraint_dis_record = self._totals()
+        seen = max(self.processed, 1)
+        rates = {
+            'Delivery Rate': self.delivery_cnt / seen,
+            'Commonsense Micro': constraint_dis_record['commonsense']['pass'] / max(constraint_dis_record['commonsense']['total'], 1),
+            'Commonsense Macro': self.final_commonsense_cnt / seen,
+            'Hard Micro': constraint_dis_record['hard']['pass'] / max(constraint_dis_record['hard']['total'], 1),
+            'Hard Macro': self.final_hardConstraint_cnt / seen,
+            'Final Pass Rate': self.final_all_cnt / seen,
+        }
+        return f"[{self.processed} plans] " + ", ".join(f"{key}: {value*100:.1f}%" for key, value in rates.items())
+
+    def scores(self, set_type: str):
+        commonsenseConstraint_statistic_processed, hardConstraint_statistic_processed, constraint_dis_record = self._totals()
+        delivery_cnt = self.delivery_cnt
+        final_commonsense_cnt = self.final_commonsense_cnt
+        final_hardConstraint_cnt = self.final_hardConstraint_cnt
+        final_all_cnt = self.final_all_cnt
+
+        result = {}
+
+        remap_commonsense_constraint_record, remap_hard_constraint_record = paper_term_mapping(commonsenseConstraint_statistic_processed, hardConstraint_statistic_processed)
+
+        if set_type == 'train':
+            result['Delivery Rate'] = delivery_cnt / 45
+            result['Commonsense Constraint Micro Pass Rate'] = constraint_dis_record['commonsense']['pass'] / 360
+            result['Commonsense Constraint Macro Pass Rate'] = final_commonsense_cnt / 45
+            result['Hard Constraint Micro Pass Rate'] = constraint_dis_record['hard']['pass'] / 105
+            result['Hard Constraint Macro Pass Rate'] = final_hardConstraint_cnt / 45
+            result['Final Pass Rate'] = final_all_cnt / 45
+
+        elif set_type == 'validation':
+            result['Delivery Rate'] = delivery_cnt / 180
+            result['Commonsense Constraint Micro Pass Rate'] = constraint_dis_record['commonsense']['pass'] / 1440
+            result['Commonsense Constraint Macro Pass Rate'] = final_commonsense_cnt / 180
+            result['Hard Constraint Micro Pass Rate'] = constraint_dis_record['hard']['pass'] / 420
+            result['Hard Constraint Macro Pass Rate'] = final_hardConstraint_cnt / 180
+            result['Final Pass Rate'] = final_all_cnt / 180
+
+        elif set_type == 'test':
+            result['Delivery Rate'] = delivery_cnt / 1000
+            result['Commonsense Constraint Micro Pass Rate'] = constraint_dis_record['commonsense']['pass'] / 8000
+            result['Commonsense Constraint Macro Pass Rate'] = final_commonsense_cnt / 1000
+            result['Hard Constraint Micro Pass Rate'] = constraint_dis_record['hard']['pass'] / 2290
+            result['Hard Constraint Macro Pass Rate'] = final_hardConstraint_cnt / 1000
+            result['Final Pass Rate'] = final_all_cnt / 1000
+
+        return result, {"Commonsense Constraint":remap_commonsense_constraint_record, "Hard Constraint":remap_hard_constraint_record}
+
+
+def evaluate_submission(pairs, workers: int = 1, batch: bool = False, cache: ResultCache = None, single_pass: bool = False):
+    """evaluate_plans, answering from `cache` where possible and storing what it had to evaluate."""
+    if cache is None:
+        return evaluate_plans(pairs, workers, batch, single_pass)
+    keys = [cache.key(query_data, tested_plan['plan']) for query_data, tested_plan in pairs]
+    info_boxes = [cache.get(key) for key in keys]
+    missing = [idx for idx, info_box in enumerate(info_boxes) if info_box is None]
+    for idx, info_box in zip(missing, evaluate_plans([pairs[idx] for idx in missing], workers, batch, single_pass)):
+        cache.put(keys[idx], info_box)
+        info_boxes[idx] = info_box
+    return info_boxes
+
+
+def submission_pairs(query_data_list, tested_plans):
+    """Yield (query_data, tested_plan) for every query, parsing string records; `tested_plans` may be a lazy iterator."""
+    tested_plans = iter(tested_plans)
+    for query_data in query_data_list:
+        try:
+            tested_plan = next(tested_plans)
+        except StopIteration:
+            raise IndexError("The submission has fewer plans than there are queries.")
         if type(query_data) == str:
             query_data = eval(query_data)
         if type(tested_plan) == str:
             tested_plan = eval(tested_plan)
         if type(query_data['local_constraint']) == str:
             query_data['local_constraint'] = eval(query_data['local_constraint'])
+        yield query_data, tested_plan
 
-        if tested_plan['plan']:
-            delivery_cnt += 1
-            commonsense_info_box = commonsense_eval(query_data,tested_plan['plan'])
-        else:
-            commonsense_info_box = None
-
-        if commonsense_info_box and commonsense_info_box['is_not_absent'][0] and commonsense_info_box['is_valid_information_in_sandbox'][0]:
-            hard_info_box = hard_eval(query_data,tested_plan['plan'])
-        else:
-            hard_info_box = None
 
-        plan_constraint_store.append({'commonsense_constraint':commonsense_info_box,'hard_constraint':hard_info_box})
+def eval_score(set_type: str, file_path: str, workers: int = 1, batch: bool = False, cache_dir: str = None, stream: bool = False, report_every: int = 0, single_pass: bool = False):
+    """
+    Score a submission. With stream=True the plans are read and evaluated `report_every` at a time
+    (STREAM_CHUNK when report_every is 0) and only the running counters are kept, so memory does
+    not grow with the submission; partial metrics are printed after every chunk when report_every > 0.
+    """
 
-        commonsenseConstraint_statistic[query_data['level']][query_data['days']].append(commonsense_info_box)
-        hardConstraint_statistic[query_data['level']][query_data['days']].append(hard_info_box)
+    query_data_list = load_query_set(set_type)
 
-    constraint_record = {key: {day: {'house rule':0, 'cuisine':0, 'room type':0, 'transportation':0} for day in [3,5,7]} for key in ['medium','hard']}
-    constraint_mapping = {'house rule':'valid_room_rule','cuisine':'valid_cuisine','room type':'valid_room_type','transportation':'valid_transportation'}
-    mapping_constraint_record = {key: {day: {'valid_room_rule':0, 'valid_cuisine':0, 'valid_room_type':0, 'valid_transportation':0} for day in [3,5,7]} for key in ['medium','hard']}
-    count_record = {key:{day:0 for day in [3,5,7]} for key in ['easy','medium','hard']}
-
-    for unit in query_data_list:
-        count_record[unit['level']][unit['days']] += 1
-        for key in constraint_record['medium'][3]:
-            if unit['local_constraint'][key] != None:
-                constraint_record[unit['level']][unit['days']][key] += 1
-                mapping_constraint_record[unit['level']][unit['days']][constraint_mapping[key]] += 1
-    
-    commonsenseConstraint_statistic_processed = statistics(commonsenseConstraint_statistic)
-    hardConstraint_statistic_processed = statistics(hardConstraint_statistic)
-
-
-    data_record = {key:{day:[] for day in [3,5,7]} for key in ['easy','medium','hard']}
-
-    constraint_dis_record = {"commonsense":{"pass":0,"total":0},"hard":{"pass":0,"total":0}}
-    constraint_count = {key:{day:{} for day in [3,5,7]} for key in ['easy','medium','hard']}
-
-    for constraint in ['commonsense','hard']:
-        if constraint == 'commonsense':
-            constraint_statistic = commonsenseConstraint_statistic_processed
-        elif constraint == 'hard':
-            constraint_statistic = hardConstraint_statistic_processed
-
-        key_dict = {'commonsense':['is_valid_information_in_current_city','is_valid_information_in_sandbox','is_reasonable_visiting_city','is_valid_restaurants','is_valid_transportation','is_valid_attractions','is_valid_accommodation','is_not_absent'],'hard':['valid_cost','valid_room_rule','valid_cuisine','valid_room_type','valid_transportation']}
-        
-        for key in constraint_statistic:
-            for key2 in constraint_statistic[key]:
-                if key2 == -1:
-                    print(constraint_statistic[key])
-                    exit(0)
-                for key3 in key_dict[constraint]:
-                    data_record[key][key2].append('0/0')
-                    if key3 in constraint_statistic[key][key2]:
-                        constraint_dis_record[constraint]['pass'] += constraint_statistic[key][key2][key3]['true']
-                        if constraint == 'hard':
-                            if key == 'hard' and key3 in ['valid_room_rule','valid_cuisine','valid_room_type','valid_transportation']:
-                                data_record[key][key2][-1] = f"{constraint_statistic[key][key2][key3]['true']}/{mapping_constraint_record[key][key2][key3]}"
-                                constraint_dis_record[constraint]['total'] += mapping_constraint_record[key][key2][key3]
-                                hardConstraint_statistic_processed[key][key2][key3]['total'] = mapping_constraint_record[key][key2][key3]
-                            elif key == 'medium' and key3 in ['valid_room_rule','valid_cuisine','valid_room_type']:
-                                data_record[key][key2][-1] = f"{constraint_statistic[key][key2][key3]['true']}/{mapping_constraint_record[key][key2][key3]}"
-                                constraint_dis_record[constraint]['total'] += mapping_constraint_record[key][key2][key3]
-                                hardConstraint_statistic_processed[key][key2][key3]['total'] = mapping_constraint_record[key][key2][key3]
-                            else:
-                                data_record[key][key2][-1] = f"{constraint_statistic[key][key2][key3]['true']}/{count_record[key][key2]}"
-                                if key3 in ['valid_cost','valid_visitng_city_number','valid_days']:
-                                    constraint_dis_record[constraint]['total'] += count_record[key][key2]
-                                    constraint_count[key][key2][key3] = count_record[key][key2]
-                                    hardConstraint_statistic_processed[key][key2][key3]['total'] = count_record[key][key2]
-                        else:
-                            data_record[key][key2][-1] = f"{constraint_statistic[key][key2][key3]['true']}/{count_record[key][key2]}"
-                            constraint_dis_record[constraint]['total'] += count_record[key][key2]
-                            constraint_count[key][key2][key3] = count_record[key][key2]
-                            commonsenseConstraint_statistic_processed[key][key2][key3]['total'] =  count_record[key][key2]
-    final_all_cnt = 0
-    final_commonsense_cnt = 0
-    final_hardConstraint_cnt = 0
-    final_all_cnt_map = {level:0 for level in ['easy','medium','hard']}
-    for idx in (range(0,len(query_data_list))):
-        if plan_constraint_store[idx]['commonsense_constraint']:
-            final_commonsense_pass = True
-            final_hardConstraint_pass = True
-            for item in plan_constraint_store[idx]['commonsense_constraint']:
-                if plan_constraint_store[idx]['commonsense_constraint'][item][0] is not None and not plan_constraint_store[idx]['commonsense_constraint'][item][0]:
-                    final_commonsense_pass = False
-                    break
-            if plan_constraint_store[idx]['hard_constraint'] is None:
-                continue
-            for item in plan_constraint_store[idx]['hard_constraint']:
-                if plan_constraint_store[idx]['hard_constraint'][item][0] is not None and  plan_constraint_store[idx]['hard_constraint'][item][0] == False:
-                    final_hardConstraint_pass = False
-                    break
-                
-            if final_commonsense_pass:
-                final_commonsense_cnt += 1
-            if final_hardConstraint_pass:
-                final_hardConstraint_cnt += 1
-            if final_commonsense_pass and final_hardConstraint_pass:
-                final_all_cnt += 1
-                final_all_cnt_map[query_data_list[idx]['level']] += 1
-
-    result = {}
-
-    remap_commonsense_constraint_record, remap_hard_constraint_record = paper_term_mapping(commonsenseConstraint_statistic_processed, hardConstraint_statistic_processed)
-
-    if set_type == 'train':
-        result['Delivery Rate'] = delivery_cnt / 45
-        result['Commonsense Constraint Micro Pass Rate'] = constraint_dis_record['commonsense']['pass'] / 360
-        result['Commonsense Constraint Macro Pass Rate'] = final_commonsense_cnt / 45
-        result['Hard Constraint Micro Pass Rate'] = constraint_dis_record['hard']['pass'] / 105
-        result['Hard Constraint Macro Pass Rate'] = final_hardConstraint_cnt / 45
-        result['Final Pass Rate'] = final_all_cnt / 45
-
-    elif set_type == 'validation':
-        result['Delivery Rate'] = delivery_cnt / 180
-        result['Commonsense Constraint Micro Pass Rate'] = constraint_dis_record['commonsense']['pass'] / 1440
-        result['Commonsense Constraint Macro Pass Rate'] = final_commonsense_cnt / 180
-        result['Hard Constraint Micro Pass Rate'] = constraint_dis_record['hard']['pass'] / 420
-        result['Hard Constraint Macro Pass Rate'] = final_hardConstraint_cnt / 180
-        result['Final Pass Rate'] = final_all_cnt / 180
-
-    elif set_type == 'test':
-        result['Delivery Rate'] = delivery_cnt / 1000
-        result['Commonsense Constraint Micro Pass Rate'] = constraint_dis_record['commonsense']['pass'] / 8000
-        result['Commonsense Constraint Macro Pass Rate'] = final_commonsense_cnt / 1000
-        result['Hard Constraint Micro Pass Rate'] = constraint_dis_record['hard']['pass'] / 2290
-        result['Hard Constraint Macro Pass Rate'] = final_hardConstraint_cnt / 1000
-        result['Final Pass Rate'] = final_all_cnt / 1000
     
+    query_data_list = [x for x in query_data_list]
+    cache = ResultCache(cache_dir) if cache_dir else None
+    aggregator = ScoreAggregator()
+
+    if stream:
+        pairs = submission_pairs(query_data_list, iter_line_json_data(file_path))
+        chunk_size = report_every if report_every > 0 else STREAM_CHUNK
+        chunks = iter(lambda: list(itertools.islice(pairs, chunk_size)), [])
+    else:
+        chunks = [list(submission_pairs(query_data_list, load_line_json_data(file_path)))]
 
-    return result, {"Commonsense Constraint":remap_commonsense_constraint_record, "Hard Constraint":remap_hard_constraint_record}
+    for chunk in chunks:
+        for (query_data, tested_plan), (commonsense_info_box, hard_info_box) in zip(chunk, evaluate_submission(chunk, workers, batch, cache, single_pass)):
+            aggregator.add(query_data, tested_plan, commonsense_info_box, hard_info_box)
+        if stream and report_every > 0:
+            print(aggregator.progress())
+
+    if cache is not None:
+        print(f"Result cache: {cache.hits} hits, {cache.misses} misses.")
+    return aggregator.scores(set_type)
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument("--set_type", type=str, default="validation")
     parser.add_argument("--evaluation_file_path", type=str, default="./")
+    parser.add_argument("--workers", type=int, default=1, help="Number of processes used to evaluate the plans.")
+    parser.add_argument("--batch", action="store_true", help="Evaluate the whole submission with the columnar batch engine.")
+    parser.add_argument("--cache_dir", type=str, default=None, help="Directory of the per-plan result cache; only uncached plans are evaluated.")
+    parser.add_argument("--stream", action="store_true", help="Read and evaluate the submission incrementally, keeping only running counters.")
+    parser.add_argument("--profile", action="store_true", help="Time every constraint checker and write a JSON report next to the evaluation file.")
+    parser.add_argument("--profile_output", type=str, default=None, help="Path of the --profile report (default: <evaluation file>_profile.json).")
+    parser.add_argument("--report_every", type=int, default=0, help="With --stream, evaluate this many plans at a time and print partial metrics after each.")
+    parser.add_argument("--single_pass", action="store_true", help="Compute the commonsense constraints in one walk over each plan (single_pass.evaluation).")
     args = parser.parse_args()
 
-    scores, detailed_scores = eval_score(args.set_type, file_path=args.evaluation_file_path)
+    if args.single_pass and args.batch:
+        parser.error("--single_pass applies to the per-plan evaluation; it cannot be combined with --batch.")
+
+    profiler = None
+    if args.profile:
+        if args.workers > 1 or args.batch or args.cache_dir:
+            parser.error("--profile times the per-plan checkers in this process; it cannot be combined with --workers, --batch or --cache_dir.")
+        profiler = ConstraintProfiler()
+        profile_checkers(profiler)
+
+    scores, detailed_scores = eval_score(args.set_type, file_path=args.evaluation_file_path, workers=args.workers, batch=args.batch, cache_dir=args.cache_dir, stream=args.stream, report_every=args.report_every, single_pass=args.single_pass)
 
     for key in scores:
         print(f"{key}: {scores[key]*100}%")
     
     print("------------------")
     print(detailed_scores)
-    print("------------------")
\ No newline at end of file
+    print("------------------")
+
+    if profiler is not None:
+        profiler.restore()
+        report = profiler.report()
+        report['scores'] = scores
+        profile_path = args.profile_output or os.path.splitext(args.evaluation_file_path)[0] + '_profile.json'
+        with open(profile_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Profile written to {profile_path}")
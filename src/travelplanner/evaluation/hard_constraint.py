@@ -1,9 +1,7 @@
-from travelplanner.utils.func import get_valid_name_city,extract_before_parenthesis,extract_numbers_from_filenames
-from travelplanner.tools.flights.apis import Flights
-from travelplanner.tools.accommodations.apis import Accommodations
-from travelplanner.tools.restaurants.apis import Restaurants
-from travelplanner.tools.googleDistanceMatrix.apis import GoogleDistanceMatrix
-from travelplanner.tools.attractions.apis import Attractions
+from travelplanner.utils.func import extract_numbers_from_filenames
+from travelplanner.utils.plan_parser import get_valid_name_city,extract_before_parenthesis,extract_from_to
+from travelplanner.tools.sandbox import get_sandbox
+from travelplanner.evaluation.plan_resolution import PlanResolution, resolve_plan
 import math
 import json
 import re
@@ -13,11 +11,12 @@ import sys
 from tqdm import tqdm
 import argparse
 
-flight = Flights()
-accommodation = Accommodations()
-restaurants = Restaurants()
-googleDistanceMatrix = GoogleDistanceMatrix()
-attractions = Attractions()
+sandbox = get_sandbox()
+flight = sandbox.flights
+accommodation = sandbox.accommodations
+restaurants = sandbox.restaurants
+googleDistanceMatrix = sandbox.googleDistanceMatrix
+attractions = sandbox.attractions
 
 
 def load_line_json_data(filename):
@@ -49,39 +48,25 @@ def convert_bool_values(item):
 
 
 
-def extract_from_to(text: str):
-    """
-    Extracts 'A' and 'B' from the format "from A to B" in the given text, with B ending at a comma or the end of the string.
-    
-    Args:
-    - text (str): The input string.
-    
-    Returns:
-    - tuple: A tuple containing 'A' and 'B'. If no match is found, returns (None, None).
-    """
-    pattern = r"from\s+(.+?)\s+to\s+([^,]+)(?=[,\s]|$)"
-    matches = re.search(pattern, text)
-    return matches.groups() if matches else (None, None)
-
-
-def get_total_cost(question, tested_data):
+def get_total_cost(question, tested_data, resolved=None):
+    resolved = resolved if resolved is not None else PlanResolution()
     total_cost = 0
     for i in range(min(question['days'],len(tested_data))):
         unit = tested_data[i]
         # transporation 
         if unit['transportation'] and  unit['transportation'] != '-':
             value = unit['transportation']
-            org_city, dest_city = extract_from_to(value)
+            org_city, dest_city = resolved.from_to(value)
             if org_city == None or dest_city == None:
-                org_city, dest_city = extract_from_to(unit['current_city'])
+                org_city, dest_city = resolved.from_to(unit['current_city'])
             
             if org_city == None or dest_city == None:
                 pass
             else:
                 if 'flight number' in value.lower():
-                    res = flight.data[flight.data['Flight Number'] == value.split('Flight Number: ')[1].split(',')[0]]
-                    if len(res) > 0:
-                        total_cost += res['Price'].values[0] * question['people_number']
+                    res = flight.lookup_flight(value.split('Flight Number: ')[1].split(',')[0])
+                    if res is not None:
+                        total_cost += res['Price'] * question['people_number']
                 
                 elif 'self-driving' in value.lower() or 'taxi' in value.lower():
                     if 'self-driving' in value.lower():
@@ -94,37 +79,34 @@ def get_total_cost(question, tested_data):
         
         # breakfast
         if unit['breakfast'] and unit['breakfast'] != '-':
-            name, city = get_valid_name_city(unit['breakfast'])
-            res = restaurants.data[(restaurants.data['Name'].astype(str).str.contains(re.escape(name))) & (restaurants.data['City'] == city)]
+            res = resolved.restaurant(unit['breakfast'])
             if len(res) > 0:
                 total_cost += res['Average Cost'].values[0] * question['people_number']
 
             
         # lunch
         if unit['lunch'] and unit['lunch'] != '-':
-            name, city = get_valid_name_city(unit['lunch'])
-            res = restaurants.data[(restaurants.data['Name'].astype(str).str.contains(re.escape(name))) & (restaurants.data['City'] == city)]
+            res = resolved.restaurant(unit['lunch'])
             if len(res) > 0:
                 total_cost += res['Average Cost'].values[0] * question['people_number']
         
         # dinner
         if unit['dinner'] and unit['dinner'] != '-':
-            name, city = get_valid_name_city(unit['dinner'])
-            res = restaurants.data[(restaurants.data['Name'].astype(str).str.contains(re.escape(name))) & (restaurants.data['City'] == city)]
+            res = resolved.restaurant(unit['dinner'])
             if len(res) > 0:
                 total_cost += res['Average Cost'].values[0] * question['people_number']
         
         # accommodation
         if unit['accommodation'] and unit['accommodation'] != '-':
-            name, city = get_valid_name_city(unit['accommodation'])
-            res = accommodation.data[(accommodation.data['NAME'].astype(str).str.contains(re.escape(name))) & (accommodation.data['city'] == city)]
+            res = resolved.accommodation(unit['accommodation'])
             if len(res) > 0:
                 total_cost += res['price'].values[0] * math.ceil(question['people_number'] * 1.0 / res['maximum occupancy'].values[0])
     # print(total_cost)
     return total_cost
 
 
-def is_valid_room_rule(question, tested_data):
+def is_valid_room_rule(question, tested_data, resolved=None):
+    resolved = resolved if resolved is not None else PlanResolution()
 
     if question['local_constraint']['house rule'] is None:
         return None,None
@@ -132,8 +114,7 @@ def is_valid_room_rule(question, tested_data):
     for i in range(min(question['days'],len(tested_data))):
         unit = tested_data[i]
         if unit['accommodation'] and unit['accommodation'] != '-':
-            name, city = get_valid_name_city(unit['accommodation'])
-            res = accommodation.data[(accommodation.data['NAME'].astype(str).str.contains(re.escape(name))) & (accommodation.data['city'] == city)]
+            res = resolved.accommodation(unit['accommodation'])
             if len(res) > 0:
                 if question['local_constraint']['house rule'] == 'smoking' and 'No smoking' in str(res['house_rules'].values[0]):
                     return False, f"The house rule should be {question['local_constraint']['house rule']}."
@@ -151,37 +132,38 @@ def is_valid_room_rule(question, tested_data):
 
 
 
-def is_valid_cuisine(question, tested_data):
+def is_valid_cuisine(question, tested_data, resolved=None):
+    resolved = resolved if resolved is not None else PlanResolution()
     cuisine_set = set()
     if question['local_constraint']['cuisine']:
         for i in range(min(question['days'],len(tested_data))):
             unit = tested_data[i]
 
             if unit['breakfast'] and unit['breakfast'] != '-':
-                name, city = get_valid_name_city(unit['breakfast'])
+                name, city = resolved.name_city(unit['breakfast'])
                 if city == question['org']:
                     continue
-                res = restaurants.data[(restaurants.data['Name'].astype(str).str.contains(re.escape(name))) & (restaurants.data['City'] == city)]
+                res = resolved.restaurant(unit['breakfast'])
                 if len(res) > 0:       
                     for cuisine in question['local_constraint']['cuisine']:
                         if cuisine in res.iloc[0]['Cuisines']:
                             cuisine_set.add(cuisine)
 
             if unit['lunch'] and unit['lunch'] != '-':
-                name, city = get_valid_name_city(unit['lunch'])
+                name, city = resolved.name_city(unit['lunch'])
                 if city == question['org']:
                     continue
-                res = restaurants.data[(restaurants.data['Name'].astype(str).str.contains(re.escape(name))) & (restaurants.data['City'] == city)]
+                res = resolved.restaurant(unit['lunch'])
                 if len(res) > 0:
                     for cuisine in question['local_constraint']['cuisine']:
                         if cuisine in res.iloc[0]['Cuisines']:
                             cuisine_set.add(cuisine)
 
             if unit['dinner'] and unit['dinner'] != '-':
-                name, city = get_valid_name_city(unit['dinner'])
+                name, city = resolved.name_city(unit['dinner'])
                 if city == question['org']:
                     continue
-                res = restaurants.data[(restaurants.data['Name'].astype(str).str.contains(re.escape(name))) & (restaurants.data['City'] == city)]
+                res = resolved.restaurant(unit['dinner'])
                 if len(res) > 0:
                     for cuisine in question['local_constraint']['cuisine']:
                         if cuisine in res.iloc[0]['Cuisines']:
@@ -214,14 +196,14 @@ def is_valid_transportation(question, tested_data):
     return True, None
 
 
-def is_valid_room_type(question, tested_data):
+def is_valid_room_type(question, tested_data, resolved=None):
+    resolved = resolved if resolved is not None else PlanResolution()
     if question['local_constraint']['room type'] is None:
         return None,None
     for i in range(min(question['days'],len(tested_data))):
         unit = tested_data[i]
         if unit['accommodation'] and unit['accommodation'] != '-':
-            name, city = get_valid_name_city(unit['accommodation'])
-            res = accommodation.data[(accommodation.data['NAME'].astype(str).str.contains(re.escape(name))) & (accommodation.data['city'] == city)]
+            res = resolved.accommodation(unit['accommodation'])
             if len(res) > 0:
                 if question['local_constraint']['room type'] == 'not shared room' and res['room type'].values[0] == 'Shared room':
                     return False, f"The room type should be {question['local_constraint']['room type']}."
@@ -238,22 +220,42 @@ def is_valid_room_type(question, tested_data):
     return True, None
 
 
-def evaluation(query_data, tested_data):
+def evaluation(query_data, tested_data, resolved=None):
     return_info = {}
-    return_info['valid_cuisine'] = is_valid_cuisine(query_data, tested_data)
-    return_info['valid_room_rule'] = is_valid_room_rule(query_data, tested_data)
+    # Share parsed fields and sandbox lookups across all checkers.
+    resolved = resolved if resolved is not None else resolve_plan(query_data, tested_data)
+    return_info['valid_cuisine'] = is_valid_cuisine(query_data, tested_data, resolved)
+    return_info['valid_room_rule'] = is_valid_room_rule(query_data, tested_data, resolved)
     return_info['valid_transportation'] = is_valid_transportation(query_data, tested_data)
-    return_info['valid_room_type'] = is_valid_room_type(query_data, tested_data)
-    return_info['valid_cost'] = (bool(get_total_cost(query_data, tested_data) <= query_data['budget']), None)
+    return_info['valid_room_type'] = is_valid_room_type(query_data, tested_data, resolved)
+    return_info['valid_cost'] = (bool(get_total_cost(query_data, tested_data, resolved) <= query_data['budget']), None)
     return return_info
 
-def boolean_evaluation(query_data, tested_data):
+def fail_fast_checks(query_data, tested_data, resolved):
+    """Lazily run the checkers cheapest first, by the per-checker cost eval.py --profile measures."""
+    yield 'valid_transportation', is_valid_transportation(query_data, tested_data)
+    yield 'valid_room_rule', is_valid_room_rule(query_data, tested_data, resolved)
+    yield 'valid_room_type', is_valid_room_type(query_data, tested_data, resolved)
+    yield 'valid_cuisine', is_valid_cuisine(query_data, tested_data, resolved)
+    yield 'valid_cost', (bool(get_total_cost(query_data, tested_data, resolved) <= query_data['budget']), None)
+
+def boolean_evaluation(query_data, tested_data, resolved=None, fail_fast=False):
+    if fail_fast:
+        # Stop at the first violation; the resolution only looks up what the checkers reached.
+        resolved = resolved if resolved is not None else resolve_plan(query_data, tested_data)
+        for key, result in fail_fast_checks(query_data, tested_data, resolved):
+            if result[0] == False:
+                print(key)
+                return False
+        return True
     return_info = {}
-    return_info['valid_cuisine'] = is_valid_cuisine(query_data, tested_data)
-    return_info['valid_room_rule'] = is_valid_room_rule(query_data, tested_data)
+    # Share parsed fields and sandbox lookups across all checkers.
+    resolved = resolved if resolved is not None else resolve_plan(query_data, tested_data)
+    return_info['valid_cuisine'] = is_valid_cuisine(query_data, tested_data, resolved)
+    return_info['valid_room_rule'] = is_valid_room_rule(query_data, tested_data, resolved)
     return_info['valid_transportation'] = is_valid_transportation(query_data, tested_data)
-    return_info['valid_room_type'] = is_valid_room_type(query_data, tested_data)
-    return_info['valid_cost'] = (bool(get_total_cost(query_data, tested_data) <= query_data['budget']), None)
+    return_info['valid_room_type'] = is_valid_room_type(query_data, tested_data, resolved)
+    return_info['valid_cost'] = (bool(get_total_cost(query_data, tested_data, resolved) <= query_data['budget']), None)
     for key in return_info:
         if return_info[key][0] == False:
             print(key)
@@ -0,0 +1,94 @@
+from pandas import DataFrame
+from travelplanner.utils.plan_parser import extract_from_to, get_valid_name_city
+from travelplanner.tools.sandbox import get_sandbox
+
+sandbox = get_sandbox()
+flight = sandbox.flights
+accommodation = sandbox.accommodations
+restaurants = sandbox.restaurants
+attractions = sandbox.attractions
+
+
+class PlanResolution:
+    """
+    Parsed plan fields and their sandbox rows, each computed once per distinct string and shared by
+    the commonsense and hard constraint checkers. Everything is resolved on first request, so a
+    checker that stops at the first violation never pays for the entities after it. Entities are
+    kept as row positions; the rows themselves are only taken when a checker reads their fields,
+    so the existence checks (the *_matches methods) never build a frame.
+    """
+
+    def __init__(self) -> None:
+        self._name_city = {}
+        self._from_to = {}
+        self._positions = {}
+        self._rows = {}
+        self._flight_routes = {}
+        self._minimum_nights = {}
+
+    def name_city(self, text: str):
+        if text not in self._name_city:
+            self._name_city[text] = get_valid_name_city(text)
+        return self._name_city[text]
+
+    def from_to(self, text: str):
+        if text not in self._from_to:
+            self._from_to[text] = extract_from_to(text)
+        return self._from_to[text]
+
+    def _match(self, tool, kind: str, text: str):
+        key = (kind, text)
+        if key not in self._positions:
+            name, city = self.name_city(text)
+            self._positions[key] = tool.name_positions(name, city)
+        return self._positions[key]
+
+    def _search(self, tool, kind: str, text: str) -> DataFrame:
+        key = (kind, text)
+        if key not in self._rows:
+            self._rows[key] = tool.data.iloc[self._match(tool, kind, text)]
+        return self._rows[key]
+
+    def restaurant(self, text: str) -> DataFrame:
+        return self._search(restaurants, 'restaurant', text)
+
+    def attraction(self, text: str) -> DataFrame:
+        return self._search(attractions, 'attraction', text)
+
+    def accommodation(self, text: str) -> DataFrame:
+        return self._search(accommodation, 'accommodation', text)
+
+    def restaurant_matches(self, text: str) -> int:
+        return len(self._match(restaurants, 'restaurant', text))
+
+    def attraction_matches(self, text: str) -> int:
+        return len(self._match(attractions, 'attraction', text))
+
+    def accommodation_matches(self, text: str) -> int:
+        return len(self._match(accommodation, 'accommodation', text))
+
+    def flight_route(self, number: str):
+        """(origin, destination) of a flight number, None when it is not in the sandbox."""
+        if number not in self._flight_routes:
+            self._flight_routes[number] = flight.flight_route(number)
+        return self._flight_routes[number]
+
+    def minimum_nights(self, text: str):
+        """The minimum nights of an accommodation that matches exactly one sandbox row, else None."""
+        if text not in self._minimum_nights:
+            positions = self._match(accommodation, 'accommodation', text)
+            self._minimum_nights[text] = accommodation.data['minimum nights'].iat[positions[0]] if len(positions) == 1 else None
+        return self._minimum_nights[text]
+
+
+def resolve_plan(question, tested_data) -> PlanResolution:
+    """
+    The resolution shared by the checkers of one plan. Only the current_city fields of the days the
+    checkers look at (the first `question['days']`) are parsed up front, as nearly every checker
+    reads them; sandbox rows are looked up when a checker first asks for them.
+    """
+    resolution = PlanResolution()
+    for unit in tested_data[:question['days']]:
+        if isinstance(unit, dict) and isinstance(unit.get('current_city'), str) and 'from' in unit['current_city']:
+            resolution.from_to(unit['current_city'])
+    return resolution
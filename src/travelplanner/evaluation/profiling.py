@@ -0,0 +1,122 @@
+"""
+Per-constraint profiling of the evaluation.
+
+ConstraintProfiler replaces checker functions in their module namespace with timed wrappers, and
+the sandbox lookup methods of the shared tools with counting wrappers. Each checker call records
+its wall time and the sandbox lookups made while it ran, both inclusive of the checkers it calls
+(is_not_absent includes is_valid_days, for example). Calls are grouped by the level and day count
+of the query being evaluated, which the profiled plan entry point (eval.evaluate_plan) sets.
+"""
+import functools
+import time
+import numpy as np
+
+# (sandbox attribute, method) pairs the checkers and plan resolution look things up through.
+SANDBOX_LOOKUPS = [
+    ("restaurants", "name_positions"),
+    ("attractions", "name_positions"),
+    ("accommodations", "name_positions"),
+    ("flights", "lookup_flight"),
+    ("flights", "flight_route"),
+    ("googleDistanceMatrix", "run_for_evaluation"),
+]
+PERCENTILES = [50, 90, 99]
+
+
+def summarize(samples: list) -> dict:
+    """Call count, total and mean time, and latency percentiles in milliseconds, of a list of durations in seconds."""
+    durations = np.array(samples, dtype=float) * 1000
+    summary = {"calls": len(samples), "total_ms": float(durations.sum()) if len(samples) else 0.0}
+    if len(samples):
+        summary["mean_ms"] = float(durations.mean())
+        for q, value in zip(PERCENTILES, np.percentile(durations, PERCENTILES)):
+            summary[f"p{q}_ms"] = float(value)
+        summary["max_ms"] = float(durations.max())
+    return summary
+
+
+class ConstraintProfiler:
+    """Wall time, call count and sandbox lookups of the instrumented functions; restore() undoes the instrumentation."""
+
+    def __init__(self) -> None:
+        self.samples = {}
+        self.lookups = {}
+        self._group = None
+        self._stack = []
+        self._patches = []
+
+    def _record(self, name: str, elapsed: float, lookups: int) -> None:
+        self.samples.setdefault(name, {}).setdefault(self._group, []).append(elapsed)
+        self.lookups[name] = self.lookups.get(name, 0) + lookups
+
+    def _timed(self, name: str, function):
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            self._stack.append(0)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                lookups = self._stack.pop()
+                if self._stack:
+                    self._stack[-1] += lookups
+                self._record(name, elapsed, lookups)
+        return timed
+
+    def _counted(self, function):
+        @functools.wraps(function)
+        def counted(*args, **kwargs):
+            if self._stack:
+                self._stack[-1] += 1
+            return function(*args, **kwargs)
+        return counted
+
+    def _patch(self, owner, attribute: str, replacement) -> None:
+        self._patches.append((owner, attribute, owner.__dict__.get(attribute)))
+        setattr(owner, attribute, replacement)
+
+    def instrument(self, namespace, names: list, prefix: str) -> None:
+        """Time the functions `names` of a module (or any object whose attributes callers look up at call time)."""
+        for name in names:
+            self._patch(namespace, name, self._timed(f"{prefix}.{name}", getattr(namespace, name)))
+
+    def instrument_plan(self, namespace, name: str) -> None:
+        """Time the per-plan entry point `name`, whose first argument is the query; it sets the level/day group."""
+        timed = self._timed("evaluate_plan", getattr(namespace, name))
+
+        @functools.wraps(timed)
+        def grouped(query_data, *args, **kwargs):
+            self._group = (query_data['level'], query_data['days'])
+            try:
+                return timed(query_data, *args, **kwargs)
+            finally:
+                self._group = None
+        self._patch(namespace, name, grouped)
+
+    def count_lookups(self, sandbox) -> None:
+        """Count the sandbox lookups made through the shared tool instances of `sandbox`."""
+        for table, method in SANDBOX_LOOKUPS:
+            tool = getattr(sandbox, table)
+            self._patch(tool, method, self._counted(getattr(tool, method)))
+
+    def restore(self) -> None:
+        for owner, attribute, original in reversed(self._patches):
+            if original is None:
+                delattr(owner, attribute)
+            else:
+                setattr(owner, attribute, original)
+        self._patches = []
+
+    def report(self) -> dict:
+        functions = {}
+        by_level = {}
+        for name, groups in self.samples.items():
+            functions[name] = summarize([elapsed for samples in groups.values() for elapsed in samples])
+            functions[name]["sandbox_lookups"] = self.lookups.get(name, 0)
+            for group, samples in groups.items():
+                if group is not None:
+                    level, days = group
+                    by_level.setdefault(level, {}).setdefault(str(days), {})[name] = summarize(samples)
+        functions = dict(sorted(functions.items(), key=lambda item: -item[1]["total_ms"]))
+        return {"functions": functions, "by_level": by_level}
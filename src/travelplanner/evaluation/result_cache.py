@@ -0,0 +1,79 @@
+"""
+Content-addressed on-disk cache of per-plan evaluation results.
+
+An entry is keyed by the sha256 of the query record, the canonical JSON of the plan, the sandbox
+version (a digest of the database content, see snapshot.sandbox_version) and RESULT_FORMAT, and
+holds the commonsense and hard constraint info boxes of that plan. Re-scoring a submission in
+which only a few plans changed then only evaluates those plans.
+"""
+import hashlib
+import json
+import os
+from typing import Optional
+from travelplanner.tools.sandbox import get_sandbox
+from travelplanner.tools.snapshot import TABLES, sandbox_version
+
+# Bumped whenever a checker changes its results, which invalidates every cached entry.
+RESULT_FORMAT = 1
+
+
+def canonical_json(value) -> str:
+    """Key order and whitespace independent JSON; values JSON cannot represent are stringified."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def current_sandbox_version() -> str:
+    """sandbox_version of the tables' sources; the tables themselves are not loaded."""
+    sandbox = get_sandbox()
+    return sandbox_version({name: [sandbox.source_path(name)] for name in TABLES})
+
+
+def _encode(info_box: Optional[dict]):
+    return None if info_box is None else {key: list(value) for key, value in info_box.items()}
+
+
+def _decode(info_box: Optional[dict]):
+    return None if info_box is None else {key: tuple(value) for key, value in info_box.items()}
+
+
+class ResultCache:
+    """
+    One JSON file per plan under `directory`, fanned out by the first two hex digits of the key.
+    Entries are written to a temporary file and renamed, so concurrent runs never see partial files.
+    """
+
+    def __init__(self, directory: str, version: Optional[str] = None) -> None:
+        self.directory = directory
+        self.version = version if version is not None else current_sandbox_version()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, query_data: dict, plan) -> str:
+        digest = hashlib.sha256()
+        for part in (canonical_json(query_data), canonical_json(plan), self.version, str(RESULT_FORMAT)):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[tuple]:
+        """The (commonsense_info_box, hard_info_box) stored under `key`, or None on a miss."""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return _decode(entry["commonsense_constraint"]), _decode(entry["hard_constraint"])
+
+    def put(self, key: str, info_boxes: tuple) -> None:
+        commonsense_info_box, hard_info_box = info_boxes
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"commonsense_constraint": _encode(commonsense_info_box), "hard_constraint": _encode(hard_info_box)}, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,225 @@
+"""
+Single-pass commonsense evaluation.
+
+evaluation() returns the same dict as commonsense_constraint.evaluation but walks the plan once:
+current_city is parsed once per day, and every rule keeps its own running state, advancing day by
+day until it has a result. A rule whose result is known is done and skips the remaining days,
+like the early `return` of its checker. is_not_absent's day and city-number pre-checks are folded
+into the same walk instead of re-reading the plan.
+
+A rule that raises is marked done with the exception, which is re-raised only if the checker would
+have reached that point. The first such rule, in the order evaluation() runs the checkers, raises.
+"""
+from travelplanner.utils.plan_parser import extract_before_parenthesis, transportation_match
+from travelplanner.evaluation.plan_resolution import PlanResolution
+from travelplanner.evaluation.commonsense_constraint import (
+    city_state_map, count_consecutive_values, is_valid_city_sequence,
+    current_city_day_check, sandbox_day_check, absent_day_check,
+)
+
+RULES = ['is_reasonable_visiting_city', 'is_valid_restaurants', 'is_valid_attractions', 'is_valid_accommodation',
+         'is_valid_transportation', 'is_valid_information_in_current_city', 'is_valid_information_in_sandbox', 'is_not_absent']
+NO_MORE_DAYS = "You don't need to fill in the information for this or later days."
+
+
+def _closed_route(question, city_list):
+    """The checks is_reasonable_visiting_city runs on the whole city route."""
+    if city_list[0] != city_list[-1]:
+        return False, "The trip should be a closed circle."
+
+    if not is_valid_city_sequence(city_list):
+        return False, "The city sequence is invalid."
+
+    for idx, city in enumerate(city_list):
+        if city not in city_state_map:
+            return False, f"{city} is not a valid city."
+        if idx not in [0,len(city_list)-1] and question['days'] >3 and city_state_map[city] != question['dest']:
+            return False, f"{city} is not in {question['dest']}."
+
+    return True, None
+
+
+def _minimum_nights(accommodations, resolved):
+    """The minimum-nights check is_valid_accommodaton runs on the day-by-day accommodations."""
+    for unit in count_consecutive_values(accommodations):
+        if unit and unit[0] not in ['-','']:
+            minimum_nights = resolved.minimum_nights(unit[0])
+            if minimum_nights is not None and unit[1] < minimum_nights:
+                return False, f"The accommodation {unit[0]} do not obey the minumum nights rule."
+    return True, None
+
+
+def evaluation(query_data, tested_data, resolved=None):
+    resolved = resolved if resolved is not None else PlanResolution()
+    org = query_data['org']
+    results = {}
+
+    city_list = []
+    restaurants_list = []
+    attractions_list = []
+    accommodations = []
+    transportation_modes = set()
+    # is_not_absent: its pre-checks, then its own day rules and the filled-field count.
+    filled_days = 0
+    days_error = None
+    visited_cities = set()
+    city_number = None
+    absent = None
+    total_valid_info = 0
+
+    for i in range(min(query_data['days'],len(tested_data))):
+        unit = tested_data[i]
+
+        parse_error = None
+        try:
+            city_value = unit['current_city']
+            moving = 'from' in city_value
+            if moving:
+                city1, city2 = resolved.from_to(city_value)
+                cities = [extract_before_parenthesis(city1), extract_before_parenthesis(city2)]
+            else:
+                cities = [extract_before_parenthesis(city_value)]
+        except Exception as error:
+            parse_error = error
+        wrong_start = parse_error is None and moving and i == 0 and cities[0] != org
+
+        if 'is_reasonable_visiting_city' not in results:
+            if parse_error is not None:
+                results['is_reasonable_visiting_city'] = parse_error
+            elif wrong_start:
+                results['is_reasonable_visiting_city'] = (False, f"The first day's city should be {org}.")
+            else:
+                city_list += cities
+
+        if 'is_valid_restaurants' not in results:
+            try:
+                for meal in ['breakfast', 'lunch', 'dinner']:
+                    if meal in unit and unit[meal] and unit[meal] != '-':
+                        if unit[meal] not in restaurants_list:
+                            restaurants_list.append(unit[meal])
+                        elif meal == 'lunch':
+                            results['is_valid_restaurants'] = (False, f"The restaurant in day {i+1} lunch {unit['lunch']} is repeated.")
+                            break
+                        else:
+                            results['is_valid_restaurants'] = (False, f"The restaurant in day {i+1} {meal} is repeated.")
+                            break
+            except Exception as error:
+                results['is_valid_restaurants'] = error
+
+        if 'is_valid_attractions' not in results:
+            try:
+                if 'attraction' in unit and unit['attraction'] and unit['attraction'] != '-':
+                    for attraction in unit['attraction'].split(';')[:-1]:
+                        if attraction not in attractions_list:
+                            attractions_list.append(attraction)
+                        else:
+                            results['is_valid_attractions'] = (False, f"The attraction '{attraction}' in day {i+1} is repeated.")
+                            break
+            except Exception as error:
+                results['is_valid_attractions'] = error
+
+        if 'is_valid_accommodation' not in results:
+            try:
+                if 'accommodation' not in unit:
+                    results['is_valid_accommodation'] = (False, f"No Accommodation Info.")
+                else:
+                    accommodations.append(unit['accommodation'])
+            except Exception as error:
+                results['is_valid_accommodation'] = error
+
+        if 'is_valid_transportation' not in results:
+            try:
+                if i == 0 and not (tested_data[0]['transportation'] and tested_data[0]['transportation'] != '-'):
+                    results['is_valid_transportation'] = (False, "The transportation in day 1 should not be empty.")
+                elif 'transportation' in unit and unit['transportation'] and unit['transportation'] != '-':
+                    transportation_modes.add(transportation_match(unit['transportation']))
+            except Exception as error:
+                results['is_valid_transportation'] = error
+
+        if 'is_valid_information_in_current_city' not in results:
+            if parse_error is not None:
+                results['is_valid_information_in_current_city'] = parse_error
+            else:
+                try:
+                    # As in the checker, a day without a move checks against the city name itself.
+                    failure = current_city_day_check(i, unit, cities if moving else cities[0])
+                    if failure:
+                        results['is_valid_information_in_current_city'] = failure
+                except Exception as error:
+                    results['is_valid_information_in_current_city'] = error
+
+        if 'is_valid_information_in_sandbox' not in results:
+            try:
+                failure = sandbox_day_check(i, unit, resolved)
+                if failure:
+                    results['is_valid_information_in_sandbox'] = failure
+            except Exception as error:
+                results['is_valid_information_in_sandbox'] = error
+
+        if days_error is None:
+            try:
+                if unit != {} and unit['current_city'] != NO_MORE_DAYS:
+                    filled_days += 1
+            except Exception as error:
+                days_error = error
+        if city_number is None:
+            if parse_error is not None:
+                city_number = parse_error
+            elif wrong_start:
+                city_number = (False, "Invalid City Number")
+            else:
+                visited_cities.update(cities)
+        if absent is None:
+            try:
+                absent = absent_day_check(query_data, i, unit)
+                if absent is None:
+                    for key in unit:
+                        if unit[key] and unit[key] != '-':
+                            total_valid_info += 1
+            except Exception as error:
+                absent = error
+
+    # Whole-plan parts of the rules that got through every day.
+    if 'is_reasonable_visiting_city' not in results:
+        try:
+            results['is_reasonable_visiting_city'] = _closed_route(query_data, city_list)
+        except Exception as error:
+            results['is_reasonable_visiting_city'] = error
+    results.setdefault('is_valid_restaurants', (True, None))
+    results.setdefault('is_valid_attractions', (True, None))
+    if 'is_valid_accommodation' not in results:
+        try:
+            results['is_valid_accommodation'] = _minimum_nights(accommodations, resolved)
+        except Exception as error:
+            results['is_valid_accommodation'] = error
+    if 'is_valid_transportation' not in results:
+        if (('Self-driving' in transportation_modes) and ('Flight' in transportation_modes)) or (('Taxi' in transportation_modes) and ('Self-driving' in transportation_modes)):
+            results['is_valid_transportation'] = (False, "The transportation is conflicting.")
+        else:
+            results['is_valid_transportation'] = (True, None)
+    results.setdefault('is_valid_information_in_current_city', (True, None))
+    results.setdefault('is_valid_information_in_sandbox', (True, None))
+
+    if days_error is not None:
+        results['is_not_absent'] = days_error
+    elif filled_days != query_data['days']:
+        results['is_not_absent'] = (False, "Invalid Days")
+    elif city_number is not None:
+        results['is_not_absent'] = city_number
+    else:
+        visited_cities.discard(org)
+        if len(visited_cities) != query_data['visiting_city_number']:
+            results['is_not_absent'] = (False, "Invalid City Number")
+        elif absent is not None:
+            results['is_not_absent'] = absent
+        elif total_valid_info * 1.0 / (6 * query_data['days']) < 0.5:
+            results['is_not_absent'] = (False, f"The absent information is more than 50%.")
+        else:
+            results['is_not_absent'] = (True, None)
+
+    return_info = {}
+    for rule in RULES:
+        if isinstance(results[rule], Exception):
+            raise results[rule]
+        return_info[rule] = results[rule]
+    return return_info
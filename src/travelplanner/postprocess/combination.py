@@ -1,7 +1,7 @@
 from tqdm import tqdm
 import json
 import argparse
-from datasets import load_dataset
+from travelplanner.utils.query_sets import load_query_set
 
 
 if __name__ == '__main__':
@@ -21,12 +21,7 @@ if __name__ == '__main__':
     elif args.mode == 'sole-planning':
         suffix = f'_{args.strategy}'
 
-    if args.set_type == 'train':
-        query_data_list  = load_dataset('osunlp/TravelPlanner','train')['train']
-    elif args.set_type == 'validation':
-        query_data_list  = load_dataset('osunlp/TravelPlanner','validation')['validation']
-    elif args.set_type == 'test':
-        query_data_list  = load_dataset('osunlp/TravelPlanner','test')['test']
+    query_data_list = load_query_set(args.set_type)
 
     idx_number_list = [i for i in range(1,len(query_data_list)+1)]
 
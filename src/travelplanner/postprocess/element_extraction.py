@@ -1,5 +1,5 @@
 import argparse
-from datasets import load_dataset
+from travelplanner.utils.query_sets import load_query_set
 from tqdm import tqdm
 import json
 
@@ -27,12 +27,7 @@ if __name__ == '__main__':
     with open(f'{args.tmp_dir}/{args.set_type}_{args.model_name}{suffix}_{args.mode}.txt','r') as f:
         results = f.read().strip().split('\n')
     
-    if args.set_type == 'train':
-        query_data_list  = load_dataset('osunlp/TravelPlanner','train')['train']
-    elif args.set_type == 'validation':
-        query_data_list  = load_dataset('osunlp/TravelPlanner','validation')['validation']
-    elif args.set_type == 'test':
-        query_data_list  = load_dataset('osunlp/TravelPlanner','test')['test']
+    query_data_list = load_query_set(args.set_type)
 
     idx_number_list = [i for i in range(1,len(query_data_list)+1)]
     for idx in tqdm(idx_number_list[:]):
@@ -2,6 +2,7 @@ import argparse
 import os, sys
 from commonsense_constraint import evaluation as commonsense_eval
 from hard_constraint import evaluation as hard_eval
+from travelplanner.evaluation.plan_resolution import resolve_plan
 import json
 from tqdm import tqdm
 
@@ -26,12 +27,13 @@ if __name__ == '__main__':
     for idx in tqdm(range(len(data_list))):
         tested_plan = data_list[idx]
         if tested_plan['plan']:
-            commonsense_info_box = commonsense_eval(placeholder_query,tested_plan['plan'])
+            resolved = resolve_plan(placeholder_query,tested_plan['plan'])
+            commonsense_info_box = commonsense_eval(placeholder_query,tested_plan['plan'],resolved)
         else:
             commonsense_info_box = None
 
         if commonsense_info_box and commonsense_info_box['is_not_absent'][0] and commonsense_info_box['is_valid_information_in_sandbox'][0]:
-            hard_info_box = hard_eval(placeholder_query,tested_plan['plan'])
+            hard_info_box = hard_eval(placeholder_query,tested_plan['plan'],resolved)
         
         
 
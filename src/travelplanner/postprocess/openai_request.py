@@ -8,7 +8,7 @@ from typing import Iterable, List, TypeVar
 import func_timeout
 from func_timeout import func_set_timeout
 import json
-from datasets import load_dataset
+from travelplanner.utils.query_sets import load_query_set
 
 
 T = TypeVar('T')
@@ -269,12 +269,7 @@ def build_plan_format_conversion_prompt(directory, set_type='validation',model_n
     }}]
 -----EXAMPLE END-----
 """
-    if set_type == 'train':
-        query_data_list  = load_dataset('osunlp/TravelPlanner','train')['train']
-    elif set_type == 'validation':
-        query_data_list  = load_dataset('osunlp/TravelPlanner','validation')['validation']
-    elif set_type == 'test':
-        query_data_list  = load_dataset('osunlp/TravelPlanner','test')['test']
+    query_data_list = load_query_set(set_type)
 
     idx_number_list = [i for i in range(1,len(query_data_list)+1)]
     if mode == 'two-stage':
@@ -1,13 +1,20 @@
 import pandas as pd
 from pandas import DataFrame
 from typing import Optional
-from travelplanner.utils.func import extract_before_parenthesis
+from travelplanner.utils.plan_parser import extract_before_parenthesis
+from travelplanner.tools.snapshot import load_snapshot
+from travelplanner.tools.name_index import NameSearchMixin
 
 
-class Accommodations:
-    def __init__(self, path="./src/travelplanner/database/accommodations/clean_accommodations_2022.csv"):
+class Accommodations(NameSearchMixin):
+    name_column = "NAME"
+    city_column = "city"
+
+    def __init__(self, path="./src/travelplanner/database/accommodations/clean_accommodations_2022.csv", use_snapshot: bool = True):
         self.path = path
-        self.data = pd.read_csv(self.path).dropna()[['NAME','price','room type', 'house_rules', 'minimum nights', 'maximum occupancy', 'review rate number', 'city']]
+        self.data = load_snapshot("accommodations", [self.path]) if use_snapshot else None
+        if self.data is None:
+            self.data = pd.read_csv(self.path).dropna()[['NAME','price','room type', 'house_rules', 'minimum nights', 'maximum occupancy', 'review rate number', 'city']]
         print("Accommodations loaded.")
 
     def load_db(self):
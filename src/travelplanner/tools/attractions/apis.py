@@ -1,13 +1,20 @@
 import pandas as pd
 from pandas import DataFrame
 from typing import Optional
-from travelplanner.utils.func import extract_before_parenthesis
+from travelplanner.utils.plan_parser import extract_before_parenthesis
+from travelplanner.tools.snapshot import load_snapshot
+from travelplanner.tools.name_index import NameSearchMixin
 
 
-class Attractions:
-    def __init__(self, path="./src/travelplanner/database/attractions/attractions.csv"):
+class Attractions(NameSearchMixin):
+    name_column = "Name"
+    city_column = "City"
+
+    def __init__(self, path="./src/travelplanner/database/attractions/attractions.csv", use_snapshot: bool = True):
         self.path = path
-        self.data = pd.read_csv(self.path).dropna()[['Name','Latitude','Longitude','Address','Phone','Website',"City"]]
+        self.data = load_snapshot("attractions", [self.path]) if use_snapshot else None
+        if self.data is None:
+            self.data = pd.read_csv(self.path).dropna()[['Name','Latitude','Longitude','Address','Phone','Website',"City"]]
         print("Attractions loaded.")
 
     def load_db(self):
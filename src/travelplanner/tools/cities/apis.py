@@ -1,4 +1,5 @@
 from pandas import DataFrame
+from travelplanner.utils.city_registry import get_city_registry
 
 class Cities:
     def __init__(self ,path="./src/travelplanner/database/background/citySet_with_states.txt") -> None:
@@ -7,16 +8,8 @@ class Cities:
         print("Cities loaded.")
 
     def load_data(self):
-        self.data = {}
-        cityStateMapping = None
-        with open(self.path, "r") as f:
-            cityStateMapping = f.read().strip().split("\n")
-        for unit in cityStateMapping:
-            city, state = unit.split("\t")
-            if state not in self.data:
-                self.data[state] = [city]
-            else:
-                self.data[state].append(city)
+        # Copy the lists so callers mutating a result cannot change the shared registry.
+        self.data = {state: list(cities) for state, cities in get_city_registry(self.path).state_cities.items()}
     
     def run(self, state) -> dict:
         if state not in self.data:
@@ -1,21 +1,439 @@
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 from pandas import DataFrame
 from typing import Optional
-from travelplanner.utils.func import extract_before_parenthesis
+import re
+from collections import OrderedDict
+from travelplanner.utils.plan_parser import extract_before_parenthesis
+from travelplanner.tools.snapshot import load_snapshot
 import os
 
+# numpy integer dtype -> the pandas nullable dtype that keeps its values when rows are missing
+NULLABLE_INTEGER_DTYPES = {
+    "int8": "Int8", "int16": "Int16", "int32": "Int32", "int64": "Int64",
+    "uint8": "UInt8", "uint16": "UInt16", "uint32": "UInt32", "uint64": "UInt64",
+}
+
+
+class RouteIndex:
+    """
+    Row positions of a flight table grouped by (origin, destination, date).
+
+    Each key column is factorized to integer codes, the three codes are packed into one int64
+    key, and the row order sorted by that key is kept together with the start offset of every
+    distinct key. A search is a binary search over the distinct keys followed by a slice, so it
+    costs O(log groups + result) instead of three boolean masks over the whole table.
+    """
+
+    key_columns = ("OriginCityName", "DestCityName", "FlightDate")
+
+    def __init__(self, frame: DataFrame):
+        self.frame = frame
+        self.vocabularies = []
+        codes = []
+        for column in self.key_columns:
+            column_codes, uniques = pd.factorize(frame[column])
+            codes.append(column_codes.astype(np.int64))
+            self.vocabularies.append({value: code for code, value in enumerate(uniques)})
+        self.sizes = [max(len(vocabulary), 1) for vocabulary in self.vocabularies]
+        keys = (codes[0] * self.sizes[1] + codes[1]) * self.sizes[2] + codes[2]
+        self.order = np.argsort(keys, kind="stable").astype(np.int32 if len(frame) < 2**31 else np.int64)
+        self.keys, self.starts = np.unique(keys[self.order], return_index=True)
+        self.starts = np.append(self.starts, len(frame))
+
+    def _code(self, level: int, value) -> int:
+        return self.vocabularies[level].get(value, -1)
+
+    def _span(self, low: int, high: int) -> tuple:
+        """Offsets into `order` covering every packed key in [low, high)."""
+        first = np.searchsorted(self.keys, low, side="left")
+        last = np.searchsorted(self.keys, high, side="left")
+        return self.starts[first], self.starts[last]
+
+    def positions(self, origin: str, destination: str, departure_date: Optional[str] = None) -> np.ndarray:
+        """Row positions, in table order, for a route on one date or on every date when departure_date is None."""
+        origin_code, destination_code = self._code(0, origin), self._code(1, destination)
+        if origin_code < 0 or destination_code < 0:
+            return self.order[:0]
+        route_key = (origin_code * self.sizes[1] + destination_code) * self.sizes[2]
+        if departure_date is None:
+            start, stop = self._span(route_key, route_key + self.sizes[2])
+            return np.sort(self.order[start:stop])
+        date_code = self._code(2, departure_date)
+        if date_code < 0:
+            return self.order[:0]
+        start, stop = self._span(route_key + date_code, route_key + date_code + 1)
+        return self.order[start:stop]
+
+    def rows(self, origin: str, destination: str, departure_date: Optional[str] = None) -> DataFrame:
+        return self.frame.take(self.positions(origin, destination, departure_date))
+
+    def spans(self, keys) -> tuple:
+        """
+        Offsets into `order` of many (origin, destination, date) keys at once, a None date
+        covering every date of the route: the keys are encoded and packed together and located
+        with one searchsorted over the packed keys. Unknown keys get an empty span.
+        """
+        every_date = np.array([key[2] is None for key in keys], dtype=bool)
+        codes = np.array([[vocabulary.get(value, -1) for vocabulary, value in zip(self.vocabularies, key)] for key in keys],
+                         dtype=np.int64).reshape(-1, len(self.key_columns))
+        codes[every_date, 2] = 0
+        known = (codes >= 0).all(axis=1)
+        low = (codes[:, 0] * self.sizes[1] + codes[:, 1]) * self.sizes[2] + codes[:, 2]
+        high = low + np.where(every_date, self.sizes[2], 1)
+        bounds = np.searchsorted(self.keys, np.concatenate([low, high]), side="left")
+        starts, stops = self.starts[bounds[:len(low)]], self.starts[bounds[len(low):]]
+        return np.where(known, starts, 0), np.where(known, stops, 0)
+
+    def nbytes(self) -> int:
+        return int(self.order.nbytes + self.keys.nbytes + self.starts.nbytes)
+
+
+class FlightNumberIndex:
+    """
+    Flight Number -> row position.
+
+    The sandbox numbers are an 'F' followed by a fixed number of digits, so the digits address
+    a dense position array directly (-1 marks unused numbers). Tables whose numbers do not fit
+    that layout fall back to a hashed pandas Index.
+    """
+
+    def __init__(self, numbers: pd.Series):
+        numbers = numbers.astype(str)
+        self.width = int(numbers.str.len().max()) if len(numbers) else 0
+        self.dense = None
+        self.hashed = None
+        if len(numbers) and numbers.str.fullmatch(r"F[0-9]{%d}" % (self.width - 1)).all():
+            digits = numbers.str.slice(1).astype(np.int64).to_numpy()
+            self.dense = np.full(int(digits.max()) + 1, -1, dtype=np.int64)
+            self.dense[digits] = np.arange(len(digits))
+            self.pattern = re.compile(r"F[0-9]{%d}" % (self.width - 1))
+        else:
+            self.hashed = pd.Index(numbers.to_numpy())
+
+    def position(self, number: str) -> int:
+        """Row position of one flight number, or -1."""
+        if self.dense is None:
+            try:
+                return int(self.hashed.get_loc(number))
+            except (KeyError, TypeError):
+                return -1
+        if not isinstance(number, str) or not self.pattern.fullmatch(number):
+            return -1
+        digits = int(number[1:])
+        return int(self.dense[digits]) if digits < len(self.dense) else -1
+
+    def positions(self, numbers) -> np.ndarray:
+        """Row positions of many flight numbers at once, -1 for unknown numbers."""
+        numbers = pd.Series(list(numbers), dtype=object)
+        if self.dense is None:
+            return self.hashed.get_indexer(numbers.to_numpy())
+        # Non-strings never match; replace them so the vectorized string methods apply
+        text = numbers.where(numbers.map(type) == str, "")
+        valid = text.str.fullmatch(self.pattern.pattern).to_numpy(dtype=bool)
+        digits = np.zeros(len(numbers), dtype=np.int64)
+        digits[valid] = text[valid].str.slice(1).astype(np.int64).to_numpy()
+        valid = valid & (digits < len(self.dense))
+        return np.where(valid, self.dense[np.where(valid, digits, 0)], -1)
+
+    def nbytes(self) -> int:
+        if self.dense is not None:
+            return int(self.dense.nbytes)
+        return int(self.hashed.memory_usage(deep=True))
+
+
+class CompactFlightLayout:
+    """
+    Typed, compact in-memory encoding of the flight table.
+
+    City columns become categoricals, DepTime/ArrTime become int16 minute-of-day,
+    ActualElapsedTime int16 minutes, FlightDate int16 days since `date_origin`, and Price/Distance
+    float32. A column is only encoded when its values match the expected text format (or fit
+    float32 exactly), so `decode` always restores the original values and dtypes.
+    """
+
+    city_columns = ("OriginCityName", "DestCityName")
+    clock_columns = ("DepTime", "ArrTime")
+    float_columns = ("Price", "Distance")
+
+    def __init__(self, date_origin: str = "2022-01-01"):
+        self.date_origin = pd.Timestamp(date_origin)
+        self.kinds = {}
+        self.dtypes = {}
+        self.bytes_per_row_before = None
+        self.bytes_per_row_after = None
+
+    @staticmethod
+    def _bytes_per_row(frame: DataFrame) -> float:
+        return float(frame.memory_usage(index=True, deep=True).sum() / max(len(frame), 1))
+
+    def _encode_column(self, column: str, series: pd.Series):
+        """Return (kind, encoded series) or (None, series) when the column can not be encoded losslessly."""
+        if column in self.city_columns:
+            return "city", series.astype("category")
+        if column in self.clock_columns and series.str.fullmatch(r"[0-9]{2}:[0-5][0-9]").all():
+            parts = series.str.split(":", expand=True).astype(np.int16)
+            return "clock", (parts[0] * 60 + parts[1]).astype(np.int16)
+        if column == "ActualElapsedTime" and series.str.fullmatch(r"(0|[1-9][0-9]{0,2}) hours (0|[1-9]|[1-5][0-9]) minutes").all():
+            parts = series.str.extract(r"^(\d+) hours (\d+) minutes$").astype(np.int16)
+            return "duration", (parts[0] * 60 + parts[1]).astype(np.int16)
+        if column == "FlightDate" and series.str.fullmatch(r"[0-9]{4}-[0-9]{2}-[0-9]{2}").all():
+            days = (pd.to_datetime(series, format="%Y-%m-%d", errors="coerce") - self.date_origin).dt.days
+            if days.notna().all() and days.between(np.iinfo(np.int16).min, np.iinfo(np.int16).max).all():
+                return "date", days.astype(np.int16)
+        if column in self.float_columns:
+            encoded = series.astype(np.float32)
+            if (encoded.astype(series.dtype) == series).all():
+                return "float32", encoded
+        return None, series
+
+    def encode(self, frame: DataFrame) -> DataFrame:
+        if len(frame) == 0:
+            # An origin without flights: there is nothing to encode, and its (vacuously matching)
+            # formats must not decide the encoding of the other partitions.
+            for column in frame.columns:
+                self.dtypes.setdefault(column, frame[column].dtype)
+            return frame
+        self.bytes_per_row_before = self._bytes_per_row(frame)
+        columns = {}
+        for column in frame.columns:
+            self.dtypes[column] = frame[column].dtype
+            kind, columns[column] = self._encode_column(column, frame[column])
+            # Every partition of a lazy table must agree on the encoding
+            if self.kinds.get(column, kind) != kind:
+                raise ValueError(f"Inconsistent compact encoding for column {column}.")
+            self.kinds[column] = kind
+        compact = pd.DataFrame(columns, index=frame.index)
+        self.bytes_per_row_after = self._bytes_per_row(compact)
+        return compact
+
+    def encode_date(self, date: str) -> Optional[int]:
+        """Encode a query date the way FlightDate is stored; None if it can not occur in the table."""
+        if self.kinds.get("FlightDate") != "date":
+            return date
+        try:
+            return int((pd.Timestamp(date) - self.date_origin).days) if re.fullmatch(r"[0-9]{4}-[0-9]{2}-[0-9]{2}", str(date)) else None
+        except ValueError:
+            return None
+
+    def decode(self, frame: DataFrame) -> DataFrame:
+        if len(frame) == 0:
+            # Empty results may come from an encoded or an unencoded (empty) partition
+            return frame.astype({column: self.dtypes[column] for column in frame.columns})
+        columns = {}
+        for column in frame.columns:
+            series = frame[column]
+            kind = self.kinds.get(column)
+            if kind == "clock":
+                series = (series // 60).astype(str).str.zfill(2) + ":" + (series % 60).astype(str).str.zfill(2)
+            elif kind == "duration":
+                series = (series // 60).astype(str) + " hours " + (series % 60).astype(str) + " minutes"
+            elif kind == "date":
+                series = (self.date_origin + pd.to_timedelta(series.astype(np.int64), unit="D")).dt.strftime("%Y-%m-%d")
+            columns[column] = series.astype(self.dtypes[column]) if kind is not None else series
+        return pd.DataFrame(columns, index=frame.index)
+
+    def report(self) -> dict:
+        return {"bytes_per_row_before": self.bytes_per_row_before, "bytes_per_row_after": self.bytes_per_row_after}
+
+
 class Flights:
 
+    columns = ['Flight Number', 'Price', 'DepTime', 'ArrTime', 'ActualElapsedTime','FlightDate','OriginCityName','DestCityName','Distance']
+
     def __init__(
             self, 
-            path = "./src/travelplanner/database/flights/clean_Flights_2022.parquet"
+            path = "./src/travelplanner/database/flights/clean_Flights_2022.parquet",
+            lazy: bool = False,
+            max_cached_origins: int = 32,
+            compact: bool = False,
+            use_snapshot: bool = True
     ):
+        """
+        With lazy=True nothing is read up front: searches only read the hive partition of the
+        requested origin, and the last `max_cached_origins` partitions are kept in an LRU cache.
+        Accessing `data` in lazy mode still reads the full table.
+
+        With compact=True `data` holds the CompactFlightLayout encoding of the table; run,
+        route_rows and the lookups decode their results, so their output is unchanged.
+
+        The full table is read from the binary snapshot (see travelplanner.tools.snapshot) when
+        it is fresh and use_snapshot is set.
+        """
         self.path = path
-        self.data = None
+        self.lazy = lazy
+        self.max_cached_origins = max_cached_origins
+        self.layout = CompactFlightLayout() if compact else None
+        self.use_snapshot = use_snapshot
+        self._data = None
+        self._partitions = OrderedDict()
+        self._route_index = None
+        self._number_index = None
         print(os.path.abspath("."))
-        self.data = pd.read_parquet(self.path).dropna()[['Flight Number', 'Price', 'DepTime', 'ArrTime', 'ActualElapsedTime','FlightDate','OriginCityName','DestCityName','Distance']]
+        if not self.lazy:
+            self._data = self._read_table()
+            if self.layout is not None:
+                report = self.layout.report()
+                print(f"Flights compact layout: {report['bytes_per_row_before']:.1f} -> {report['bytes_per_row_after']:.1f} bytes per row.")
         print("Flights API loaded.")
 
+    @property
+    def data(self) -> DataFrame:
+        if self._data is None:
+            self._data = self._read_table()
+        return self._data
+
+    @data.setter
+    def data(self, value: DataFrame):
+        self._data = value
+        self._route_index = None
+        self._number_index = None
+
+    def _read_table(self, filters=None) -> DataFrame:
+        # The dataset has thousands of row groups; merging them into one chunk per column keeps
+        # row takes on the arrow-backed string columns cheap.
+        frame = None
+        if filters is None and self.use_snapshot:
+            frame = load_snapshot("flights", [self.path])
+        if frame is None:
+            table = pq.read_table(self.path, columns=self.columns, filters=filters).combine_chunks()
+            frame = table.to_pandas().dropna()
+        if self.layout is not None:
+            frame = self.layout.encode(frame)
+        return frame
+
+    def _present(self, frame: DataFrame) -> DataFrame:
+        """Bring rows of `data` back to the original column layout."""
+        if self.layout is None:
+            return frame
+        return self.layout.decode(frame)
+
+    def layout_report(self) -> Optional[dict]:
+        """Bytes per row before and after the compact encoding, or None when it is not enabled."""
+        if self.layout is None:
+            return None
+        return self.layout.report()
+
+    @property
+    def route_index(self) -> RouteIndex:
+        """(origin, destination, date) index over the full table, built on first use."""
+        if self._route_index is None:
+            self._route_index = RouteIndex(self.data)
+        return self._route_index
+
+    def _origin_partition(self, origin: str) -> RouteIndex:
+        """Return the indexed flights leaving `origin`, reading its partition on a cache miss."""
+        if origin in self._partitions:
+            self._partitions.move_to_end(origin)
+            return self._partitions[origin]
+        partition = RouteIndex(self._read_table(filters=[("OriginCityName", "==", origin)]))
+        self._partitions[origin] = partition
+        if len(self._partitions) > self.max_cached_origins:
+            self._partitions.popitem(last=False)
+        return partition
+
+    def _index_for(self, origin: str) -> RouteIndex:
+        if self.lazy and self._data is None:
+            return self._origin_partition(origin)
+        return self.route_index
+
+    def route_rows(self, origin: str, destination: str, departure_date: Optional[str] = None) -> DataFrame:
+        """All flights of a route, optionally restricted to one date, in table order. May be empty."""
+        index = self._index_for(origin)
+        if departure_date is not None and self.layout is not None:
+            departure_date = self.layout.encode_date(departure_date)
+            if departure_date is None:
+                return self._present(index.frame.iloc[0:0])
+        return self._present(index.rows(origin, destination, departure_date))
+
+    @property
+    def number_index(self) -> FlightNumberIndex:
+        """Flight Number index over the full table, built on first use (a lazy table is fully read)."""
+        if self._number_index is None:
+            self._number_index = FlightNumberIndex(self.data["Flight Number"])
+        return self._number_index
+
+    def lookup_flight(self, flight_number: str) -> Optional[dict]:
+        """Return the row of one flight (price, route, times, ...) as a dict, or None if it does not exist."""
+        position = self.number_index.position(flight_number)
+        if position < 0:
+            return None
+        return self._present(self.data.iloc[[position]]).iloc[0].to_dict()
+
+    def flight_route(self, flight_number: str) -> Optional[tuple]:
+        """(OriginCityName, DestCityName) of one flight, or None; reads two cells instead of building the row."""
+        position = self.number_index.position(flight_number)
+        if position < 0:
+            return None
+        return self.data["OriginCityName"].iat[position], self.data["DestCityName"].iat[position]
+
+    def lookup_flights(self, flight_numbers) -> DataFrame:
+        """
+        Vectorized lookup of many flight numbers, e.g. every flight of a plan or of a whole submission.
+        Returns one row per input number, in input order; columns are missing for unknown numbers.
+        Integer columns (Price) become the matching nullable dtype (Int64), so the prices keep the
+        integer values lookup_flight returns instead of turning into floats.
+        """
+        flight_numbers = list(flight_numbers)
+        positions = self.number_index.positions(flight_numbers)
+        found = self._present(self.data.take(np.unique(positions[positions >= 0])))
+        found = found.astype({column: NULLABLE_INTEGER_DTYPES[dtype.name] for column, dtype in found.dtypes.items() if dtype.name in NULLABLE_INTEGER_DTYPES})
+        return pd.DataFrame({"Flight Number": flight_numbers}).merge(found, on="Flight Number", how="left")[self.columns]
+
+    def run_many(self, queries) -> list:
+        """
+        `run` for many (origin, destination, departure_date) tuples; results keep the input order.
+
+        The queries are looked up per index (the full table, or one partition per origin in lazy
+        mode) in one batch: RouteIndex.spans locates every key with a single searchsorted, the
+        matching rows of all queries are taken and decoded together, and each query gets its slice.
+        """
+        queries = [tuple(query) for query in queries]
+        results = [None] * len(queries)
+        groups = OrderedDict()
+        for position, (origin, _, _) in enumerate(queries):
+            groups.setdefault(origin if self.lazy and self._data is None else None, []).append(position)
+        for origin, members in groups.items():
+            index = self._index_for(origin) if origin is not None else self.route_index
+            keys = []
+            for position in members:
+                origin_name, destination, departure_date = queries[position]
+                if self.layout is not None and departure_date is not None:
+                    # A date that can not be encoded stays a string, which no encoded FlightDate matches
+                    encoded = self.layout.encode_date(departure_date)
+                    departure_date = departure_date if encoded is None else encoded
+                keys.append((origin_name, destination, departure_date))
+            starts, stops = index.spans(keys)
+            lengths = stops - starts
+            # Concatenated order[start:stop] ranges of all queries, without a slice per query
+            offsets = np.cumsum(lengths) - lengths
+            positions = index.order[np.repeat(starts - offsets, lengths) + np.arange(int(lengths.sum()))]
+            # A whole route spans several dates; like `positions`, give its rows in table order
+            for offset, length, key in zip(offsets.tolist(), lengths.tolist(), keys):
+                if key[2] is None:
+                    positions[offset:offset + length].sort()
+            rows = self._present(index.frame.take(positions))
+            for position, offset, length in zip(members, offsets.tolist(), lengths.tolist()):
+                if length == 0:
+                    results[position] = "There is no flight from {} to {} on {}.".format(*queries[position])
+                else:
+                    results[position] = rows.iloc[offset:offset + length]
+        return results
+
+    def memory_usage(self) -> int:
+        """Bytes held by the full table and the cached origin partitions, without triggering a load."""
+        total = 0
+        if self._data is not None:
+            total += self._data.memory_usage(index=True, deep=True).sum()
+        if self._route_index is not None:
+            total += self._route_index.nbytes()
+        if self._number_index is not None:
+            total += self._number_index.nbytes()
+        for partition in self._partitions.values():
+            total += partition.nbytes() + partition.frame.memory_usage(index=True, deep=True).sum()
+        return int(total)
+
     def load_db(self):
         self.data = pd.read_csv(self.path).dropna().rename(columns={'Unnamed: 0': 'Flight Number'})
 
@@ -25,9 +443,7 @@ class Flights:
             departure_date: str,
             ) -> DataFrame:
         """Search for flights by origin, destination, and departure date."""
-        results = self.data[self.data["OriginCityName"] == origin]
-        results = results[results["DestCityName"] == destination]
-        results = results[results["FlightDate"] == departure_date]
+        results = self.route_rows(origin, destination, departure_date)
         # if order == "ascPrice":
         #     results = results.sort_values(by=["Price"], ascending=True)
         # elif order == "descPrice":
@@ -50,9 +466,7 @@ class Flights:
             departure_date: str,
             ) -> DataFrame:
         """Search for flights by origin, destination, and departure date."""
-        results = self.data[self.data["OriginCityName"] == extract_before_parenthesis(origin)]
-        results = results[results["DestCityName"] == extract_before_parenthesis(destination)]
-        results = results[results["FlightDate"] == departure_date]
+        results = self.route_rows(extract_before_parenthesis(origin), extract_before_parenthesis(destination), departure_date)
         # if order == "ascPrice":
         #     results = results.sort_values(by=["Price"], ascending=True)
         # elif order == "descPrice":
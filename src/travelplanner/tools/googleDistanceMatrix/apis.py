@@ -1,9 +1,12 @@
 import requests
-from travelplanner.utils.func import extract_before_parenthesis
+from travelplanner.utils.plan_parser import extract_before_parenthesis
+from travelplanner.tools.snapshot import load_snapshot
+from travelplanner.utils.city_registry import get_city_registry
 import os
 from requests.exceptions import SSLError
 import time
 import sys
+import math
 import pandas as pd
 import numpy as np
 
@@ -11,28 +14,122 @@ import numpy as np
 # Please be assured that this will not influence the experiment results shown in the paper. 
 
 class GoogleDistanceMatrix:
-    def __init__(self, subscription_key: str="") -> None:
+    def __init__(self, subscription_key: str="", path: str="./src/travelplanner/database/googleDistanceMatrix/distance.csv", use_snapshot: bool = True) -> None:
         self.gplaces_api_key: str = subscription_key
-        self.data =  pd.read_csv('./src/travelplanner/database/googleDistanceMatrix/distance.csv')
+        self.path = path
+        self.data = load_snapshot("googleDistanceMatrix", [self.path]) if use_snapshot else None
+        if self.data is None:
+            self.data =  pd.read_csv(self.path)
+        self._parse_columns()
+        self._build_route_index()
+        self._build_matrices()
         print("GoogleDistanceMatrix loaded.")
 
+    def _parse_columns(self):
+        """Add numeric distance_km / duration_min columns parsed from strings like "1,144 km" and "1 day 2 hours"."""
+        distance = self.data['distance'].str.replace("km", "", regex=False).str.replace(",", "", regex=False)
+        self.data['distance_km'] = pd.to_numeric(distance, errors='coerce')
+        parts = self.data['duration'].str.extract(r'^(?:(\d+) days?)? ?(?:(\d+) hours?)? ?(?:(\d+) mins?)?$').astype(float)
+        minutes = parts[0].fillna(0) * 1440 + parts[1].fillna(0) * 60 + parts[2].fillna(0)
+        self.data['duration_min'] = minutes.where(parts.notna().any(axis=1))
+
+    def _build_route_index(self):
+        """
+        Map (origin, destination) to (duration, distance, driving cost, taxi cost), keeping the first row
+        of duplicated pairs like the original mask lookup did. Pairs without duration or distance map to
+        None; costs are None for durations counted in days.
+        """
+        self.routes = {}
+        columns = ['origin', 'destination', 'duration', 'distance', 'distance_km']
+        for origin, destination, duration, distance, distance_km in self.data[columns].itertuples(index=False, name=None):
+            if (origin, destination) in self.routes:
+                continue
+            if pd.isna(duration) or pd.isna(distance):
+                self.routes[(origin, destination)] = None
+                continue
+            if 'day' in duration:
+                self.routes[(origin, destination)] = (duration, distance, None, None)
+                continue
+            self.routes[(origin, destination)] = (duration, distance, int(distance_km * 0.05), int(distance_km))
+
+    def _build_matrices(self):
+        """
+        Dense city-by-city matrices indexed by `city_ids`: distance (km), duration (minutes) and the
+        per-vehicle cost of each mode. NaN marks pairs without data, and costs are also NaN where
+        run_for_evaluation reports no cost (durations counted in days).
+
+        The IDs are those of the city registry, so a city has the same ID here as everywhere else;
+        cities of the distance table the registry does not list get the IDs after the registry's.
+        """
+        self.city_ids = dict(get_city_registry().city_ids)
+        for city in sorted(set(self.data['origin']) | set(self.data['destination'])):
+            if city not in self.city_ids:
+                self.city_ids[city] = len(self.city_ids)
+        self.cities = list(self.city_ids)
+        size = len(self.cities)
+        self.distance_matrix = np.full((size, size), np.nan)
+        self.duration_matrix = np.full((size, size), np.nan)
+        self.cost_matrix = {mode: np.full((size, size), np.nan) for mode in ("self-driving", "taxi")}
+
+        first = self.data.drop_duplicates(['origin', 'destination'])
+        first = first[first['duration'].notna() & first['distance'].notna()]
+        rows = first['origin'].map(self.city_ids).to_numpy()
+        columns = first['destination'].map(self.city_ids).to_numpy()
+        self.distance_matrix[rows, columns] = first['distance_km'].to_numpy(dtype=float)
+        self.duration_matrix[rows, columns] = first['duration_min'].to_numpy(dtype=float)
+        for (origin, destination), route in self.routes.items():
+            if route is not None and route[2] is not None:
+                self.cost_matrix["self-driving"][self.city_ids[origin], self.city_ids[destination]] = route[2]
+                self.cost_matrix["taxi"][self.city_ids[origin], self.city_ids[destination]] = route[3]
+        # One extra row/column of NaN absorbs unknown cities in route_costs.
+        self._padded_cost = {mode: np.pad(matrix, ((0, 1), (0, 1)), constant_values=np.nan) for mode, matrix in self.cost_matrix.items()}
+
+    @staticmethod
+    def _matrix_mode(mode):
+        if 'driving' in mode:
+            return "self-driving"
+        elif mode == "taxi":
+            return "taxi"
+        raise ValueError(f"Unsupported mode: {mode}")
+
+    def route_costs(self, routes, mode='self-driving', people=1):
+        """
+        Total cost of each route in `routes`, a list of equally long city sequences, for `people`
+        travellers: ceil(people / 5) cars when self-driving, ceil(people / 4) taxis. A route with an
+        unknown city or a leg without a cost is NaN.
+        """
+        mode = self._matrix_mode(mode)
+        vehicles = math.ceil(people / 5) if mode == "self-driving" else math.ceil(people / 4)
+        missing = len(self.cities)
+        ids = np.array([[self.city_ids.get(extract_before_parenthesis(city), missing) for city in route] for route in routes], dtype=np.int64)
+        if ids.ndim != 2:
+            return np.zeros(len(ids))
+        if ids.shape[1] < 2:
+            # No legs to pay for, but an unknown city is still NaN
+            return np.where((ids == missing).any(axis=1), np.nan, 0.0)
+        cost = self._padded_cost[mode]
+        return cost[ids[:, :-1], ids[:, 1:]].sum(axis=1) * vehicles
+
+    def route_cost(self, city_sequence, mode='self-driving', people=1):
+        """Total cost of travelling along `city_sequence`; see route_costs."""
+        return float(self.route_costs([city_sequence], mode, people)[0])
+
+    @staticmethod
+    def _mode_cost(route, mode):
+        if 'driving' in mode:
+            return route[2]
+        elif mode == "taxi":
+            return route[3]
+        return None
+
     def run(self, origin, destination, mode='driving'):
         origin = extract_before_parenthesis(origin)
         destination = extract_before_parenthesis(destination)
-        info = {"origin": origin, "destination": destination,"cost": None, "duration": None, "distance": None}
-        response = self.data[(self.data['origin'] == origin) & (self.data['destination'] == destination)]
-        if len(response) > 0:
-                if response['duration'].values[0] is None or response['distance'].values[0] is None or response['duration'].values[0] is np.nan or response['distance'].values[0] is np.nan:
-                    return "No valid information."
-                info["duration"] = response['duration'].values[0]
-                info["distance"] = response['distance'].values[0]
-                if 'driving' in mode:
-                    info["cost"] = int(eval(info["distance"].replace("km","").replace(",","")) * 0.05)
-                elif mode == "taxi":
-                    info["cost"] = int(eval(info["distance"].replace("km","").replace(",","")))
-                if 'day' in info["duration"]:
+        if (origin, destination) in self.routes:
+                route = self.routes[(origin, destination)]
+                if route is None or 'day' in route[0]:
                     return "No valid information."
-                return f"{mode}, from {origin} to {destination}, duration: {info['duration']}, distance: {info['distance']}, cost: {info['cost']}"
+                return f"{mode}, from {origin} to {destination}, duration: {route[0]}, distance: {route[1]}, cost: {self._mode_cost(route, mode)}"
 
         return f"{mode}, from {origin} to {destination}, no valid information."   
     
@@ -40,20 +137,11 @@ class GoogleDistanceMatrix:
         origin = extract_before_parenthesis(origin)
         destination = extract_before_parenthesis(destination)
         info = {"origin": origin, "destination": destination,"cost": None, "duration": None, "distance": None}
-        response = self.data[(self.data['origin'] == origin) & (self.data['destination'] == destination)]
-        if len(response) > 0:
-                if response['duration'].values[0] is None or response['distance'].values[0] is None or response['duration'].values[0] is np.nan or response['distance'].values[0] is np.nan:
-                    return info
-                info["duration"] = response['duration'].values[0]
-                info["distance"] = response['distance'].values[0]
-
-                if 'day' not in info["duration"]:
-                    if 'driving' in mode:
-                        info["cost"] = int(eval(info["distance"].replace("km","").replace(",","")) * 0.05)
-                    elif mode == "taxi":
-                        info["cost"] = int(eval(info["distance"].replace("km","").replace(",","")))
-
-                return info
+        route = self.routes.get((origin, destination))
+        if route is not None:
+                info["duration"] = route[0]
+                info["distance"] = route[1]
+                info["cost"] = self._mode_cost(route, mode)
 
         return info 
 
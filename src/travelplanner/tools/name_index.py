@@ -0,0 +1,70 @@
+from bisect import bisect_right
+import numpy as np
+from pandas import DataFrame
+
+
+class NameIndex:
+    """
+    Per-city substring index over a name column. positions(name, city) returns the row positions,
+    in table order, of the rows whose city equals `city` and whose name contains `name`; the same
+    rows as data[data[name_column].astype(str).str.contains(re.escape(name)) & (data[city_column] == city)].
+
+    The names of each city are joined into one NUL-separated string, so a lookup is a handful of
+    str.find calls over a few kilobytes instead of a regex scan of the whole table.
+    """
+
+    separator = "\x00"
+
+    def __init__(self, names, cities) -> None:
+        grouped = {}
+        for position, (name, city) in enumerate(zip(names, cities)):
+            grouped.setdefault(city, []).append((position, str(name)))
+        self._cities = {}
+        for city, rows in grouped.items():
+            starts = []
+            offset = 0
+            for _, name in rows:
+                starts.append(offset)
+                offset += len(name) + 1
+            blob = self.separator.join(name for _, name in rows)
+            positions = np.array([position for position, _ in rows], dtype=np.int64)
+            self._cities[city] = (blob, starts, positions)
+
+    def positions(self, name, city) -> np.ndarray:
+        entry = self._cities.get(city)
+        if entry is None or self.separator in name:
+            return np.empty(0, dtype=np.int64)
+        blob, starts, positions = entry
+        if name == "":
+            return positions
+        found = []
+        at = blob.find(name)
+        while at != -1:
+            row = bisect_right(starts, at) - 1
+            found.append(row)
+            if row + 1 == len(starts):
+                break
+            # Skip the rest of this name; each row is reported once.
+            at = blob.find(name, starts[row + 1])
+        return positions[found]
+
+
+class NameSearchMixin:
+    """
+    Name search for a tool whose table is `self.data`. Subclasses set `name_column` and
+    `city_column`; the NameIndex is built on first use and rebuilt when `data` is replaced.
+    """
+
+    name_column = "Name"
+    city_column = "City"
+
+    def name_positions(self, name: str, city: str) -> np.ndarray:
+        """Row positions of the rows of `city` whose name contains `name`, in table order (see NameIndex)."""
+        if getattr(self, "_name_index_data", None) is not self.data:
+            self._name_index = NameIndex(self.data[self.name_column].astype(str), self.data[self.city_column])
+            self._name_index_data = self.data
+        return self._name_index.positions(name, city)
+
+    def search_by_name(self, name: str, city: str) -> DataFrame:
+        """Rows of `city` whose name contains `name`, in table order."""
+        return self.data.iloc[self.name_positions(name, city)]
@@ -1,8 +1,11 @@
 from pandas import DataFrame
+from travelplanner.utils.table_text import frame_to_text
 
 class Notebook:
     def __init__(self) -> None:
         self.data = []
+        # Rendered Content of each entry, filled by list_all() and reused until the entry changes.
+        self.rendered = {}
 
     def write(self, input_data: DataFrame, short_description: str):
         self.data.append({"Short Description": short_description, "Content":input_data})
@@ -11,6 +14,7 @@ class Notebook:
     def update(self, input_data: DataFrame, index: int, short_decription: str):
         self.data[index]["Content"] = input_data
         self.data[index]["Short Description"]  = short_decription
+        self.rendered.pop(index, None)
 
         return f"The information has been updated in Notebook."
     
@@ -25,7 +29,9 @@ class Notebook:
         results = []
         for idx, unit in enumerate(self.data):
             if type(unit['Content']) == DataFrame:
-                results.append({"index":idx, "Short Description":unit['Short Description'], "Content":unit['Content'].to_string(index=False)})
+                if idx not in self.rendered:
+                    self.rendered[idx] = frame_to_text(unit['Content'])
+                results.append({"index":idx, "Short Description":unit['Short Description'], "Content":self.rendered[idx]})
             else:
                 results.append({"index":idx, "Short Description":unit['Short Description'], "Content":unit['Content']})
         
@@ -36,5 +42,6 @@ class Notebook:
     
     def reset(self):
         self.data = []
+        self.rendered = {}
     
     
@@ -50,7 +50,12 @@ class Planner:
             api_key=os.environ.get("API_KEY"),
             base_url=os.environ.get("BASE_URL")
         )
+        self.async_client = openai.AsyncOpenAI(
+            api_key=os.environ.get("API_KEY"),
+            base_url=os.environ.get("BASE_URL")
+        )
         self.llm = partial(self._get_completion,model_name=self.model_name,**self.parameters)
+        self.allm = partial(self._aget_completion,model_name=self.model_name,**self.parameters)
         self.agent_prompt = agent_prompt
         self.scratchpad: str = ''
         self.enc = tiktoken.encoding_for_model("gpt-3.5-turbo")
@@ -64,11 +69,23 @@ class Planner:
             return 'Max Token Length Exceeded.'
         else:
             result = self.llm(content=self._build_agent_prompt(text, query))
-            if len(result.choices) == 0:
-                raise Exception("result has no response")
-            if len(result.choices) > 1:
-                raise Exception("result has multiple responses. Let's check it")
-            return result.choices[0].message.content
+            return self._answer(result)
+
+    async def arun(self, text, query, log_file=None) -> str:
+        if log_file:
+            log_file.write('\n---------------Planner\n'+self._build_agent_prompt(text, query))
+        if len(self.enc.encode(self._build_agent_prompt(text, query))) > 12000:
+            return 'Max Token Length Exceeded.'
+        else:
+            result = await self.allm(content=self._build_agent_prompt(text, query))
+            return self._answer(result)
+
+    def _answer(self, result) -> str:
+        if len(result.choices) == 0:
+            raise Exception("result has no response")
+        if len(result.choices) > 1:
+            raise Exception("result has multiple responses. Let's check it")
+        return result.choices[0].message.content
 
     def _build_agent_prompt(self, text, query) -> str:
         return self.agent_prompt(
@@ -89,6 +106,19 @@ class Planner:
         )
         return completion
 
+    async def _aget_completion(self,model_name,content,**params):
+        completion = await self.async_client.chat.completions.create(
+            model=model_name,
+            messages=[
+                {
+                    "role": "user",
+                    "content": content,
+                },
+            ],
+            **params
+        )
+        return completion
+
 class ReactPlanner:
     """
     A question answering ReAct Agent.
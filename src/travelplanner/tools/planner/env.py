@@ -1,19 +1,16 @@
-from travelplanner.tools.flights.apis import Flights
-from travelplanner.tools.accommodations.apis import Accommodations
-from travelplanner.tools.restaurants.apis import Restaurants
-from travelplanner.tools.googleDistanceMatrix.apis import GoogleDistanceMatrix
-from travelplanner.tools.attractions.apis import Attractions
-from travelplanner.evaluation.hard_constraint import extract_from_to,get_valid_name_city
+from travelplanner.tools.sandbox import get_sandbox
+from travelplanner.utils.plan_parser import extract_from_to,get_valid_name_city
 import math
 
 class ReactEnv:
     def __init__(self):
         
-        self.flight = Flights()
-        self.accommodation = Accommodations()
-        self.restaurants = Restaurants()
-        self.googleDistanceMatrix = GoogleDistanceMatrix()
-        self.attractions = Attractions()
+        sandbox = get_sandbox()
+        self.flight = sandbox.flights
+        self.accommodation = sandbox.accommodations
+        self.restaurants = sandbox.restaurants
+        self.googleDistanceMatrix = sandbox.googleDistanceMatrix
+        self.attractions = sandbox.attractions
     
     def run(self, tested_data):
 
@@ -29,9 +26,9 @@ class ReactEnv:
                 org_city, dest_city = extract_from_to(unit['current_city'])
             if 'flight number' in value.lower():
                     try:
-                        res = self.flight.data[self.flight.data['Flight Number'] == value.split('Flight Number: ')[1].split(',')[0]]
-                        if len(res) > 0:
-                            total_cost += res['Price'].values[0] * people_number
+                        res = self.flight.lookup_flight(value.split('Flight Number: ')[1].split(',')[0])
+                        if res is not None:
+                            total_cost += res['Price'] * people_number
                         else:
                             returned_info.append('The filght information is not valid')
                     except:
@@ -129,9 +126,9 @@ class ReactReflectEnv(ReactEnv):
             else:    
                 if 'flight number' in value.lower():
                         try:
-                            res = self.flight.data[self.flight.data['Flight Number'] == value.split('Flight Number: ')[1].split(',')[0]]
-                            if len(res) > 0:
-                                total_cost += res['Price'].values[0] * people_number
+                            res = self.flight.lookup_flight(value.split('Flight Number: ')[1].split(',')[0])
+                            if res is not None:
+                                total_cost += res['Price'] * people_number
                             else:
                                 returned_info.append('The filght information is not valid')
                         except:
@@ -9,7 +9,7 @@ from tqdm import tqdm
 from travelplanner.tools.planner.apis import Planner, ReactPlanner, ReactReflectPlanner
 import openai
 import argparse
-from datasets import load_dataset
+from travelplanner.utils.query_sets import load_query_set, sample_subset
 
 def load_line_json_data(filename):
     data = []
@@ -59,17 +59,12 @@ if __name__ == "__main__":
     args = parser.parse_args()
     directory = f'{args.output_dir}/{args.set_type}'
 
-    if args.set_type == 'train':
-        query_data_list  = load_dataset('osunlp/TravelPlanner','train')['train']
-    elif args.set_type == 'validation':
-        query_data_list  = load_dataset('osunlp/TravelPlanner','validation')['validation']
-    else:
-        query_data_list  = load_dataset('osunlp/TravelPlanner','test')['test']
+    query_data_list = load_query_set(args.set_type)
     result_prefix = args.result_prefix
 
     if args.create_subset.lower() == "yes":
         # Create a subset of the dataset
-        query_data_list = query_data_list.train_test_split(test_size=0.2,shuffle=False,seed=42)["test"]
+        query_data_list = sample_subset(query_data_list)
         result_prefix = f"sample_{args.result_prefix}"
     
     numbers = [i for i in range(1,len(query_data_list)+1)]
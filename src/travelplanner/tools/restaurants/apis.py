@@ -1,12 +1,19 @@
 import pandas as pd
 from pandas import DataFrame
 from typing import Optional
-from travelplanner.utils.func import extract_before_parenthesis
+from travelplanner.utils.plan_parser import extract_before_parenthesis
+from travelplanner.tools.snapshot import load_snapshot
+from travelplanner.tools.name_index import NameSearchMixin
 
-class Restaurants:
-    def __init__(self, path="./src/travelplanner/database/restaurants/clean_restaurant_2022.csv"):
+class Restaurants(NameSearchMixin):
+    name_column = "Name"
+    city_column = "City"
+
+    def __init__(self, path="./src/travelplanner/database/restaurants/clean_restaurant_2022.csv", use_snapshot: bool = True):
         self.path = path
-        self.data = pd.read_csv(self.path).dropna()[['Name','Average Cost','Cuisines','Aggregate Rating','City']]
+        self.data = load_snapshot("restaurants", [self.path]) if use_snapshot else None
+        if self.data is None:
+            self.data = pd.read_csv(self.path).dropna()[['Name','Average Cost','Cuisines','Aggregate Rating','City']]
         print("Restaurants loaded.")
 
     def load_db(self):
@@ -0,0 +1,139 @@
+import inspect
+import threading
+from pandas import DataFrame
+from travelplanner.tools.flights.apis import Flights
+from travelplanner.tools.accommodations.apis import Accommodations
+from travelplanner.tools.restaurants.apis import Restaurants
+from travelplanner.tools.googleDistanceMatrix.apis import GoogleDistanceMatrix
+from travelplanner.tools.attractions.apis import Attractions
+from travelplanner.tools.cities.apis import Cities
+
+
+class SandboxCatalog:
+    """
+    Process-wide catalog of the sandbox tools. Every tool is built the first time it is
+    requested and the same instance is handed out afterwards, so each database file is
+    read at most once per process.
+    """
+
+    factories = {
+        "flights": Flights,
+        "accommodations": Accommodations,
+        "restaurants": Restaurants,
+        "googleDistanceMatrix": GoogleDistanceMatrix,
+        "attractions": Attractions,
+        "cities": Cities,
+    }
+
+    def __init__(self) -> None:
+        self._tools = {}
+        self._options = {}
+        self._lock = threading.Lock()
+
+    def configure(self, name: str, **options) -> None:
+        """Set constructor options for a table, e.g. configure("flights", lazy=True). Must run before first use."""
+        if name not in self.factories:
+            raise KeyError(f"Unknown sandbox table: {name}")
+        if name in self._tools:
+            raise RuntimeError(f"Sandbox table {name} is already loaded.")
+        self._options.setdefault(name, {}).update(options)
+
+    def get(self, name: str):
+        if name not in self.factories:
+            raise KeyError(f"Unknown sandbox table: {name}")
+        tool = self._tools.get(name)
+        if tool is None:
+            with self._lock:
+                tool = self._tools.get(name)
+                if tool is None:
+                    tool = self.factories[name](**self._options.get(name, {}))
+                    self._tools[name] = tool
+        return tool
+
+    def source_path(self, name: str) -> str:
+        """The path table `name` is read from (its configured `path` or the constructor default), without loading it."""
+        if name not in self.factories:
+            raise KeyError(f"Unknown sandbox table: {name}")
+        options = self._options.get(name, {})
+        if "path" in options:
+            return options["path"]
+        return inspect.signature(self.factories[name]).parameters["path"].default
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.factories
+
+    @property
+    def flights(self) -> Flights:
+        return self.get("flights")
+
+    @property
+    def accommodations(self) -> Accommodations:
+        return self.get("accommodations")
+
+    @property
+    def restaurants(self) -> Restaurants:
+        return self.get("restaurants")
+
+    @property
+    def googleDistanceMatrix(self) -> GoogleDistanceMatrix:
+        return self.get("googleDistanceMatrix")
+
+    @property
+    def attractions(self) -> Attractions:
+        return self.get("attractions")
+
+    @property
+    def cities(self) -> Cities:
+        return self.get("cities")
+
+    def preload(self, names: list = None) -> None:
+        """Build the given tables (default: all) now instead of on first use."""
+        for name in names or list(self.factories):
+            self.get(name)
+
+    def loaded(self) -> list:
+        return list(self._tools.keys())
+
+    def memory_usage(self) -> dict:
+        """Return the in-memory size in bytes of every loaded table, plus a 'total' entry."""
+        usage = {}
+        for name, tool in self._tools.items():
+            if hasattr(tool, "memory_usage"):
+                usage[name] = tool.memory_usage()
+                continue
+            data = getattr(tool, "data", None)
+            if isinstance(data, DataFrame):
+                usage[name] = int(data.memory_usage(index=True, deep=True).sum())
+        usage["total"] = sum(usage.values())
+        return usage
+
+    def reset(self) -> None:
+        with self._lock:
+            self._tools = {}
+
+
+_sandbox = None
+_sandbox_lock = threading.Lock()
+
+
+def get_sandbox() -> SandboxCatalog:
+    """Return the catalog shared by every module of the current process."""
+    global _sandbox
+    if _sandbox is None:
+        with _sandbox_lock:
+            if _sandbox is None:
+                _sandbox = SandboxCatalog()
+    return _sandbox
+
+
+def init_worker(tables: list = None, options: dict = None) -> None:
+    """
+    Process pool initializer, e.g. ProcessPoolExecutor(initializer=init_worker, initargs=(["flights"],)).
+    `options` maps table names to configure() keyword arguments. Tables loaded from the binary
+    snapshot are memory-mapped, so every worker attaches to the same pages instead of reading
+    its own copy of the sources.
+    """
+    sandbox = get_sandbox()
+    for name, table_options in (options or {}).items():
+        sandbox.configure(name, **table_options)
+    sandbox.preload(tables)
@@ -0,0 +1,193 @@
+"""
+Binary snapshot of the cleaned sandbox tables.
+
+`python -m travelplanner.tools.snapshot` reads every source file once, applies the same cleaning
+and column projection as the tool classes and writes each table as an uncompressed Arrow IPC
+(Feather v2) file, next to a manifest recording the size, mtime and sha256 of its sources.
+The tool classes call `load_snapshot` on startup and fall back to the source files whenever the
+snapshot is missing or stale.
+
+Every table is stored as a single record batch and read back through a memory map without
+consolidating columns, so the numeric and string columns of the returned frame are read-only
+views of the mapped file. Processes that load the same snapshot share its pages through the OS
+page cache instead of each holding a private copy.
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import os
+from typing import Optional
+import pyarrow as pa
+import pyarrow.feather as feather
+from pandas import DataFrame
+
+SNAPSHOT_DIR = "./src/travelplanner/database/snapshot"
+MANIFEST_NAME = "manifest.json"
+# Bumped whenever the file layout changes; entries written with another format are rebuilt.
+SNAPSHOT_FORMAT = 2
+TABLES = ["flights", "accommodations", "restaurants", "googleDistanceMatrix", "attractions"]
+
+
+def _source_files(path: str) -> list:
+    """A source is either one file or a directory such as the hive-partitioned flights parquet."""
+    if not os.path.isdir(path):
+        return [path]
+    files = []
+    for root, dirs, names in os.walk(path):
+        dirs.sort()
+        files.extend(os.path.join(root, name) for name in sorted(names) if not name.startswith("."))
+    return files
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint(sources: list) -> dict:
+    """Size, mtime and sha256 of every file behind `sources`, keyed by normalized path."""
+    files = {}
+    for source in sources:
+        for path in _source_files(source):
+            stat = os.stat(path)
+            files[os.path.normpath(path)] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": _sha256(path)}
+    return files
+
+
+def _is_fresh(recorded: dict, sources: list) -> bool:
+    current = [os.path.normpath(path) for source in sources for path in _source_files(source)]
+    if sorted(current) != sorted(recorded):
+        return False
+    for path in current:
+        entry = recorded[path]
+        stat = os.stat(path)
+        if stat.st_size != entry["size"]:
+            return False
+        # A touched file with unchanged content is still fresh.
+        if stat.st_mtime_ns != entry["mtime_ns"] and _sha256(path) != entry["sha256"]:
+            return False
+    return True
+
+
+def read_manifest(directory: str = SNAPSHOT_DIR) -> dict:
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def load_snapshot(name: str, sources: list, directory: str = SNAPSHOT_DIR) -> Optional[DataFrame]:
+    """Return the snapshot of table `name` if it was built from `sources` and they are unchanged, else None."""
+    entry = read_manifest(directory).get(name)
+    if entry is None or entry.get("format") != SNAPSHOT_FORMAT:
+        return None
+    path = os.path.join(directory, entry["file"])
+    try:
+        if not os.path.exists(path) or not _is_fresh(entry["sources"], sources):
+            return None
+    except OSError:
+        return None
+    return feather.read_table(path, memory_map=True).to_pandas(split_blocks=True)
+
+
+def write_snapshot(name: str, frame: DataFrame, sources: list, directory: str = SNAPSHOT_DIR) -> dict:
+    """Write `frame` as table `name` and record `sources` in the manifest."""
+    os.makedirs(directory, exist_ok=True)
+    file_name = f"{name}.arrow"
+    table = pa.Table.from_pandas(frame, preserve_index=True).combine_chunks()
+    # Other processes may have the current file mapped, so never rewrite it in place.
+    path = os.path.join(directory, file_name)
+    feather.write_feather(table, path + ".tmp", compression="uncompressed", chunksize=max(table.num_rows, 1))
+    os.replace(path + ".tmp", path)
+    manifest = read_manifest(directory)
+    manifest[name] = {"file": file_name, "format": SNAPSHOT_FORMAT, "rows": len(frame), "sources": fingerprint(sources)}
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return manifest[name]
+
+
+def sandbox_version(sources: dict, directory: str = SNAPSHOT_DIR) -> str:
+    """
+    Digest of the content behind the sandbox tables, given {table name: sources}. Tables whose
+    snapshot manifest entry is still fresh reuse the recorded sha256 of their sources; the others
+    are hashed from disk.
+    """
+    manifest = read_manifest(directory)
+    digest = hashlib.sha256()
+    for name in sorted(sources):
+        entry = manifest.get(name)
+        try:
+            recorded = entry["sources"] if entry is not None and _is_fresh(entry["sources"], sources[name]) else None
+        except OSError:
+            recorded = None
+        files = recorded if recorded is not None else fingerprint(sources[name])
+        digest.update(json.dumps([name, sorted((path, files[path]["sha256"]) for path in files)]).encode())
+    return digest.hexdigest()
+
+
+def _tool_class(name: str):
+    from travelplanner.tools.flights.apis import Flights
+    from travelplanner.tools.accommodations.apis import Accommodations
+    from travelplanner.tools.restaurants.apis import Restaurants
+    from travelplanner.tools.googleDistanceMatrix.apis import GoogleDistanceMatrix
+    from travelplanner.tools.attractions.apis import Attractions
+
+    factories = {
+        "flights": Flights,
+        "accommodations": Accommodations,
+        "restaurants": Restaurants,
+        "googleDistanceMatrix": GoogleDistanceMatrix,
+        "attractions": Attractions,
+    }
+    return factories[name]
+
+
+def _default_sources(name: str) -> list:
+    """The sources a default-constructed tool of table `name` reads, without loading it."""
+    return [inspect.signature(_tool_class(name)).parameters["path"].default]
+
+
+def _build_table(name: str):
+    """Load table `name` from its sources and return (frame, sources)."""
+    tool = _tool_class(name)(use_snapshot=False)
+    return tool.data, [tool.path]
+
+
+def build_snapshot(names: Optional[list] = None, directory: str = SNAPSHOT_DIR, force: bool = False) -> dict:
+    """Build the snapshot of every table in `names` (default: all); fresh tables are skipped unless `force`."""
+    manifest = read_manifest(directory)
+    for name in names or TABLES:
+        if name not in TABLES:
+            raise KeyError(f"Unknown sandbox table: {name}")
+        entry = manifest.get(name)
+        if not force and entry is not None and entry.get("format") == SNAPSHOT_FORMAT \
+                and os.path.exists(os.path.join(directory, entry["file"])):
+            # Compare against the tool's own sources, as load_snapshot does, so that files added
+            # to a source directory make the table stale.
+            try:
+                fresh = _is_fresh(entry["sources"], _default_sources(name))
+            except OSError:
+                fresh = False
+            if fresh:
+                print(f"{name}: snapshot is up to date.")
+                continue
+        frame, sources = _build_table(name)
+        entry = write_snapshot(name, frame, sources, directory)
+        print(f"{name}: wrote {entry['rows']} rows.")
+    return read_manifest(directory)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the binary snapshot of the sandbox tables.")
+    parser.add_argument("--tables", nargs="*", default=None, choices=TABLES)
+    parser.add_argument("--output_dir", type=str, default=SNAPSHOT_DIR)
+    parser.add_argument("--force", action="store_true", help="Rebuild tables whose snapshot is still fresh.")
+    args = parser.parse_args()
+    build_snapshot(args.tables, args.output_dir, args.force)
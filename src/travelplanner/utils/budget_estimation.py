@@ -1,14 +1,14 @@
-from travelplanner.tools.accommodations.apis import Accommodations
-from travelplanner.tools.flights.apis import Flights
-from travelplanner.tools.restaurants.apis import Restaurants
-from travelplanner.tools.googleDistanceMatrix.apis import GoogleDistanceMatrix
+from travelplanner.tools.sandbox import get_sandbox
+from travelplanner.utils.city_registry import get_city_registry
 import pandas as pd
+import numpy as np
 
-hotel = Accommodations()
-flight = Flights()
-flight.load_db()
-restaurant = Restaurants()
-distanceMatrix = GoogleDistanceMatrix()
+sandbox = get_sandbox()
+hotel = sandbox.accommodations
+flight = sandbox.flights
+restaurant = sandbox.restaurants
+distanceMatrix = sandbox.googleDistanceMatrix
+city_registry = get_city_registry()
 
 
 def estimate_budget(data, mode):
@@ -48,31 +48,27 @@ def budget_calc(org, dest, days, date:list , people_number=None, local_constrain
     if grain == "city":
         hotel_data = hotel.run(dest)
         restaurant_data = restaurant.run(dest)
-        flight_data = flight.data[(flight.data["DestCityName"] == dest) & (flight.data["OriginCityName"] == org)]
+        flight_data = flight.route_rows(org, dest)
+        driving_costs = distanceMatrix.route_costs([[org, dest]], 'self-driving', people_number or 1)
 
 
     elif grain == "state":
-        city_set = []
-        with open('./src/travelplanner/database/background/citySet_with_states.txt','r') as f:
-            city_set = f.read().strip().split('\n')
-        
         all_hotel_data = []
         all_restaurant_data = []
         all_flight_data = []
+        candidate_cities = []
         
-        for city in city_set:
-            if dest == city.split('\t')[1]:
-                candidate_city = city.split('\t')[0]
-                
-                # Fetch data for the current city
-                current_hotel_data = hotel.run(candidate_city)
-                current_restaurant_data = restaurant.run(candidate_city)
-                current_flight_data = flight.data[(flight.data["DestCityName"] == candidate_city) & (flight.data["OriginCityName"] == org)]
-                
-                # Append the dataframes to the lists
-                all_hotel_data.append(current_hotel_data)
-                all_restaurant_data.append(current_restaurant_data)
-                all_flight_data.append(current_flight_data)
+        for candidate_city in city_registry.cities_in(dest):
+            # Fetch data for the current city
+            current_hotel_data = hotel.run(candidate_city)
+            current_restaurant_data = restaurant.run(candidate_city)
+            current_flight_data = flight.route_rows(org, candidate_city)
+            
+            # Append the dataframes to the lists
+            all_hotel_data.append(current_hotel_data)
+            all_restaurant_data.append(current_restaurant_data)
+            all_flight_data.append(current_flight_data)
+            candidate_cities.append(candidate_city)
         
         # Use concat to combine all dataframes in the lists
         hotel_data = pd.concat(all_hotel_data, axis=0)
@@ -80,6 +76,7 @@ def budget_calc(org, dest, days, date:list , people_number=None, local_constrain
         flight_data = pd.concat(all_flight_data, axis=0)
         # flight_data should be in the range of supported date
         flight_data = flight_data[flight_data['FlightDate'].isin(date)]
+        driving_costs = distanceMatrix.route_costs([[org, city] for city in candidate_cities], 'self-driving', people_number or 1)
 
     if people_number:
         hotel_data = hotel_data[hotel_data['maximum occupancy'] >= people_number]
@@ -168,7 +165,7 @@ def budget_calc(org, dest, days, date:list , people_number=None, local_constrain
     budgets = {}
     for mode in ["lowest", "highest", "average"]:
         if local_constraint and local_constraint['transportation'] == 'self driving':
-            flight_budget = eval(distanceMatrix.run(org, dest)['cost'].replace("$","")) * multipliers[days]["flight"]
+            flight_budget = estimate_budget(driving_costs[~np.isnan(driving_costs)].tolist(), mode) * multipliers[days]["flight"]
         else:
             flight_budget = estimate_budget(flight_data["Price"].tolist(), mode) * multipliers[days]["flight"]
         hotel_budget = estimate_budget(hotel_data["price"].tolist(), mode) * multipliers[days]["hotel"]
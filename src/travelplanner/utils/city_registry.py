@@ -0,0 +1,61 @@
+import threading
+from typing import Optional
+from travelplanner.utils.plan_parser import extract_before_parenthesis
+
+CITY_STATE_PATH = './src/travelplanner/database/background/citySet_with_states.txt'
+
+
+class CityRegistry:
+    """
+    The city/state background set, read once. Cities get integer IDs in file order, and
+    `pairs` / `state_cities` keep the file order too, so random.choice over them draws the
+    same cities as it did over the raw lines.
+    """
+
+    def __init__(self, path=CITY_STATE_PATH) -> None:
+        self.path = path
+        self.pairs = []
+        self.cities = []
+        self.city_ids = {}
+        self.city_state = {}
+        self.state_cities = {}
+        with open(self.path, 'r') as f:
+            lines = f.read().strip().split('\n')
+        for unit in lines:
+            city, state = unit.split('\t')
+            self.pairs.append((city, state))
+            if city not in self.city_ids:
+                self.city_ids[city] = len(self.cities)
+                self.cities.append(city)
+            self.city_state[city] = state
+            self.state_cities.setdefault(state, []).append(city)
+        self.states = list(self.state_cities)
+
+    def city_id(self, city) -> Optional[int]:
+        """ID of a city name such as "Denver" or "Denver(Colorado)", or None if it is unknown."""
+        return self.city_ids.get(extract_before_parenthesis(city))
+
+    def state_of(self, city) -> Optional[str]:
+        return self.city_state.get(extract_before_parenthesis(city))
+
+    def cities_in(self, state) -> list:
+        return self.state_cities.get(state, [])
+
+    def __contains__(self, city) -> bool:
+        return city in self.city_state
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_city_registry(path=CITY_STATE_PATH) -> CityRegistry:
+    """Return the registry of `path`, reading the file on first use only."""
+    registry = _registries.get(path)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.get(path)
+            if registry is None:
+                registry = CityRegistry(path)
+                _registries[path] = registry
+    return registry
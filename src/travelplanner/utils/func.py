@@ -2,6 +2,8 @@ import json
 import re
 import gradio as gr
 import os
+from travelplanner.utils.city_registry import get_city_registry
+from travelplanner.utils.plan_parser import extract_before_parenthesis, get_valid_name_city
 
 def load_line_json_data(filename):
     data = []
@@ -124,17 +126,6 @@ def judge_valid_cuisine(info, annotation_data, restaurant_data_all, cuisine_set:
 
 
 
-def get_valid_name_city(info):
-    # Modified the pattern to preserve spaces at the end of the name
-    pattern = r'(.*?),\s*([^,]+)(\(\w[\w\s]*\))?$'
-    match = re.search(pattern, info)
-    if match:
-        return match.group(1).strip(), extract_before_parenthesis(match.group(2).strip()).strip()
-    else:
-        print(f"{info} can not be parsed, '-' will be used instead.")
-        return "-","-"
-
-    
 def extract_numbers_from_filenames(directory):
     # Define the pattern to match files
     pattern = r'annotation_(\d+).json'
@@ -153,16 +144,7 @@ def get_city_list(days, deparure_city, destination):
     if days == 3:
         city_list.append(destination)
     else:
-        city_set = []
-        with open('./src/travelplanner/database/background/citySet_with_states.txt','r') as f:
-            city_set = f.read().split('\n')
-        state_city_map = {}
-        for unit in city_set:
-            city, state = unit.split('\t')
-            if state not in state_city_map:
-                state_city_map[state] = []
-            state_city_map[state].append(city)
-        for city in state_city_map[destination]:
+        for city in get_city_registry().state_cities[destination]:
             if city != deparure_city:
                 city_list.append(city + f"({destination})")
     return city_list
@@ -171,10 +153,6 @@ def get_filtered_data(component,data, column_name=('NAME','city')):
     name, city = get_valid_name_city(component)
     return data[(data[column_name[0]] == name) & (data[column_name[1]] == city)]
 
-def extract_before_parenthesis(s):
-    match = re.search(r'^(.*?)\([^)]*\)', s)
-    return match.group(1) if match else s
-
 def count_consecutive_values(lst):
     if not lst:
         return []
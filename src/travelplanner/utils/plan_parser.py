@@ -0,0 +1,66 @@
+"""
+Parsers for the free-text fields of a plan, shared by the evaluation, the tools and the agents.
+
+Every parser is a pure function of one string, with its pattern compiled once at import and its
+results memoized in a bounded LRU cache: the same city, restaurant and transportation strings recur
+across the days of a plan and across the plans of a submission, so most calls are cache hits.
+The memoized results are tuples or strings, which callers cannot mutate.
+"""
+import re
+from functools import lru_cache
+
+PARSE_CACHE_SIZE = 65536
+
+PARENTHESIS_PATTERN = re.compile(r'^(.*?)\([^)]*\)')
+FROM_TO_PATTERN = re.compile(r"from\s+(.+?)\s+to\s+([^,]+)(?=[,\s]|$)")
+# Modified the pattern to preserve spaces at the end of the name
+NAME_CITY_PATTERN = re.compile(r'(.*?),\s*([^,]+)(\(\w[\w\s]*\))?$')
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def extract_before_parenthesis(s):
+    """Strip a parenthesised suffix, e.g. "Denver(Colorado)" -> "Denver"."""
+    match = PARENTHESIS_PATTERN.search(s)
+    return match.group(1) if match else s
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def extract_from_to(text: str):
+    """
+    Extracts 'A' and 'B' from the format "from A to B" in the given text, with B ending at a comma or the end of the string.
+
+    Args:
+    - text (str): The input string.
+
+    Returns:
+    - tuple: A tuple containing 'A' and 'B'. If no match is found, returns (None, None).
+    """
+    matches = FROM_TO_PATTERN.search(text)
+    return matches.groups() if matches else (None, None)
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def get_valid_name_city(info):
+    """
+    Split "Name, City" into (name, city). An unparseable string gives ("-", "-"); the warning is
+    printed the first time that string is parsed, not on every lookup of it.
+    """
+    match = NAME_CITY_PATTERN.search(info)
+    if match:
+        return match.group(1).strip(), extract_before_parenthesis(match.group(2).strip()).strip()
+    else:
+        print(f"{info} can not be parsed, '-' will be used instead.")
+        return "-","-"
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def transportation_match(text: str):
+    """The transportation mode named in `text`: 'Taxi', 'Self-driving' or 'Flight', or None."""
+    lowered = text.lower()
+    if 'taxi' in lowered:
+        return 'Taxi'
+    elif 'self-driving' in lowered:
+        return 'Self-driving'
+    elif 'flight' in lowered:
+        return 'Flight'
+
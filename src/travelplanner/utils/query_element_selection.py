@@ -4,23 +4,14 @@ import random
 from travelplanner.utils.budget_estimation import budget_calc
 import json
 from datetime import datetime, timedelta
-from travelplanner.tools.googleDistanceMatrix.apis import GoogleDistanceMatrix
+from travelplanner.tools.sandbox import get_sandbox
+from travelplanner.utils.city_registry import get_city_registry
 import numpy as np
 
-google_distance = GoogleDistanceMatrix()
+google_distance = get_sandbox().googleDistanceMatrix
 
-city_set = []
-with open('./src/travelplanner/database/background/citySet_with_states.txt','r') as f:
-    city_set = f.read().strip().split('\n')
-
-state_city_map = {}
-
-for city in city_set:   
-    state = city.split('\t')[1]
-    if state not in state_city_map:
-        state_city_map[state] = [city.split('\t')[0]]
-    else:
-        state_city_map[state].append(city.split('\t')[0])
+city_registry = get_city_registry()
+state_city_map = city_registry.state_cities
 
 visiting_city_map = {3:1,5:2,7:3}
 
@@ -48,33 +39,27 @@ def select_consecutive_dates(num_days, start_date=datetime(2022, 3, 1), end_date
 
 
 def get_org_dest(days:int):
+    # random.choice over the registry pairs draws the same entries as over the raw file lines.
     if days == 3:
-        city_set = []
-        with open('./src/travelplanner/database/background/citySet_with_states.txt','r') as f:
-            city_set = f.read().strip().split('\n')
-
-        org = random.choice(city_set)
+        org = random.choice(city_registry.pairs)
 
         while True:
-            dest = random.choice(city_set)
-            if dest.split('\t')[1] != org.split('\t')[1]:
+            dest = random.choice(city_registry.pairs)
+            if dest[1] != org[1]:
                 break
 
-        final_org = org.split('\t')[0]
-        final_des = dest.split('\t')[0]
+        final_org = org[0]
+        final_des = dest[0]
 
     elif days in [5,7]:
-        state_set = []
-        with open('./src/travelplanner/database/background/citySet_with_states.txt','r') as f:
-            state_set = f.read().strip().split('\n')
-        org = random.choice(state_set)
+        org = random.choice(city_registry.pairs)
 
         while True:
-            dest = random.choice(state_set)
-            if dest != org and "None" not in dest and dest.split('\t')[1] != org.split('\t')[1] and len(state_city_map[dest.split('\t')[1]]) > 3:
+            dest = random.choice(city_registry.pairs)
+            if dest != org and "None" not in "\t".join(dest) and dest[1] != org[1] and len(state_city_map[dest[1]]) > 3:
                 break
-        final_org = org.split('\t')[0]
-        final_des = dest.split('\t')[1]
+        final_org = org[0]
+        final_des = dest[1]
 
     return final_org, final_des
 
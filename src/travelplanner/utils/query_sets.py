@@ -0,0 +1,80 @@
+"""
+Local copy of the TravelPlanner query splits, shared by every entry point.
+
+Each split is downloaded from the Hugging Face hub once and written as JSON lines to
+QUERY_SET_DIR, with `local_constraint` and `date` already parsed from their string form.
+After that, load_query_set() only reads the local file, so no network access (and no
+`datasets` install) is needed. Refresh the local copy explicitly with
+
+    python -m travelplanner.utils.query_sets --refresh
+"""
+import argparse
+import ast
+import json
+import math
+import os
+
+QUERY_SET_DIR = "./src/travelplanner/database/query_sets"
+DATASET_NAME = "osunlp/TravelPlanner"
+SPLITS = ["train", "validation", "test"]
+# Fields stored as Python literals in the hub dataset, e.g. "{'house rule': None, ...}".
+LITERAL_FIELDS = ["local_constraint", "date"]
+
+
+def query_set_path(split: str, directory: str = QUERY_SET_DIR) -> str:
+    if split not in SPLITS:
+        raise KeyError(f"Unknown query split: {split}")
+    return os.path.join(directory, f"{split}.jsonl")
+
+
+def parse_record(record: dict) -> dict:
+    record = dict(record)
+    for field in LITERAL_FIELDS:
+        if isinstance(record.get(field), str):
+            record[field] = ast.literal_eval(record[field])
+    return record
+
+
+def refresh_query_set(split: str, directory: str = QUERY_SET_DIR) -> str:
+    """Download `split` from the hub and replace its local copy. Returns the path written."""
+    from datasets import load_dataset
+
+    records = load_dataset(DATASET_NAME, split, download_mode="force_redownload")[split]
+    path = query_set_path(split, directory)
+    os.makedirs(directory, exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(parse_record(record)) + "\n")
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def load_query_set(split: str, directory: str = QUERY_SET_DIR) -> list:
+    """The query records of `split`, in dataset order; downloads the split on first use only."""
+    path = query_set_path(split, directory)
+    if not os.path.exists(path):
+        refresh_query_set(split, directory)
+    with open(path, "r", encoding="utf-8") as f:
+        return [parse_record(json.loads(line)) for line in f if line.strip()]
+
+
+def sample_subset(query_data_list: list, test_size: float = 0.2) -> list:
+    """The records that `train_test_split(test_size=test_size, shuffle=False)["test"]` selects: the last ceil(test_size * n)."""
+    n_test = math.ceil(test_size * len(query_data_list))
+    n_train = math.floor((1 - test_size) * len(query_data_list))
+    return query_data_list[n_train:n_train + n_test]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the local copy of the TravelPlanner query splits.")
+    parser.add_argument("--splits", nargs="*", default=SPLITS, choices=SPLITS)
+    parser.add_argument("--directory", type=str, default=QUERY_SET_DIR)
+    parser.add_argument("--refresh", action="store_true", help="Download the splits again even if a local copy exists.")
+    args = parser.parse_args()
+    for split in args.splits:
+        path = query_set_path(split, args.directory)
+        if args.refresh or not os.path.exists(path):
+            path = refresh_query_set(split, args.directory)
+            print(f"{split}: wrote {path}.")
+        else:
+            print(f"{split}: {path} is present; use --refresh to download it again.")
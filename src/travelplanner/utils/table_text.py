@@ -0,0 +1,88 @@
+"""
+Text rendering of the sandbox tables shown to agents, identical to `DataFrame.to_string(index=False)`.
+
+to_string pads every column to the widest cell of the rendered frame and gives all floats of a
+column the same number of decimals, so a row has no fixed text of its own. Cells, however, do:
+frame_to_text formats each distinct float once (memoized across observations), takes strings and
+integers as they are, and only pads and joins the cell texts of the rows being shown. Frames it
+cannot reproduce exactly (empty frames, floats in scientific notation, strings pandas escapes,
+other dtypes) go through pandas.
+"""
+from functools import lru_cache
+import math
+from pandas import DataFrame
+
+CELL_CACHE_SIZE = 1 << 18
+# pandas switches a float column to scientific notation past these magnitudes.
+LARGE_FLOAT = 1e6
+SMALL_FLOAT = 1e-6
+ESCAPED_CHARACTERS = ('\t', '\r', '\n')
+
+
+@lru_cache(maxsize=CELL_CACHE_SIZE)
+def _float_cell(value: float, sign: float) -> tuple:
+    """
+    The value at pandas' six decimals with trailing zeros removed, and how many decimals are left.
+    `sign` is part of the cache key only: 0.0 == -0.0, but pandas prints the sign of the latter.
+    """
+    text = f"{value:.6f}".rstrip('0')
+    return text, len(text) - text.index('.') - 1
+
+
+def _float_cells(values):
+    cells = []
+    decimals = 1
+    for value in values:
+        if value != value:
+            cells.append(None)
+            continue
+        magnitude = abs(value)
+        if math.isinf(value) or magnitude >= LARGE_FLOAT or 0 < magnitude < SMALL_FLOAT:
+            return None
+        text, places = _float_cell(value, math.copysign(1.0, value))
+        cells.append((text, places))
+        decimals = max(decimals, places)
+    # All floats of the column share the decimals of the most precise one.
+    return ['NaN' if cell is None else cell[0] + '0' * (decimals - cell[1]) for cell in cells]
+
+
+def _text_cells(values):
+    try:
+        joined = ''.join(values)
+    except TypeError:
+        # Missing values among the strings; anything else is left to pandas.
+        if not all(isinstance(value, str) or (isinstance(value, float) and value != value) for value in values):
+            return None
+        values = ['NaN' if isinstance(value, float) else value for value in values]
+        joined = ''.join(values)
+    if any(character in joined for character in ESCAPED_CHARACTERS):
+        return None
+    return values
+
+
+def _column_cells(kind: str, values):
+    if kind in 'iub':
+        return list(map(str, values))
+    if kind == 'f':
+        return _float_cells(values)
+    if kind == 'O':
+        return _text_cells(values)
+    return None
+
+
+def frame_to_text(frame: DataFrame) -> str:
+    """`frame.to_string(index=False)`."""
+    if len(frame) == 0 or len(frame.columns) == 0 or not all(isinstance(name, str) for name in frame.columns):
+        return frame.to_string(index=False)
+    headers = []
+    columns = []
+    for name, dtype, values in zip(frame.columns, frame.dtypes, zip(*frame.itertuples(index=False, name=None))):
+        cells = _column_cells(dtype.kind, values)
+        if cells is None:
+            return frame.to_string(index=False)
+        # pandas sets the labels of numeric columns off by one space.
+        headers.append(' ' + name if dtype.kind in 'iufb' else name)
+        columns.append(cells)
+    widths = [max(len(header), max(map(len, cells))) for header, cells in zip(headers, columns)]
+    line = ' '.join(f'{{:>{width}}}' for width in widths)
+    return '\n'.join([line.format(*headers)] + [line.format(*row) for row in zip(*columns)])
@@ -0,0 +1,121 @@
+"""
+The evaluation has three implementations that must return the same info boxes: the per-plan
+checkers (commonsense_constraint and hard_constraint, as eval.evaluate_plan runs them), the
+columnar batch engine (batch_evaluation.batch_evaluate) and single_pass.evaluation. These tests
+evaluate a handful of hand-written valid and invalid plans with each of them and compare.
+
+Run from the repository root; the sandbox tables are loaded from paths relative to it.
+"""
+import copy
+import pytest
+from travelplanner.evaluation.plan_resolution import resolve_plan
+from travelplanner.evaluation.commonsense_constraint import evaluation as commonsense_eval
+from travelplanner.evaluation.hard_constraint import evaluation as hard_eval
+from travelplanner.evaluation.single_pass import evaluation as single_pass_eval
+from travelplanner.evaluation.batch_evaluation import batch_evaluate
+from travelplanner.evaluation.eval import evaluate_plans
+
+NO_CONSTRAINTS = {'house rule': None, 'cuisine': None, 'room type': None, 'transportation': None}
+
+QUERY = {'org': 'Oakland', 'dest': 'Tucson', 'days': 3, 'visiting_city_number': 1, 'people_number': 1,
+         'budget': 1400, 'level': 'easy', 'local_constraint': NO_CONSTRAINTS}
+
+VALID_PLAN = [
+    {'days': 1, 'current_city': 'from Oakland to Tucson',
+     'transportation': 'Flight Number: F0635850, from Oakland to Tucson, Departure Time: 14:38, Arrival Time: 17:20',
+     'breakfast': '-', 'attraction': 'Pima Air & Space Museum, Tucson;', 'lunch': 'Villa Tevere, Tucson',
+     'dinner': 'Consort Restaurant, Tucson', 'accommodation': 'Private room with private bathroom, Tucson'},
+    {'days': 2, 'current_city': 'Tucson', 'transportation': '-', 'breakfast': 'Magic Spice Wok, Tucson',
+     'attraction': 'Reid Park Zoo, Tucson;Tucson Botanical Gardens, Tucson;', 'lunch': 'Pizza Street, Tucson',
+     'dinner': 'La Plage, Tucson', 'accommodation': 'Private room with private bathroom, Tucson'},
+    {'days': 3, 'current_city': 'from Tucson to Oakland',
+     'transportation': 'Flight Number: F0636774, from Tucson to Oakland, Departure Time: 14:01, Arrival Time: 15:14',
+     'breakfast': 'Bakers Oven, Tucson', 'attraction': 'Old Tucson, Tucson;', 'lunch': 'Mocha, Tucson',
+     'dinner': '-', 'accommodation': '-'},
+]
+
+
+def _query(**changes):
+    query = copy.deepcopy(QUERY)
+    query.update(changes)
+    return query
+
+
+def _plan(*edits):
+    """VALID_PLAN with (day index, field, value) edits applied; a value of None removes the field."""
+    plan = copy.deepcopy(VALID_PLAN)
+    for day, field, value in edits:
+        if value is None:
+            plan[day].pop(field)
+        else:
+            plan[day][field] = value
+    return plan
+
+
+CASES = {
+    'valid': (_query(), _plan()),
+    'valid with hard constraints': (_query(level='hard', people_number=2, budget=3000, local_constraint={
+        'house rule': 'parties', 'cuisine': ['Mexican', 'Seafood'], 'room type': 'private room', 'transportation': 'no self-driving'}), _plan()),
+    'hard constraints violated': (_query(level='hard', budget=500, local_constraint={
+        'house rule': 'smoking', 'cuisine': ['Chinese', 'French'], 'room type': 'entire room', 'transportation': 'no flight'}), _plan()),
+    'repeated restaurant': (_query(), _plan((1, 'dinner', 'Villa Tevere, Tucson'))),
+    'repeated attraction': (_query(), _plan((2, 'attraction', 'Reid Park Zoo, Tucson;'))),
+    'restaurant not in the sandbox': (_query(), _plan((1, 'lunch', 'Nowhere Diner, Tucson'))),
+    'restaurant in another city': (_query(), _plan((1, 'lunch', 'Villa Tevere, Oakland'))),
+    'unknown flight': (_query(), _plan((2, 'transportation', 'Flight Number: F0000001, from Tucson to Oakland, Departure Time: 14:01, Arrival Time: 15:14'))),
+    'self-driving not allowed': (_query(local_constraint=dict(NO_CONSTRAINTS, transportation='no self-driving')),
+                                 _plan((2, 'transportation', 'Self-driving, from Tucson to Oakland, Duration: 12 hours, Distance: 1,200 km, Cost: 60'),
+                                       (0, 'transportation', 'Self-driving, from Oakland to Tucson, Duration: 12 hours, Distance: 1,200 km, Cost: 60'))),
+    'conflicting transportation': (_query(), _plan((2, 'transportation', 'Self-driving, from Tucson to Oakland, Duration: 12 hours, Distance: 1,200 km, Cost: 60'))),
+    'not a closed circle': (_query(), _plan((2, 'current_city', 'from Tucson to Phoenix'))),
+    'minimum nights': (_query(), _plan((1, 'accommodation', 'Room for rent shared bathroom, Tucson'))),
+    'missing accommodation': (_query(), _plan((0, 'accommodation', '-'))),
+    'missing field': (_query(), _plan((1, 'breakfast', None))),
+    'too few days': (_query(), _plan()[:2]),
+    'empty plan': (_query(), []),
+}
+
+
+def _per_plan(query, plan):
+    """The gating of eval.evaluate_plan, written out so the reference does not go through eval.py."""
+    if not plan:
+        return None, None
+    resolved = resolve_plan(query, plan)
+    commonsense_info_box = commonsense_eval(query, plan, resolved)
+    if commonsense_info_box['is_not_absent'][0] and commonsense_info_box['is_valid_information_in_sandbox'][0]:
+        return commonsense_info_box, hard_eval(query, plan, resolved)
+    return commonsense_info_box, None
+
+
+@pytest.fixture(scope='module')
+def pairs():
+    return [(query, {'plan': plan}) for query, plan in CASES.values()]
+
+
+@pytest.fixture(scope='module')
+def expected(pairs):
+    return [_per_plan(query, tested_plan['plan']) for query, tested_plan in pairs]
+
+
+def test_cases_cover_both_outcomes(expected):
+    commonsense_passes = [all(result[0] is not False for result in info_box.values()) for info_box, _ in expected if info_box]
+    assert True in commonsense_passes and False in commonsense_passes
+    assert any(hard_info_box is not None for _, hard_info_box in expected)
+
+
+@pytest.mark.parametrize('name', list(CASES))
+def test_single_pass_matches_checkers(name):
+    query, plan = CASES[name]
+    if not plan:
+        pytest.skip('single_pass.evaluation is only called for delivered plans')
+    assert single_pass_eval(query, plan, resolve_plan(query, plan)) == commonsense_eval(query, plan, resolve_plan(query, plan))
+
+
+def test_batch_evaluate_matches_checkers(pairs, expected):
+    for name, info_boxes, expected_info_boxes in zip(CASES, batch_evaluate(pairs), expected):
+        assert info_boxes == expected_info_boxes, name
+
+
+@pytest.mark.parametrize('batch, single_pass', [(False, False), (False, True), (True, False)])
+def test_evaluate_plans_matches_checkers(pairs, expected, batch, single_pass):
+    assert evaluate_plans(pairs, batch=batch, single_pass=single_pass) == expected